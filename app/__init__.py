@@ -3,7 +3,11 @@ import logging
 from flask import Flask
 from flask_cors import CORS
 
+from app.config.constants import USE_X_SENDFILE
+from app.response_encoding import FastJSONProvider, init_compression
+from app.services.export_engine import ExportJobManager
 from app.services.project_manager import ProjectManager
+from app.services.shot_manager import ShotManagerCache, release_shot_managers
 
 
 def create_app():
@@ -13,16 +17,24 @@ def create_app():
         format="%(asctime)s %(levelname)s %(name)s: %(message)s",
     )
     CORS(app)
+    app.json = FastJSONProvider(app)
+    init_compression(app)
+    app.config['USE_X_SENDFILE'] = USE_X_SENDFILE
 
     # Application-wide services
     app.config['PROJECT_MANAGER'] = ProjectManager()
-    app.config['SHOT_MANAGER_CACHE'] = {}
+    app.config['SHOT_MANAGER_CACHE'] = ShotManagerCache()
+    app.config['INGEST_SERVICES'] = {}
+    app.config['EXPORT_JOBS'] = ExportJobManager()
+    app.teardown_appcontext(release_shot_managers)
 
+    from app.routes.ingest_routes import ingest_bp
     from app.routes.project_routes import project_bp
     from app.routes.shot_routes import shot_bp
 
     # Register blueprints with appropriate prefixes
     app.register_blueprint(project_bp, url_prefix='/')
     app.register_blueprint(shot_bp, url_prefix="/api/shots")
+    app.register_blueprint(ingest_bp, url_prefix="/api/ingest")
 
     return app
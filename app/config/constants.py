@@ -8,6 +8,64 @@ PROJECTS_FILE = 'projects.json'
 ALLOWED_IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
 ALLOWED_VIDEO_EXTENSIONS = {'.mp4', '.mov'}
 
+# Content-addressed storage: version and final files become hard links into
+# <project>/.shotbuddy/objects. Byte-identical re-uploads to the same slot are
+# either skipped ("skip") or stored and flagged ("report").
+CONTENT_STORE_ENABLED = os.environ.get('SHOTBUDDY_CONTENT_STORE', '0').lower() in {'1', 'true', 'yes'}
+DUPLICATE_UPLOAD_POLICY = os.environ.get('SHOTBUDDY_DUPLICATE_UPLOADS', 'skip').lower()
+
+# Parallel file copies per export job
+EXPORT_WORKERS = int(os.environ.get('SHOTBUDDY_EXPORT_WORKERS', min(8, (os.cpu_count() or 1) * 2)))
+
+# Concurrent transcodes for export presets
+TRANSCODE_WORKERS = int(os.environ.get('SHOTBUDDY_TRANSCODE_WORKERS', os.cpu_count() or 1))
+
+# Upper bound for the review proxy cache in <project>/.shotbuddy/proxies
+PROXY_CACHE_MAX_BYTES = int(os.environ.get('SHOTBUDDY_PROXY_CACHE_MB', 2048)) * 1024 * 1024
+
+# Hand media files to a fronting web server (nginx/Apache X-Sendfile) so it
+# serves bodies and byte ranges with sendfile instead of Python
+USE_X_SENDFILE = os.environ.get('SHOTBUDDY_X_SENDFILE', '0').lower() in {'1', 'true', 'yes'}
+
+# Debounce for coalesced writes of projects.json and project_info.json
+# timestamps; pending writes are flushed at the latest after the max delay
+# and always at shutdown. 0 writes synchronously.
+METADATA_FLUSH_DELAY = float(os.environ.get('SHOTBUDDY_METADATA_FLUSH_SECONDS', 1.0))
+METADATA_FLUSH_MAX_DELAY = 5.0
+
+# Metadata writes are atomic; fsync them "batch"ed once per interval (default),
+# on "always" every write, or "off" to leave write-back to the OS
+FSYNC_MODE = os.environ.get('SHOTBUDDY_FSYNC', 'batch').lower()
+FSYNC_INTERVAL = int(os.environ.get('SHOTBUDDY_FSYNC_INTERVAL_MS', 500)) / 1000
+
+# Per-shot metadata in one shots/wip/<shot>/shot.json (see
+# app/services/shot_document.py). New shots get one when enabled; shots that
+# have one also keep the classic files up to date unless write-through is off.
+SHOT_DOCUMENTS_ENABLED = os.environ.get('SHOTBUDDY_SHOT_DOCUMENTS', '0').lower() in {'1', 'true', 'yes'}
+LEGACY_WRITE_THROUGH = os.environ.get('SHOTBUDDY_LEGACY_WRITE_THROUGH', '1').lower() in {'1', 'true', 'yes'}
+
+# Cache get_shot_info results keyed by the mtimes of each shot's folders and
+# files, persisted to .shotbuddy/shot_cache.json every SHOTBUDDY_SHOT_CACHE_FLUSH_SECONDS
+# and at shutdown so the first listing after a restart is served from it.
+# New media probe results are saved on the same schedule.
+SHOT_CACHE_ENABLED = os.environ.get('SHOTBUDDY_SHOT_CACHE', '1').lower() in {'1', 'true', 'yes'}
+SHOT_CACHE_FLUSH_DELAY = float(os.environ.get('SHOTBUDDY_SHOT_CACHE_FLUSH_SECONDS', 30))
+
+# Open projects kept in memory at once. The least recently used project is
+# dropped (after saving its caches) when either limit is exceeded
+SHOT_MANAGER_CACHE_SIZE = int(os.environ.get('SHOTBUDDY_PROJECT_CACHE_SIZE', 8))
+SHOT_MANAGER_CACHE_BYTES = int(os.environ.get('SHOTBUDDY_PROJECT_CACHE_MB', 256)) * 1024 * 1024
+
+# Compress JSON and HTML responses with zstd, brotli or gzip, whichever the
+# client accepts (zstd and brotli need the optional "fast" extra)
+COMPRESSION_ENABLED = os.environ.get('SHOTBUDDY_COMPRESSION', '1').lower() in {'1', 'true', 'yes'}
+
+# Seconds to wait for a shot or project lock held by another request or process
+LOCK_TIMEOUT = float(os.environ.get('SHOTBUDDY_LOCK_TIMEOUT', 30))
+
+# Number of recent metadata changes per project that can be undone
+UNDO_LIMIT = int(os.environ.get('SHOTBUDDY_UNDO_LIMIT', 200))
+
 # Central thumbnail cache location. Stored inside the application's static
 # directory so thumbnails persist across projects. The cache is cleared when
 # switching projects or the page is refreshed.
@@ -16,6 +74,17 @@ THUMBNAIL_CACHE_DIR = BASE_DIR / "static" / "thumbnails"
 # Default thumbnail resolution (width, height)
 THUMBNAIL_SIZE = (240, 180)
 
+def get_project_state_dir(project_path):
+    """
+    Return the per-project application state directory:
+      <project_path>/.shotbuddy
+
+    Ensures the directory exists.
+    """
+    p = Path(project_path) / ".shotbuddy"
+    p.mkdir(parents=True, exist_ok=True)
+    return p
+
 def get_project_thumbnail_cache_dir(project_path):
     """
     Return the per-project thumbnail cache directory:
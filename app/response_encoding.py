@@ -0,0 +1,127 @@
+"""Faster JSON serialisation and compressed responses.
+
+``FastJSONProvider`` serialises with `orjson <https://github.com/ijl/orjson>`_
+when it is installed and with the standard library otherwise; the output is
+the same JSON apart from non-ASCII text being sent as UTF-8 instead of
+``\\uXXXX`` escapes.
+
+``init_compression`` compresses JSON and HTML responses of at least
+``COMPRESSION_MIN_SIZE`` bytes with the best encoding the client lists in
+``Accept-Encoding``: zstd (``compression.zstd`` on Python 3.14+ or the
+``zstandard`` package), brotli (``brotli`` package) or gzip.  File responses
+(media, thumbnails, static files) are sent as they are.
+
+Install the optional packages with ``uv sync --extra fast``.
+"""
+
+import gzip
+import logging
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+from app.config.constants import COMPRESSION_ENABLED
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from compression import zstd
+
+    def _zstd_compress(data):
+        return zstd.compress(data, level=3)
+except ImportError:  # Python < 3.14
+    try:
+        import zstandard
+
+        def _zstd_compress(data):
+            # Compressor objects are not thread-safe, so one per response
+            return zstandard.ZstdCompressor(level=3).compress(data)
+    except ImportError:
+        _zstd_compress = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_MIN_SIZE = 1024
+_COMPRESSIBLE_TYPES = {'application/json', 'text/html'}
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider using orjson when available."""
+
+    def _orjson_option(self, indent):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        # Arguments orjson has no equivalent for go to the stdlib
+        if orjson is None or set(kwargs) - {'indent', 'separators'}:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._orjson_option(kwargs.get('indent'))).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        data = orjson.dumps(obj, default=self.default, option=self._orjson_option(indent))
+        return self._app.response_class(data + b"\n", mimetype=self.mimetype)
+
+
+# Server preference when the client accepts several with equal quality:
+# zstd and brotli at these levels are faster than gzip and compress better
+_ENCODERS = {}
+if _zstd_compress is not None:
+    _ENCODERS['zstd'] = _zstd_compress
+if brotli is not None:
+    _ENCODERS['br'] = lambda data: brotli.compress(data, quality=4)
+_ENCODERS['gzip'] = lambda data: gzip.compress(data, compresslevel=6)
+
+
+def negotiate_encoding(accept_encodings):
+    """Return the encoding to use for a request's ``Accept-Encoding`` or ``None``."""
+    best, best_quality = None, 0
+    for name in _ENCODERS:
+        quality = accept_encodings.quality(name)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def compress_response(response):
+    """``after_request`` hook compressing eligible responses."""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or 'Content-Encoding' in response.headers or response.mimetype not in _COMPRESSIBLE_TYPES):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    response.set_data(_ENCODERS[encoding](data))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app):
+    if COMPRESSION_ENABLED:
+        app.after_request(compress_response)
+    logger.debug("Response encodings: %s; JSON: %s", ", ".join(_ENCODERS), "orjson" if orjson else "json")
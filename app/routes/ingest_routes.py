@@ -0,0 +1,101 @@
+from pathlib import Path
+
+from flask import Blueprint, current_app, jsonify, request
+
+from app.services.ingest import (
+    find_ingest_service,
+    get_ingest_service,
+    load_ingest_config,
+    save_ingest_config,
+)
+
+ingest_bp = Blueprint('ingest', __name__)
+
+
+def _current_project_path():
+    project_manager = current_app.config['PROJECT_MANAGER']
+    project = project_manager.get_current_project()
+    return project["path"] if project else None
+
+
+@ingest_bp.route("/config", methods=["GET"])
+def get_ingest_config():
+    try:
+        project_path = _current_project_path()
+        if not project_path:
+            return jsonify({"success": False, "error": "No current project"}), 400
+        return jsonify({"success": True, "data": load_ingest_config(project_path)})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@ingest_bp.route("/config", methods=["POST"])
+def update_ingest_config():
+    """Save watch folders/rules and restart the watcher with the new settings."""
+    try:
+        data = request.get_json() or {}
+        project_path = _current_project_path()
+        if not project_path:
+            return jsonify({"success": False, "error": "No current project"}), 400
+
+        config = save_ingest_config(project_path, data)
+
+        services = current_app.config.setdefault('INGEST_SERVICES', {})
+        service = services.pop(str(Path(project_path).resolve()), None)
+        if service:
+            service.stop()
+        if config["enabled"] and config["folders"]:
+            get_ingest_service(current_app, project_path).start()
+
+        return jsonify({"success": True, "data": config})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@ingest_bp.route("/status", methods=["GET"])
+def get_ingest_status():
+    try:
+        project_path = _current_project_path()
+        if not project_path:
+            return jsonify({"success": False, "error": "No current project"}), 400
+        service = find_ingest_service(current_app, project_path)
+        if service is None:
+            # Nothing was started for this project; do not create a watcher to report that
+            config = load_ingest_config(project_path)
+            status = {"project": str(Path(project_path).resolve()), "running": False, "folders": config["folders"]}
+            return jsonify({"success": True, "data": status})
+        return jsonify({"success": True, "data": service.status()})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@ingest_bp.route("/start", methods=["POST"])
+def start_ingest():
+    try:
+        project_path = _current_project_path()
+        if not project_path:
+            return jsonify({"success": False, "error": "No current project"}), 400
+        service = get_ingest_service(current_app, project_path)
+        if not service.config["folders"]:
+            return jsonify({"success": False, "error": "No ingest folders configured"}), 400
+        service.start()
+        return jsonify({"success": True, "data": service.status()})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@ingest_bp.route("/stop", methods=["POST"])
+def stop_ingest():
+    try:
+        project_path = _current_project_path()
+        if not project_path:
+            return jsonify({"success": False, "error": "No current project"}), 400
+        service = find_ingest_service(current_app, project_path)
+        if service is None:
+            return jsonify({"success": True, "data": {"project": str(Path(project_path).resolve()), "running": False}})
+        service.stop()
+        return jsonify({"success": True, "data": service.status()})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
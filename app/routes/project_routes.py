@@ -5,6 +5,8 @@ from pathlib import Path
 
 from flask import Blueprint, current_app, jsonify, render_template, request
 
+from app.services.ingest import ensure_ingest_running
+from app.services.project_manager import PROJECT_COOKIE
 from app.services.shot_manager import clear_shot_manager_cache, get_shot_manager
 from app.utils import get_app_version
 
@@ -12,6 +14,12 @@ logger = logging.getLogger(__name__)
 
 project_bp = Blueprint('project', __name__)
 
+def _with_project_cookie(response, path_str):
+    """Make ``path_str`` the current project of this browser session."""
+    response.set_cookie(PROJECT_COOKIE, path_str, httponly=True, samesite='Lax')
+    return response
+
+
 @project_bp.route("/")
 def index():
     version = get_app_version()
@@ -21,7 +29,8 @@ def index():
 def get_current_project():
     try:
         project_manager = current_app.config['PROJECT_MANAGER']
-        project = project_manager.get_current_project()
+        # Page load: re-read project_info.json in case it was edited outside the app
+        project = project_manager.get_current_project(refresh=True)
         if project:
             project_path = Path(project["path"])
             path_str = str(project_path)
@@ -30,12 +39,13 @@ def get_current_project():
 
             if (not last_scanned or
                     folder_mtime > datetime.fromisoformat(last_scanned).timestamp()):
-                clear_shot_manager_cache()
+                clear_shot_manager_cache(project_path=path_str)
                 get_shot_manager(path_str).get_shots()
                 project_manager.projects.setdefault("last_scanned", {})[path_str] = (
                     datetime.fromtimestamp(folder_mtime).isoformat()
                 )
                 project_manager.save_projects()
+            ensure_ingest_running(current_app, path_str)
             return jsonify({"success": True, "data": project})
         return jsonify({"success": False, "error": "No current project"})
     except Exception as e:
@@ -100,6 +110,7 @@ def open_project():
         # Update project manager state
         path_str = str(project_path)
         project_manager.projects['current_project'] = path_str
+        project_manager.invalidate_project_context(path_str)
 
         # Always move the project to the front of recent projects
         recents = project_manager.projects.get('recent_projects', [])
@@ -112,15 +123,16 @@ def open_project():
         folder_mtime = project_path.stat().st_mtime
         if (not last_scanned or
                 folder_mtime > datetime.fromisoformat(last_scanned).timestamp()):
-            clear_shot_manager_cache()
+            clear_shot_manager_cache(project_path=path_str)
             shot_manager = get_shot_manager(path_str)
             shot_manager.get_shots()
             project_manager.projects.setdefault('last_scanned', {})[path_str] = (
                 datetime.fromtimestamp(folder_mtime).isoformat()
             )
         project_manager.save_projects()
+        ensure_ingest_running(current_app, path_str)
 
-        return jsonify({"success": True, "data": project_data})
+        return _with_project_cookie(jsonify({"success": True, "data": project_data}), path_str)
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -152,7 +164,7 @@ def create_project():
             "shots": []
         }
 
-        return jsonify({"success": True, "data": project_data})
+        return _with_project_cookie(jsonify({"success": True, "data": project_data}), project_data["path"])
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -4,11 +4,15 @@ import subprocess
 from datetime import datetime
 from pathlib import Path
 
-from flask import Blueprint, current_app, jsonify, request, send_file
+from flask import Blueprint, Response, current_app, jsonify, redirect, request, send_file
+from werkzeug.utils import secure_filename
 
 from app.config.constants import get_project_thumbnail_cache_dir
+from app.services.export_engine import stream_zip_export
+from app.services.export_presets import list_presets
 from app.services.file_handler import FileHandler
-from app.services.shot_manager import get_shot_manager
+from app.services.locks import ORDER_LOCK
+from app.services.shot_manager import BatchOperationError, compact_shot_info, get_shot_manager
 
 shot_bp = Blueprint('shot', __name__)
 
@@ -22,10 +26,28 @@ def get_shots():
 
         shot_manager = get_shot_manager(project["path"])
         shots = shot_manager.get_shots()
+        if request.args.get("compact") in {"1", "true"}:
+            # Paths relative to "root", without the legacy "image" alias
+            root = Path(project["path"]).resolve().as_posix()
+            shots = [compact_shot_info(shot, root) for shot in shots]
+            return jsonify({"success": True, "data": shots, "root": root})
         return jsonify({"success": True, "data": shots})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@shot_bp.route("/media-summary", methods=["GET"])
+def get_media_summary():
+    try:
+        project_manager = current_app.config['PROJECT_MANAGER']
+        project = project_manager.get_current_project()
+        if not project:
+            return jsonify({"success": False, "error": "No current project"}), 400
+
+        shot_manager = get_shot_manager(project["path"])
+        return jsonify({"success": True, "data": shot_manager.get_media_summary()})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @shot_bp.route("/", methods=["POST"])
 def create_shot():
     try:
@@ -35,10 +57,11 @@ def create_shot():
             return jsonify({"success": False, "error": "No current project"}), 400
 
         shot_manager = get_shot_manager(project["path"])
-        next_number = shot_manager.get_next_shot_number()
-        shot_name = f"SH{next_number:03d}"
+        with shot_manager.locks.project(ORDER_LOCK):
+            next_number = shot_manager.get_next_shot_number()
+            shot_name = f"SH{next_number:03d}"
 
-        shot_manager.create_shot_structure(shot_name)
+            shot_manager.create_shot_structure(shot_name)
         shot_info = shot_manager.get_shot_info(shot_name)
 
         # Update project timestamp after successful shot creation
@@ -199,6 +222,53 @@ def get_prompt_versions():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@shot_bp.route("/versions")
+def get_version_history():
+    """Every version of every slot of a shot, for the version picker."""
+    try:
+        shot_name = request.args.get("shot_name")
+        asset_type = request.args.get("asset_type")
+        if not shot_name:
+            return jsonify({"success": False, "error": "Shot name required"}), 400
+
+        project_manager = current_app.config['PROJECT_MANAGER']
+        project = project_manager.get_current_project()
+        if not project:
+            return jsonify({"success": False, "error": "No current project"}), 400
+
+        shot_manager = get_shot_manager(project["path"])
+        history = shot_manager.get_version_history(shot_name, asset_type)
+        return jsonify({"success": True, "data": history})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@shot_bp.route("/version-thumbnail")
+def get_version_thumbnail():
+    """Create a version's thumbnail on first request and redirect to it."""
+    try:
+        shot_name = request.args.get("shot_name")
+        asset_type = request.args.get("asset_type")
+        version = request.args.get("version", type=int)
+        if not shot_name or not asset_type or version is None:
+            return "Missing parameters", 400
+
+        project_manager = current_app.config['PROJECT_MANAGER']
+        project = project_manager.get_current_project()
+        if not project:
+            return "No current project", 400
+
+        shot_manager = get_shot_manager(project["path"])
+        url = shot_manager.get_version_thumbnail(shot_name, asset_type, version)
+        if not url:
+            return "Thumbnail not available", 404
+        return redirect(url)
+    except ValueError as e:
+        return str(e), 404
+    except Exception as e:
+        return str(e), 500
+
 @shot_bp.route("/rename", methods=["POST"])
 def rename_shot():
     try:
@@ -438,14 +508,196 @@ def archive_shot():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@shot_bp.route("/batch", methods=["POST"])
+def apply_batch():
+    """Apply several shot operations in order and return the affected shots.
+
+    Body: ``{"operations": [{"op": "archive", "shot_name": "SH010", "archived": true}, ...]}``
+    with ``op`` one of notes, caption, prompt, display_name, archive and
+    promote, each taking the fields of its single-shot route.  When an
+    operation fails while applying, the 400 response carries ``applied``,
+    the number of operations before it that took effect.  The batch is
+    undone as one step.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        operations = data.get("operations") if isinstance(data, dict) else None
+
+        if not operations or not isinstance(operations, list):
+            return jsonify({"success": False, "error": "Operations required"}), 400
+
+        project_manager = current_app.config['PROJECT_MANAGER']
+        project = project_manager.get_current_project()
+        if not project:
+            return jsonify({"success": False, "error": "No current project"}), 400
+
+        shot_manager = get_shot_manager(project["path"])
+        try:
+            affected = shot_manager.apply_batch(operations)
+        except BatchOperationError as e:
+            # The operations before the failed one were applied
+            if e.applied:
+                project_manager.update_project_timestamp(project["path"])
+            return jsonify({"success": False, "error": str(e), "applied": e.applied}), 400
+        project_manager.update_project_timestamp(project["path"])
+
+        return jsonify({"success": True, "data": shot_manager.get_shots_info(affected)})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@shot_bp.route("/history", methods=["GET"])
+def get_history():
+    try:
+        project_manager = current_app.config['PROJECT_MANAGER']
+        project = project_manager.get_current_project()
+        if not project:
+            return jsonify({"success": False, "error": "No current project"}), 400
+
+        limit = request.args.get("limit", 20, type=int)
+        shot_manager = get_shot_manager(project["path"])
+        return jsonify({"success": True, "data": shot_manager.journal.history(limit)})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+def _undo_redo(action):
+    try:
+        project_manager = current_app.config['PROJECT_MANAGER']
+        project = project_manager.get_current_project()
+        if not project:
+            return jsonify({"success": False, "error": "No current project"}), 400
+
+        shot_manager = get_shot_manager(project["path"])
+        entry = getattr(shot_manager, action)()
+        if entry is None:
+            return jsonify({"success": False, "error": f"Nothing to {action}"}), 400
+
+        project_manager.update_project_timestamp(project["path"])
+
+        return jsonify({"success": True, "data": entry})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@shot_bp.route("/undo", methods=["POST"])
+def undo():
+    return _undo_redo("undo")
+
+
+@shot_bp.route("/redo", methods=["POST"])
+def redo():
+    return _undo_redo("redo")
+
+
+def _create_export_job(data):
+    """Validate export options from a request body and return a job (not started)."""
+    export_name = data.get("export_name")
+    export_type = data.get("export_type", "all")
+    include_display_in_filename = data.get("include_display_in_filename", True)
+    include_metadata = data.get("include_metadata", True)
+    export_format = data.get("format", "folder")
+
+    if export_type not in ['images', 'videos', 'all']:
+        raise ValueError("Invalid export_type")
+    if export_format not in ['folder', 'zip']:
+        raise ValueError("Invalid format")
+
+    project_manager = current_app.config['PROJECT_MANAGER']
+    project = project_manager.get_current_project()
+    if not project:
+        raise ValueError("No current project")
+
+    shot_manager = get_shot_manager(project["path"])
+    return shot_manager.create_export_job(
+        export_name=export_name,
+        export_type=export_type,
+        include_display_in_filename=include_display_in_filename,
+        include_metadata=include_metadata,
+        export_format=export_format,
+        incremental=bool(data.get("incremental", False)),
+        preset=data.get("preset") or None
+    )
+
+
 @shot_bp.route("/export", methods=["POST"])
 def export_latest_assets():
     try:
-        data = request.get_json()
-        export_name = data.get("export_name")
-        export_type = data.get("export_type", "all")
-        include_display_in_filename = data.get("include_display_in_filename", True)
-        include_metadata = data.get("include_metadata", True)
+        data = request.get_json() or {}
+        job = _create_export_job(data)
+
+        # Refuse up front when the export cannot complete (pass force to override)
+        report = job.check()
+        if not report["ok"] and not data.get("force"):
+            return jsonify({"success": False, "error": "; ".join(report["errors"]), "data": report}), 409
+
+        # Background jobs return immediately; poll /export/jobs/<id> for progress
+        if data.get("background"):
+            current_app.config['EXPORT_JOBS'].start(job)
+            return jsonify({"success": True, "job_id": job.id, "export_path": str(job.export_dir)}), 202
+
+        export_path = job.run()
+        return jsonify({"success": True, "export_path": export_path, "data": job.progress()})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@shot_bp.route("/export/plan", methods=["POST"])
+def plan_export():
+    """Dry run: report sizes, conflicts, free space and duration without copying."""
+    try:
+        data = request.get_json() or {}
+        job = _create_export_job(data)
+        return jsonify({"success": True, "data": job.check()})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@shot_bp.route("/export/presets", methods=["GET"])
+def get_export_presets():
+    return jsonify({"success": True, "data": list_presets()})
+
+
+@shot_bp.route("/export/animatic", methods=["POST"])
+def export_animatic():
+    """Join the promoted videos of non-archived shots into one animatic file."""
+    try:
+        data = request.get_json() or {}
+        project_manager = current_app.config['PROJECT_MANAGER']
+        project = project_manager.get_current_project()
+        if not project:
+            return jsonify({"success": False, "error": "No current project"}), 400
+
+        shot_manager = get_shot_manager(project["path"])
+        job = shot_manager.create_animatic_job(export_name=data.get("export_name"))
+
+        if data.get("background"):
+            current_app.config['EXPORT_JOBS'].start(job)
+            return jsonify({"success": True, "job_id": job.id, "export_path": str(job.export_dir)}), 202
+
+        export_path = job.run()
+        return jsonify({"success": True, "export_path": export_path, "data": job.progress()})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@shot_bp.route("/export/zip", methods=["GET"])
+def stream_export_zip():
+    """Stream the export as a ZIP download without writing it to disk."""
+    try:
+        export_type = request.args.get("export_type", "all")
+        include_display_in_filename = request.args.get("include_display_in_filename", "1") != "0"
+        include_metadata = request.args.get("include_metadata", "1") != "0"
 
         if export_type not in ['images', 'videos', 'all']:
             return jsonify({"success": False, "error": "Invalid export_type"}), 400
@@ -456,45 +708,91 @@ def export_latest_assets():
             return jsonify({"success": False, "error": "No current project"}), 400
 
         shot_manager = get_shot_manager(project["path"])
-        export_path = shot_manager.export_latest_assets(
-            export_name=export_name,
-            export_type=export_type,
-            include_display_in_filename=include_display_in_filename,
-            include_metadata=include_metadata
-        )
-
-        return jsonify({"success": True, "export_path": export_path})
+        plan = shot_manager.plan_export(export_type, include_display_in_filename, include_metadata)
+        export_name = secure_filename(request.args.get("export_name") or "") or f"export_{plan['timestamp']}"
+
+        response = Response(stream_zip_export(plan, root=export_name), mimetype="application/zip")
+        response.headers["Content-Disposition"] = f'attachment; filename="{export_name}.zip"'
+        return response
     except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+
+@shot_bp.route("/export/jobs/<job_id>", methods=["GET"])
+def get_export_job(job_id):
+    job = current_app.config['EXPORT_JOBS'].get(job_id)
+    if not job:
+        return jsonify({"success": False, "error": "Export job not found"}), 404
+    return jsonify({"success": True, "data": job.progress()})
+
+
+@shot_bp.route("/export/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_export_job(job_id):
+    job = current_app.config['EXPORT_JOBS'].get(job_id)
+    if not job:
+        return jsonify({"success": False, "error": "Export job not found"}), 404
+    job.cancel()
+    return jsonify({"success": True, "data": job.progress()})
+
+def _send_media(file_path):
+    """Send a media file with Range support and strong validators.
+
+    The ETag changes whenever the promoted file is replaced (new inode, size
+    or mtime), so clients revalidate cheaply with ``no-cache`` and get 304s,
+    and seeking in a video issues plain 206 range responses.
+    """
+    st = file_path.stat()
+    resp = send_file(
+        str(file_path),
+        conditional=True,
+        etag=f"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}",
+        last_modified=st.st_mtime,
+        max_age=None,
+    )
+    resp.headers["Content-Disposition"] = f'inline; filename="{file_path.name}"'
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
 @shot_bp.route("/video/<shot_name>")
 def serve_video(shot_name):
-    """Serve the promoted video file for a shot from latest_videos directory."""
+    """Serve the promoted video of a shot (or a lipsync part via ``?asset=``).
+
+    The review proxy is served when one is ready; ``?quality=master`` always
+    returns the original file.
+    """
     try:
+        asset = request.args.get("asset", "video")
+        if asset not in ['video', 'driver', 'target', 'result']:
+            return "Invalid asset type", 400
+
         project_manager = current_app.config['PROJECT_MANAGER']
         project = project_manager.get_current_project()
         if not project:
             return "No current project", 400
 
         shot_manager = get_shot_manager(project["path"])
-        shot_info = shot_manager.get_shot_info(shot_name)
-        
-        # Get the promoted video file path
-        video_path = shot_info['video']['file']
-        if not video_path:
+        video_file = shot_manager.resolve_promoted_file(shot_name, asset)
+        if not video_file:
             return "No video found for this shot", 404
-            
-        video_file = Path(video_path)
-        if not video_file.exists():
-            return "Video file not found", 404
-            
-        # Serve the video file with proper headers
-        resp = send_file(str(video_file))
-        resp.headers["Content-Disposition"] = f'inline; filename="{video_file.name}"'
-        resp.headers["Cache-Control"] = "public, max-age=3600"
+
+        if request.args.get("quality") != "master":
+            proxy = shot_manager.proxies.lookup(video_file)
+            if proxy:
+                resp = _send_media(proxy)
+                resp.headers["Content-Disposition"] = f'inline; filename="{video_file.stem}_proxy.mp4"'
+                resp.headers["X-Shotbuddy-Variant"] = "proxy"
+                return resp
+
+        resp = _send_media(video_file)
+        resp.headers["X-Shotbuddy-Variant"] = "master"
         return resp
+    except FileNotFoundError:
+        return "Video file not found", 404
+    except ValueError as e:
+        return str(e), 400
     except Exception as e:
         return str(e), 500
 
@@ -502,32 +800,25 @@ def serve_video(shot_name):
 def serve_image(shot_name, asset_type):
     """Serve the promoted image file for a shot from latest_images directory."""
     try:
+        # Validate asset type
+        if asset_type not in ['first_image', 'last_image']:
+            return "Invalid asset type", 400
+
         project_manager = current_app.config['PROJECT_MANAGER']
         project = project_manager.get_current_project()
         if not project:
             return "No current project", 400
 
         shot_manager = get_shot_manager(project["path"])
-        shot_info = shot_manager.get_shot_info(shot_name)
-        
-        # Validate asset type
-        if asset_type not in ['first_image', 'last_image']:
-            return "Invalid asset type", 400
-            
-        # Get the promoted image file path
-        image_path = shot_info[asset_type]['file']
-        if not image_path:
+        image_file = shot_manager.resolve_promoted_file(shot_name, asset_type)
+        if not image_file:
             return f"No {asset_type} found for this shot", 404
-            
-        image_file = Path(image_path)
-        if not image_file.exists():
-            return "Image file not found", 404
-            
-        # Serve the image file with proper headers
-        resp = send_file(str(image_file))
-        resp.headers["Content-Disposition"] = f'inline; filename="{image_file.name}"'
-        resp.headers["Cache-Control"] = "public, max-age=3600"
-        return resp
+
+        return _send_media(image_file)
+    except FileNotFoundError:
+        return "Image file not found", 404
+    except ValueError as e:
+        return str(e), 400
     except Exception as e:
         return str(e), 500
 
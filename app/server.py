@@ -0,0 +1,150 @@
+"""Production WSGI server for Shotbuddy.
+
+Waitress is used when installed (``uv sync --extra server``).  Otherwise a
+thread-pooled variant of Werkzeug's server is used, which honours the same
+thread and connection limits.  Both stop accepting connections on SIGINT or
+SIGTERM, let in-flight requests finish for up to ``shutdown_timeout`` seconds
+and then stop the application's background services.
+"""
+
+import logging
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer
+
+from app.services.atomic_io import commit_pending
+
+logger = logging.getLogger(__name__)
+
+# Sent by the built-in server when every connection slot is taken
+BUSY_RESPONSE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Retry-After: 1\r\n"
+    b"Content-Length: 0\r\n"
+    b"Connection: close\r\n\r\n"
+)
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def shutdown_services(app):
+    """Stop background threads owned by the app and flush pending writes."""
+    for service in list(app.config.get('INGEST_SERVICES', {}).values()):
+        try:
+            service.stop()
+        except Exception:
+            logger.exception("Error stopping ingest service")
+    jobs = app.config.get('EXPORT_JOBS')
+    if jobs is not None:
+        jobs.cancel_all()
+    project_manager = app.config.get('PROJECT_MANAGER')
+    if project_manager is not None:
+        project_manager.flush()
+    for manager in app.config.get('SHOT_MANAGER_CACHE', {}).values():
+        try:
+            manager.close()
+        except Exception:
+            logger.exception("Error saving shot manager state")
+    commit_pending()
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server dispatching requests to a bounded thread pool.
+
+    At most ``connection_limit`` connections are queued or being handled at
+    once.  The accept loop never waits for a slot: a connection arriving
+    while all slots are taken is answered with ``503`` and ``Retry-After``.
+    """
+
+    def __init__(self, host, port, app, threads, connection_limit):
+        super().__init__(host, port, app)
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="http")
+        self._slots = threading.BoundedSemaphore(connection_limit)
+        self._active = 0
+        self._active_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(blocking=False):
+            self._reject(request)
+            return
+        with self._active_lock:
+            self._active += 1
+        self._pool.submit(self._handle, request, client_address)
+
+    def _reject(self, request):
+        try:
+            request.sendall(BUSY_RESPONSE)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self._active_lock:
+                self._active -= 1
+            self._slots.release()
+
+    def drain(self, timeout):
+        """Wait up to ``timeout`` seconds for in-flight requests to finish."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._active_lock:
+                if not self._active:
+                    break
+            time.sleep(0.1)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def serve(app, settings):
+    """Run ``app`` with the production server until interrupted."""
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    host, port = settings['host'], settings['port']
+    try:
+        from waitress import create_server
+    except ImportError:
+        create_server = None
+
+    if create_server is not None:
+        server = create_server(
+            app,
+            host=host,
+            port=port,
+            threads=settings['threads'],
+            connection_limit=settings['connection_limit'],
+            max_request_body_size=settings['max_content_length'],
+            channel_timeout=settings['channel_timeout'],
+        )
+        logger.info("Serving on http://%s:%s with waitress (%d threads)", host, port, settings['threads'])
+        try:
+            server.run()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            logger.info("Shutting down; waiting up to %ss for requests", settings['shutdown_timeout'])
+            server.task_dispatcher.shutdown(cancel_pending=False, timeout=settings['shutdown_timeout'])
+            server.close()
+            shutdown_services(app)
+        return
+
+    logger.warning("waitress is not installed; using the built-in threaded server")
+    server = PooledWSGIServer(host, port, app, settings['threads'], settings['connection_limit'])
+    logger.info("Serving on http://%s:%s (%d threads)", host, port, settings['threads'])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info("Shutting down; waiting up to %ss for requests", settings['shutdown_timeout'])
+        server.server_close()
+        server.drain(settings['shutdown_timeout'])
+        shutdown_services(app)
@@ -0,0 +1,232 @@
+"""Animatic assembly from the promoted shot videos.
+
+The promoted videos of the non-archived shots are joined, in shot order, with
+ffmpeg's concat demuxer and ``-c copy``.  The most common stream format
+(codec, resolution, frame rate, audio codec) among the clips is the target;
+clips that already match are used as they are and only the others are
+re-encoded.  Re-encoded segments are cached in ``.shotbuddy/animatic`` under
+a key of source path, size, mtime and target format, so a new animatic after
+one shot changed only re-encodes that shot.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+from collections import Counter
+from pathlib import Path
+
+from app.config.constants import get_project_state_dir
+from app.services.export_engine import ExportCancelled, ExportJob
+
+logger = logging.getLogger(__name__)
+
+ANIMATIC_CACHE_DIR = "animatic"
+
+VIDEO_ENCODERS = {
+    "h264": ["-c:v", "libx264", "-preset", "veryfast", "-crf", "18"],
+    "hevc": ["-c:v", "libx265", "-preset", "fast", "-crf", "20", "-tag:v", "hvc1"],
+    "prores": ["-c:v", "prores_ks", "-profile:v", "2"],
+    "mpeg4": ["-c:v", "mpeg4", "-q:v", "2"],
+}
+
+# Pixel format used when the target's is unknown
+DEFAULT_PIX_FMTS = {
+    "h264": "yuv420p",
+    "hevc": "yuv420p",
+    "prores": "yuv422p10le",
+    "mpeg4": "yuv420p",
+}
+
+DEFAULT_SAMPLE_RATE = 48000
+DEFAULT_CHANNELS = 2
+
+AUDIO_ENCODERS = {
+    "aac": "aac",
+    "opus": "libopus",
+    "ac3": "ac3",
+    "pcm": "pcm_s16le",
+    "pcm_s16le": "pcm_s16le",
+    "pcm_s16be": "pcm_s16be",
+}
+
+
+def require_ffmpeg():
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        raise ValueError("ffmpeg not found; cannot build animatic")
+    return ffmpeg
+
+
+def stream_signature(info):
+    """Return the stream parameters that must agree for concat stream copy."""
+    if not info or not info.get("codec") or not info.get("width") or not info.get("fps"):
+        return None
+    if info.get("has_audio"):
+        audio = (info.get("audio_codec"), info.get("sample_rate"), info.get("channels"))
+    else:
+        audio = (None, None, None)
+    return (info["codec"], info["width"], info["height"], round(info["fps"], 2), info.get("pix_fmt"), *audio)
+
+
+def choose_target(signatures):
+    """Return the most common signature, made encodable if necessary.
+
+    Unknown fields are filled with defaults, so clips whose format could not
+    be fully probed are re-encoded rather than stream-copied.
+    """
+    counts = Counter(sig for sig in signatures if sig)
+    if not counts:
+        raise ValueError("None of the shot videos could be probed")
+    codec, width, height, fps, pix_fmt, audio, sample_rate, channels = counts.most_common(1)[0][0]
+    if codec not in VIDEO_ENCODERS:
+        codec, pix_fmt = "h264", None
+    pix_fmt = pix_fmt or DEFAULT_PIX_FMTS[codec]
+    if audio:
+        if audio not in AUDIO_ENCODERS:
+            audio = "aac"
+        sample_rate = sample_rate or DEFAULT_SAMPLE_RATE
+        channels = channels or DEFAULT_CHANNELS
+    return (codec, width, height, fps, pix_fmt, audio, sample_rate, channels)
+
+
+def _segment_key(item, target):
+    raw = f"{item['src']}|{item['size']}|{item['mtime_ns']}|{target}"
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=10).hexdigest()
+
+
+def _container_suffix(target):
+    codec, audio = target[0], target[5]
+    return ".mov" if codec == "prores" or (audio or "").startswith("pcm") else ".mp4"
+
+
+def normalize_command(ffmpeg, src, dst, target, src_has_audio):
+    """Return the ffmpeg command re-encoding ``src`` to the target format."""
+    codec, width, height, fps, pix_fmt, audio, sample_rate, channels = target
+    vf = (
+        f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={fps}"
+    )
+    cmd = [ffmpeg, "-y", "-v", "error", "-i", str(src)]
+    if audio and not src_has_audio:
+        # Silent track so the segment still concatenates with the others
+        cmd += ["-f", "lavfi", "-i", f"anullsrc=channel_layout=stereo:sample_rate={sample_rate}"]
+    cmd += ["-map", "0:v:0"]
+    if audio:
+        cmd += ["-map", "0:a:0" if src_has_audio else "1:a:0", "-c:a", AUDIO_ENCODERS[audio],
+                "-ar", str(sample_rate), "-ac", str(channels), "-shortest"]
+    else:
+        cmd += ["-an"]
+    cmd += ["-vf", vf, *VIDEO_ENCODERS[codec], "-pix_fmt", pix_fmt, "-movflags", "+faststart", str(dst)]
+    return cmd
+
+
+def _concat_line(path):
+    escaped = str(path).replace("'", "'\\''")
+    return f"file '{escaped}'\n"
+
+
+class AnimaticJob(ExportJob):
+    """Concatenate the video items of an export plan into one file."""
+
+    def __init__(self, plan, output_path, project_path, media_probe):
+        super().__init__(plan, output_path, workers=1)
+        self.cache_dir = get_project_state_dir(project_path) / ANIMATIC_CACHE_DIR
+        self.media_probe = media_probe
+        self.segments_reencoded = 0
+
+    @property
+    def mode(self):
+        # Encode time dominates, so copy throughput says nothing about it
+        return None
+
+    def progress(self):
+        data = super().progress()
+        data["segments_reencoded"] = self.segments_reencoded
+        return data
+
+    def _execute(self):
+        ffmpeg = require_ffmpeg()
+        items = self.plan["items"]
+        if not items:
+            raise ValueError("No promoted shot videos to assemble")
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        infos = [self.media_probe.get(item["src"]) for item in items]
+        target = choose_target(stream_signature(info) for info in infos)
+
+        segments = []
+        used = set()
+        for item, info in zip(items, infos):
+            if self._cancel.is_set():
+                raise ExportCancelled()
+            if stream_signature(info) == target:
+                segments.append(Path(item["src"]))
+            else:
+                segment = self.cache_dir / f"{_segment_key(item, target)}{_container_suffix(target)}"
+                used.add(segment.name)
+                if not segment.exists():
+                    self._normalize(ffmpeg, item, info, segment, target)
+                segments.append(segment)
+            with self._lock:
+                self.files_done += 1
+                self.bytes_done += item["size"]
+
+        self._prune_cache(used)
+        self._concat(ffmpeg, segments)
+
+    def _normalize(self, ffmpeg, item, info, segment, target):
+        logger.info("Re-encoding %s for animatic", item["src"])
+        with self._lock:
+            self.current[item["dst"]] = item["dst"]
+        tmp = segment.with_name(f".{segment.stem}.partial{segment.suffix}")
+        try:
+            cmd = normalize_command(ffmpeg, item["src"], tmp, target, bool(info and info.get("has_audio")))
+            subprocess.run(cmd, check=True, capture_output=True, shell=False)  # noqa: S603
+            os.replace(tmp, segment)
+            self.segments_reencoded += 1
+        except subprocess.CalledProcessError as e:
+            message = e.stderr.decode("utf-8", "replace").strip() or str(e)
+            with self._lock:
+                self.errors.append({"file": item["dst"], "error": message})
+            raise RuntimeError(f"Failed to re-encode {item['shot']}: {message}") from e
+        finally:
+            tmp.unlink(missing_ok=True)
+            with self._lock:
+                self.current.pop(item["dst"], None)
+
+    def _concat(self, ffmpeg, segments):
+        self.export_dir.parent.mkdir(parents=True, exist_ok=True)
+        list_path = self.cache_dir / f"concat_{self.id}.txt"
+        tmp = self.export_dir.with_name(f".{self.export_dir.stem}.partial{self.export_dir.suffix}")
+        try:
+            with open(list_path, "w", encoding="utf-8") as f:
+                f.writelines(_concat_line(p.resolve()) for p in segments)
+            cmd = [ffmpeg, "-y", "-v", "error", "-f", "concat", "-safe", "0", "-i", str(list_path),
+                   "-c", "copy", "-movflags", "+faststart", str(tmp)]
+            result = subprocess.run(cmd, capture_output=True, shell=False)  # noqa: S603
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.decode("utf-8", "replace").strip() or "ffmpeg concat failed")
+            os.replace(tmp, self.export_dir)
+        finally:
+            list_path.unlink(missing_ok=True)
+            tmp.unlink(missing_ok=True)
+
+    def _prune_cache(self, used):
+        """Remove cached segments no longer needed by the current shots."""
+        for path in self.cache_dir.iterdir():
+            if path.suffix in {".mp4", ".mov"} and path.name not in used and not path.name.startswith("."):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+
+def animatic_suffix(plan, media_probe):
+    """Return the container suffix the animatic of ``plan`` will use."""
+    try:
+        infos = [media_probe.get(item["src"]) for item in plan["items"]]
+        return _container_suffix(choose_target(stream_signature(info) for info in infos))
+    except ValueError:
+        return ".mp4"
@@ -0,0 +1,142 @@
+"""Crash-safe writes for metadata files with batched fsync.
+
+Every write goes to a uniquely named temp file in the target's directory and
+is moved into place with ``os.replace``, so readers and crashes see either
+the old or the new file, never a truncated one.
+
+Durability is controlled by ``SHOTBUDDY_FSYNC``:
+
+``batch`` (default)
+    The rename happens immediately; a background committer fsyncs the
+    written files and their directories once per
+    ``SHOTBUDDY_FSYNC_INTERVAL_MS``.  Many writes to the same file in that
+    window cost one fsync, so a request per keystroke does not mean an fsync
+    per keystroke.  A power loss can lose at most the last interval.
+``always``
+    Each write fsyncs the file before and the directory after the rename.
+``off``
+    No fsync; the OS writes the data back on its own schedule.
+
+Callers that must not lose a write pass ``durable=True``.  Pending batched
+fsyncs are committed at interpreter exit and by
+:func:`app.server.shutdown_services` via :func:`commit_pending`.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+
+from app.config.constants import FSYNC_INTERVAL, FSYNC_MODE
+
+logger = logging.getLogger(__name__)
+
+
+def _fsync_path(path, directory=False):
+    if directory and not hasattr(os, 'O_DIRECTORY'):
+        # Directories cannot be opened for fsync on Windows
+        return
+    flags = os.O_RDONLY | os.O_DIRECTORY if directory else os.O_RDWR
+    try:
+        fd = os.open(path, flags)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class _GroupCommitter:
+    """Fsync recently written files together on a fixed interval."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._pending = set()
+        self._cond = threading.Condition()
+        self._commit_lock = threading.Lock()
+        self._thread = None
+
+    def add(self, path):
+        with self._cond:
+            self._pending.add(str(path))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="fsync-committer", daemon=True)
+                self._thread.start()
+
+    def commit(self):
+        with self._commit_lock:
+            with self._cond:
+                paths, self._pending = self._pending, set()
+            if not paths:
+                return
+            for path in paths:
+                _fsync_path(path)
+            for parent in {os.path.dirname(p) for p in paths}:
+                _fsync_path(parent, directory=True)
+            logger.debug("Committed %d metadata file(s)", len(paths))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait(timeout=self.interval)
+                if not self._pending:
+                    self._thread = None
+                    return
+            self.commit()
+
+
+_committer = _GroupCommitter(FSYNC_INTERVAL)
+atexit.register(_committer.commit)
+
+
+def commit_pending():
+    """Fsync all batched writes now."""
+    _committer.commit()
+
+
+def sync_appended(f, path):
+    """Make an append to the open file ``f`` durable per ``SHOTBUDDY_FSYNC``."""
+    if FSYNC_MODE == 'always':
+        f.flush()
+        os.fsync(f.fileno())
+    elif FSYNC_MODE == 'batch':
+        _committer.add(path)
+
+
+def atomic_write_bytes(path, data, durable=False):
+    """Replace ``path`` with ``data`` atomically."""
+    path = Path(path)
+    sync_now = durable or FSYNC_MODE == 'always'
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            if sync_now:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    if sync_now:
+        _fsync_path(path.parent, directory=True)
+    elif FSYNC_MODE == 'batch':
+        _committer.add(path)
+
+
+def atomic_write_text(path, text, encoding='utf-8', durable=False):
+    """Replace ``path`` with ``text`` atomically."""
+    atomic_write_bytes(path, text.encode(encoding), durable=durable)
+
+
+def atomic_write_json(path, data, durable=False, **dump_kwargs):
+    """Replace ``path`` with ``data`` serialised as JSON atomically.
+
+    ``dump_kwargs`` are passed to :func:`json.dumps` (e.g. ``indent``).
+    """
+    atomic_write_text(path, json.dumps(data, **dump_kwargs), durable=durable)
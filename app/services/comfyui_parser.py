@@ -0,0 +1,325 @@
+"""Graph-aware parsing of ComfyUI prompts embedded in generated images.
+
+ComfyUI embeds two JSON documents: the API ``prompt`` (``{id: {class_type,
+inputs}}``) and the UI ``workflow`` (``{nodes: [...], links: [...]}``).  Both
+are normalised into the API form, then the sampler's ``positive`` and
+``negative`` inputs are followed back through conditioning nodes to the text
+encoders that actually feed the render.
+
+Parsing a multi-MB workflow is not free and a batch of renders embeds the
+same JSON hundreds of times, so results are cached by a digest of the text.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Number of parsed workflows kept in memory
+CACHE_SIZE = 256
+
+# Widget names for UI-format nodes, whose ``widgets_values`` are positional.
+WIDGET_NAMES = {
+    "CLIPTextEncode": ["text"],
+    "CLIPTextEncodeSDXL": ["width", "height", "crop_w", "crop_h", "target_width", "target_height", "text_g", "text_l"],
+    "CLIPTextEncodeSDXLRefiner": ["ascore", "width", "height", "text"],
+    "CLIPTextEncodeFlux": ["clip_l", "t5xxl", "guidance"],
+    "CLIPTextEncodeSD3": ["clip_l", "clip_g", "t5xxl", "empty_padding"],
+    "CLIPTextEncodeHunyuanDiT": ["bert", "mt5xl"],
+    "CLIPTextEncodeLumina2": ["system_prompt", "user_prompt"],
+    "TextEncodeHunyuanVideo_ImageToVideo": ["prompt", "image_interleave"],
+    "CLIPTextEncodePixArtAlpha": ["width", "height", "text"],
+    "PrimitiveNode": ["value"],
+    "PrimitiveString": ["value"],
+    "PrimitiveStringMultiline": ["value"],
+    "String Literal": ["string"],
+    "Text Multiline": ["text"],
+    "StringConcatenate": ["string_a", "string_b", "delimiter"],
+}
+
+# Input names that carry prompt text, in order of preference
+TEXT_INPUTS = [
+    "text", "text_g", "t5xxl", "clip_l", "text_l", "clip_g", "user_prompt",
+    "prompt", "positive_prompt", "mt5xl", "bert", "string", "value",
+]
+
+# Sampler/guider inputs holding the positive and negative conditioning
+POSITIVE_INPUTS = ["positive", "cond1", "conditioning"]
+NEGATIVE_INPUTS = ["negative"]
+
+# Conditioning nodes that output an empty conditioning
+ZERO_CONDITIONING = {"ConditioningZeroOut"}
+
+# Node modes that take a node out of the graph (muted, bypassed)
+_INACTIVE_MODES = {2, 4}
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def parse_comfyui_prompt(json_text):
+    """Return ``{'prompt', 'negative_prompt'}`` for a ComfyUI JSON string or ``None``."""
+    if isinstance(json_text, bytes):
+        raw = json_text
+    else:
+        raw = str(json_text).encode("utf-8", errors="surrogatepass")
+    key = hashlib.blake2b(raw, digest_size=16).digest()
+
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            result = _cache[key]
+            return dict(result) if result else None
+
+    result = _parse_uncached(json_text)
+
+    with _cache_lock:
+        _cache[key] = result
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return dict(result) if result else None
+
+
+def clear_cache():
+    """Drop all cached parse results."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def _parse_uncached(json_text):
+    try:
+        data = json.loads(json_text)
+    except Exception as e:
+        logger.warning("Failed to parse ComfyUI JSON: %s", e)
+        return None
+
+    if not isinstance(data, dict):
+        return None
+
+    graph = _normalize_graph(data)
+    if not graph:
+        return None
+
+    result = _trace_samplers(graph)
+    if result is None:
+        # No sampler wired to a text encoder; fall back to the first encoders
+        result = _first_encoders(graph)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Graph normalisation
+# ---------------------------------------------------------------------------
+
+def _normalize_graph(data):
+    """Return ``{node_id: {'class_type', 'inputs', 'mode'}}`` for either format."""
+    if isinstance(data.get("workflow"), dict):
+        data = data["workflow"]
+
+    nodes = data.get("nodes")
+    if isinstance(nodes, list):
+        return _normalize_ui_workflow(nodes, data.get("links") or [])
+
+    graph = {}
+    for node_id, node in data.items():
+        if isinstance(node, dict) and isinstance(node.get("class_type"), str):
+            graph[str(node_id)] = {
+                "class_type": node["class_type"],
+                "inputs": node.get("inputs") if isinstance(node.get("inputs"), dict) else {},
+                "mode": 0,
+            }
+    return graph
+
+
+def _normalize_ui_workflow(nodes, links):
+    """Convert the UI ``nodes``/``links`` form into the API form."""
+    link_sources = {}
+    for link in links:
+        if isinstance(link, list) and len(link) >= 3:
+            link_sources[link[0]] = (str(link[1]), link[2])
+        elif isinstance(link, dict) and "id" in link:
+            link_sources[link["id"]] = (str(link.get("origin_id")), link.get("origin_slot", 0))
+
+    graph = {}
+    for node in nodes:
+        if not isinstance(node, dict) or "id" not in node:
+            continue
+        class_type = node.get("type") or node.get("class_type")
+        if not isinstance(class_type, str):
+            continue
+        inputs = {}
+        widgets = node.get("widgets_values")
+        if isinstance(widgets, dict):
+            inputs.update(widgets)
+        elif isinstance(widgets, list):
+            names = WIDGET_NAMES.get(class_type)
+            if names:
+                for name, value in zip(names, widgets, strict=False):
+                    inputs[name] = value
+            else:
+                inputs["_widgets"] = widgets
+        for slot in node.get("inputs") or []:
+            if not isinstance(slot, dict):
+                continue
+            link_id = slot.get("link")
+            if link_id is not None and link_id in link_sources:
+                inputs[slot.get("name")] = list(link_sources[link_id])
+        graph[str(node["id"])] = {
+            "class_type": class_type,
+            "inputs": inputs,
+            "mode": node.get("mode", 0),
+        }
+    return graph
+
+
+# ---------------------------------------------------------------------------
+# Traversal
+# ---------------------------------------------------------------------------
+
+def _is_link(value):
+    return isinstance(value, list) and len(value) == 2 and isinstance(value[0], (str, int))
+
+
+def _is_sampler(node):
+    class_type = node["class_type"]
+    if node.get("mode") in _INACTIVE_MODES:
+        return False
+    if "Sampler" not in class_type and "Guider" not in class_type:
+        return False
+    inputs = node["inputs"]
+    return any(_is_link(inputs.get(name)) for name in POSITIVE_INPUTS + ["guider"])
+
+
+def _sort_key(node_id):
+    try:
+        return (0, int(node_id), "")
+    except ValueError:
+        return (1, 0, node_id)
+
+
+def _trace_samplers(graph):
+    """Follow each sampler's conditioning back to its text encoders."""
+    for node_id in sorted(graph, key=_sort_key):
+        node = graph[node_id]
+        if not _is_sampler(node):
+            continue
+        inputs = node["inputs"]
+        # SamplerCustomAdvanced takes its conditioning from a guider node
+        guider = inputs.get("guider")
+        if _is_link(guider) and str(guider[0]) in graph:
+            inputs = graph[str(guider[0])]["inputs"]
+
+        positive = _trace_inputs(graph, inputs, POSITIVE_INPUTS)
+        negative = _trace_inputs(graph, inputs, NEGATIVE_INPUTS)
+        if positive:
+            return {"prompt": positive, "negative_prompt": negative or ""}
+    return None
+
+
+def _trace_inputs(graph, inputs, names):
+    for name in names:
+        value = inputs.get(name)
+        if _is_link(value):
+            texts = _collect_texts(graph, str(value[0]), value[1], set())
+            return "\n".join(texts)
+    return None
+
+
+def _collect_texts(graph, node_id, slot, visiting):
+    """Return prompt texts reachable from a conditioning output."""
+    if node_id in visiting or node_id not in graph:
+        return []
+    visiting = visiting | {node_id}
+    node = graph[node_id]
+    class_type = node["class_type"]
+    inputs = node["inputs"]
+
+    if class_type in ZERO_CONDITIONING or node.get("mode") == 2:
+        return []
+
+    text = _encoder_text(graph, node)
+    if text is not None:
+        return [text] if text else []
+
+    # Nodes with separate positive/negative outputs (ControlNetApplyAdvanced,
+    # InstructPixToPixConditioning, image-to-video conditioning, ...)
+    if _is_link(inputs.get("positive")) and _is_link(inputs.get("negative")):
+        name = "negative" if slot == 1 else "positive"
+        link = inputs[name]
+        return _collect_texts(graph, str(link[0]), link[1], visiting)
+
+    texts = []
+    for name, value in inputs.items():
+        if not _is_link(value):
+            continue
+        if "conditioning" in name or class_type == "Reroute" or node.get("mode") == 4:
+            for text in _collect_texts(graph, str(value[0]), value[1], visiting):
+                if text not in texts:
+                    texts.append(text)
+    return texts
+
+
+def _is_encoder(class_type):
+    return "TextEncode" in class_type or "CLIPText" in class_type
+
+
+def _encoder_text(graph, node):
+    """Return the prompt text of a text-encode node, or ``None`` for other nodes."""
+    if not _is_encoder(node["class_type"]):
+        return None
+    inputs = node["inputs"]
+    for name in TEXT_INPUTS:
+        text = _resolve_string(graph, inputs.get(name), set())
+        if text:
+            return text
+    widgets = inputs.get("_widgets")
+    if isinstance(widgets, list):
+        strings = [w for w in widgets if isinstance(w, str)]
+        if strings:
+            return max(strings, key=len)
+    return ""
+
+
+def _resolve_string(graph, value, visiting):
+    """Resolve a literal or a link to a primitive/string node into text."""
+    if isinstance(value, str):
+        return value
+    if not _is_link(value):
+        return None
+    node_id = str(value[0])
+    if node_id in visiting or node_id not in graph:
+        return None
+    visiting = visiting | {node_id}
+    node = graph[node_id]
+    inputs = node["inputs"]
+    if node["class_type"] == "StringConcatenate":
+        a = _resolve_string(graph, inputs.get("string_a"), visiting) or ""
+        b = _resolve_string(graph, inputs.get("string_b"), visiting) or ""
+        delimiter = inputs.get("delimiter") if isinstance(inputs.get("delimiter"), str) else ""
+        return delimiter.join(part for part in (a, b) if part)
+    for name in TEXT_INPUTS:
+        text = _resolve_string(graph, inputs.get(name), visiting)
+        if text:
+            return text
+    widgets = inputs.get("_widgets")
+    if isinstance(widgets, list) and widgets and isinstance(widgets[0], str):
+        return widgets[0]
+    return None
+
+
+def _first_encoders(graph):
+    """Legacy behaviour: take the first two text encoders in node order."""
+    texts = []
+    for node_id in sorted(graph, key=_sort_key):
+        text = _encoder_text(graph, graph[node_id])
+        if text:
+            texts.append(text)
+        if len(texts) == 2:
+            break
+    if not texts:
+        return None
+    return {"prompt": texts[0], "negative_prompt": texts[1] if len(texts) > 1 else ""}
@@ -0,0 +1,275 @@
+"""Content-addressed storage for shot media.
+
+When enabled (``SHOTBUDDY_CONTENT_STORE=1``) uploads are streamed into
+``.shotbuddy/objects/<aa>/<sha256><ext>`` while their SHA-256 is computed.
+WIP version files then become hard links to that object, so the same render
+uploaded to several shots, or re-uploaded as a new version, occupies disk
+space once.  Where hard links are unavailable (different volume, unsupported
+filesystem) files are copied as before.
+
+``latest_*`` finals are handed to editors and other tools, which may edit them
+in place, so they are never hard links: they are reflinked (copy-on-write)
+where the filesystem supports it and copied otherwise.
+
+``objects/index.json`` maps each digest to the version files placed from it,
+with their size and mtime, so duplicate detection never re-hashes files.
+
+Run ``python -m app.services.content_store dedupe <project>`` to convert an
+existing project.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+from app.config.constants import (
+    ALLOWED_IMAGE_EXTENSIONS,
+    ALLOWED_VIDEO_EXTENSIONS,
+    CONTENT_STORE_ENABLED,
+    get_project_state_dir,
+)
+from app.services.atomic_io import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+# Version files end in _v001 etc.; everything else is a final
+VERSION_STEM = re.compile(r"_v\d+$")
+
+# ioctl request number for FICLONE on Linux
+FICLONE = 0x40049409
+
+# Serialises read-modify-write of index.json between ContentStore instances
+_INDEX_LOCK = threading.Lock()
+
+
+def hash_file(path):
+    """Return the SHA-256 hex digest of a file."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def link_or_copy(src, dst):
+    """Hard link ``src`` to ``dst``, falling back to a copy. Replaces ``dst``."""
+    src, dst = Path(src), Path(dst)
+    tmp = dst.with_name(f".{dst.name}.link")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(str(src), str(tmp))
+    os.replace(tmp, dst)
+
+
+def _reflink(src, dst):
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+    except OSError:
+        Path(dst).unlink(missing_ok=True)
+        return False
+    shutil.copystat(str(src), str(dst))
+    return True
+
+
+def copy_file(src, dst):
+    """Give ``dst`` its own copy of ``src``, sharing blocks via reflink if possible.
+
+    Unlike :func:`link_or_copy` the result never shares an inode with ``src``,
+    so editing one file in place cannot change the other.  Replaces ``dst``.
+    """
+    src, dst = Path(src), Path(dst)
+    tmp = dst.with_name(f".{dst.name}.copy")
+    tmp.unlink(missing_ok=True)
+    if not _reflink(src, tmp):
+        shutil.copy2(str(src), str(tmp))
+    os.replace(tmp, dst)
+
+
+class ContentStore:
+    """Project-local object store addressed by SHA-256."""
+
+    def __init__(self, project_path):
+        self.project_path = Path(project_path)
+        self.root = get_project_state_dir(project_path) / "objects"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_file = self.root / "index.json"
+
+    def object_path(self, digest, ext):
+        return self.root / digest[:2] / f"{digest}{ext.lower()}"
+
+    def add_stream(self, stream, ext):
+        """Store the bytes of a readable stream, hashing while writing.
+
+        Returns ``(digest, object_path)``.  If identical content is already
+        stored, the new copy is discarded.
+        """
+        h = hashlib.sha256()
+        fd, tmp_name = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                    h.update(chunk)
+                    out.write(chunk)
+            digest = h.hexdigest()
+            obj = self.object_path(digest, ext)
+            if obj.exists():
+                os.unlink(tmp_name)
+            else:
+                obj.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_name, obj)
+            return digest, obj
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    def add_upload(self, file, ext):
+        """Store an uploaded ``FileStorage`` (or ``LocalFile``)."""
+        path = getattr(file, "path", None)
+        if path is not None:
+            with open(path, "rb") as f:
+                return self.add_stream(f, ext)
+        return self.add_stream(file.stream, ext)
+
+    def _load_index(self):
+        try:
+            with open(self.index_file, encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return index if isinstance(index, dict) else {}
+
+    def _key(self, path):
+        path = Path(path).resolve()
+        if path.is_relative_to(self.project_path):
+            return path.relative_to(self.project_path).as_posix()
+        return str(path)
+
+    def record(self, digest, path):
+        """Note that ``path`` now holds the bytes of object ``digest``."""
+        st = Path(path).stat()
+        with _INDEX_LOCK:
+            index = self._load_index()
+            index.setdefault(digest, {})[self._key(path)] = [st.st_size, st.st_mtime_ns]
+            atomic_write_json(self.index_file, index)
+
+    def find_duplicate(self, obj, candidates):
+        """Return the first candidate path holding the same bytes as ``obj``.
+
+        Linked versions are matched by inode, copied ones by their entry in
+        the index.  Candidates are never hashed; files changed since they
+        were recorded, or never recorded, do not match.
+        """
+        digest = obj.stem
+        entries = self._load_index().get(digest, {})
+        for candidate in candidates:
+            try:
+                if os.path.samefile(candidate, obj):
+                    return candidate
+                recorded = entries.get(self._key(candidate))
+                if recorded:
+                    st = candidate.stat()
+                    if [st.st_size, st.st_mtime_ns] == recorded:
+                        return candidate
+            except OSError:
+                continue
+        return None
+
+    def collect_garbage(self):
+        """Remove objects no longer linked from any version or final file."""
+        removed = 0
+        freed = 0
+        for obj in self.root.glob("*/*"):
+            try:
+                st = obj.stat()
+                if obj.is_file() and st.st_nlink <= 1:
+                    obj.unlink()
+                    removed += 1
+                    freed += st.st_size
+            except OSError:
+                continue
+        self._prune_index()
+        return {"removed": removed, "freed_bytes": freed}
+
+    def _prune_index(self):
+        """Drop index entries for files that no longer exist."""
+        with _INDEX_LOCK:
+            index = self._load_index()
+            pruned = {}
+            for digest, entries in index.items():
+                live = {key: rec for key, rec in entries.items() if (self.project_path / key).exists()}
+                if live:
+                    pruned[digest] = live
+            if pruned != index:
+                atomic_write_json(self.index_file, pruned)
+
+    def dedupe_project(self, shots_dir):
+        """Replace duplicate version files under ``shots_dir`` by links into the store."""
+        allowed = ALLOWED_IMAGE_EXTENSIONS | ALLOWED_VIDEO_EXTENSIONS
+        linked = 0
+        saved = 0
+        for path in Path(shots_dir).rglob("*"):
+            if not path.is_file() or path.suffix.lower() not in allowed:
+                continue
+            if not VERSION_STEM.search(path.stem):
+                # Finals keep their own inode, see the module docstring
+                continue
+            try:
+                digest = hash_file(path)
+                obj = self.object_path(digest, path.suffix)
+                if not obj.exists():
+                    # First occurrence becomes the object itself
+                    obj.parent.mkdir(parents=True, exist_ok=True)
+                    link_or_copy(path, obj)
+                elif not os.path.samefile(path, obj):
+                    size = path.stat().st_size
+                    link_or_copy(obj, path)
+                    if os.path.samefile(path, obj):
+                        linked += 1
+                        saved += size
+                self.record(digest, path)
+            except OSError as e:
+                logger.warning("Could not dedupe %s: %s", path, e)
+        return {"linked": linked, "saved_bytes": saved}
+
+
+def get_content_store(project_path):
+    """Return a ``ContentStore`` if content-addressed storage is enabled."""
+    if not CONTENT_STORE_ENABLED:
+        return None
+    return ContentStore(project_path)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2 or argv[0] not in {"dedupe", "gc"}:
+        print("usage: python -m app.services.content_store {dedupe|gc} <project_path>")
+        return 2
+    logging.basicConfig(level=logging.INFO)
+    project_path = Path(argv[1]).expanduser().resolve()
+    store = ContentStore(project_path)
+    if argv[0] == "dedupe":
+        result = store.dedupe_project(project_path / "shots")
+    else:
+        result = store.collect_garbage()
+    print(result)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
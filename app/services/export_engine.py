@@ -0,0 +1,781 @@
+"""Planning and execution of project exports.
+
+An export is split in two steps:
+
+* :func:`plan_export` resolves the promoted assets of every non-archived shot
+  (one ``get_shot_info`` per shot) into a list of copy items plus the
+  ``export_summary.md`` text.
+* :class:`ExportJob` copies the items with a bounded thread pool, tracking
+  per-file progress and throughput.  Files are written to ``*.partial`` and
+  renamed when complete, and items whose destination already matches the
+  source size and mtime are skipped, so re-running an interrupted export into
+  the same directory resumes it instead of starting over.
+* Every folder export records ``.export_manifest.json``.  An incremental job
+  compares it with the new plan to rename entries whose order or display name
+  changed and delete entries that are gone, then copies only what changed.
+* Items tagged with an export preset are transcoded through a
+  :class:`~app.services.export_presets.Transcoder` and linked from its cache.
+
+Jobs can run inline or in the background through :class:`ExportJobManager`.
+:class:`ZipExportJob` and :func:`stream_zip_export` write the same plan as a
+single ZIP archive (to a file or as an HTTP response body) without staging
+copies on disk.
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from app.config.constants import EXPORT_WORKERS, get_project_state_dir
+from app.services.atomic_io import atomic_write_json, atomic_write_text
+from app.services.content_store import link_or_copy
+from app.services.project_manager import ProjectManager
+
+logger = logging.getLogger(__name__)
+
+COPY_CHUNK_SIZE = 4 * 1024 * 1024
+SUMMARY_FILENAME = "export_summary.md"
+MANIFEST_FILENAME = ".export_manifest.json"
+MANIFEST_VERSION = 1
+
+# Entries at least this large are written with ZIP64 headers up front
+ZIP64_THRESHOLD = (1 << 31) - 1
+
+EXPORT_STATS_FILE = "export_stats.json"
+
+# Weight of the newest measurement in the running throughput average
+THROUGHPUT_SMOOTHING = 0.5
+
+# Exports smaller than this are too short to give a meaningful rate
+MIN_THROUGHPUT_SAMPLE = 8 * 1024 * 1024
+
+# Longest destination path that still works on Windows without long-path support
+MAX_PORTABLE_PATH = 259
+
+_stats_lock = threading.Lock()
+
+# Finished jobs kept around for status queries
+MAX_FINISHED_JOBS = 20
+
+
+def sanitize_filename(name):
+    return re.sub(r'[<>:\"/\\|?*]', '_', str(name))[:50] or ''
+
+
+def _wants(export_type, kind):
+    return kind in export_type or export_type == 'all'
+
+
+def plan_export(shot_manager, export_type='all', include_display_in_filename=True, include_metadata=True,
+                project_info=None):
+    """Return the export plan for the non-archived shots of a project.
+
+    The plan is a dict with ``items`` (``src``/``dst``/``size``/``mtime_ns``
+    per asset, ``dst`` relative to the export directory), ``missing`` (assets
+    referenced by a shot but absent on disk), ``warnings`` (display names
+    altered by ``sanitize_filename``), ``summary`` (markdown text or ``None``)
+    and ``timestamp``.
+    """
+    shots = [s for s in shot_manager.get_shots() if not s['archived']]
+    if not shots:
+        raise ValueError("No non-archived shots found")
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    items = []
+    missing = []
+    warnings = []
+    truncated = set()
+
+    def add(order, shot, asset_key, subdir, suffix):
+        src = shot[asset_key]['file']
+        if not src:
+            return
+        src = Path(src)
+        try:
+            st = src.stat()
+        except OSError:
+            missing.append({'shot': shot['name'], 'asset': asset_key, 'src': str(src)})
+            return
+        display_name = shot['display_name'] or ''
+        display_suffix = f"_{sanitize_filename(display_name)}" if include_display_in_filename and display_name else ''
+        if display_suffix and display_suffix[1:] != display_name and shot['name'] not in truncated:
+            truncated.add(shot['name'])
+            warnings.append({'shot': shot['name'], 'display_name': display_name,
+                             'reason': f"display name shortened to '{display_suffix[1:]}'"})
+        items.append({
+            'shot': shot['name'],
+            'order': order,
+            'asset': asset_key,
+            'src': str(src),
+            'dst': f"{subdir}/{order:03d}_{shot['name']}{display_suffix}{suffix}{src.suffix}",
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+        })
+
+    for order, shot in enumerate(shots, start=1):
+        if _wants(export_type, 'images'):
+            add(order, shot, 'first_image', 'images', '_first')
+            add(order, shot, 'last_image', 'images', '_last')
+        if _wants(export_type, 'videos'):
+            add(order, shot, 'video', 'videos', '')
+
+    summary = None
+    if include_metadata:
+        if project_info is None:
+            project_info = ProjectManager().load_project_info(shot_manager.project_path)
+        summary = build_export_summary(shots, project_info, shot_manager.project_path.name, timestamp, export_type)
+
+    return {
+        'export_type': export_type,
+        'timestamp': timestamp,
+        'items': items,
+        'missing': missing,
+        'warnings': warnings,
+        'summary': summary,
+        'total_bytes': sum(item['size'] for item in items),
+    }
+
+
+def _md_cell(text):
+    return text.replace('|', '\\|').replace('\n', '<br>')
+
+
+def build_export_summary(shots, project_info, default_title, timestamp, export_type):
+    """Return the ``export_summary.md`` text for the given ordered shots."""
+    first_data = []
+    last_data = []
+    video_data = []
+    notes_list = []
+
+    for order, info in enumerate(shots, start=1):
+        shot_name = info['name']
+
+        # First Frame
+        if _wants(export_type, 'images') and (info['first_image']['caption'] or info['first_image']['prompt']):
+            first_data.append((order, shot_name, info['first_image']['caption'], info['first_image']['prompt']))
+
+        # Last Frame
+        if _wants(export_type, 'images') and (info['last_image']['caption'] or info['last_image']['prompt']):
+            last_data.append((order, shot_name, info['last_image']['caption'], info['last_image']['prompt']))
+
+        # Video
+        if _wants(export_type, 'videos') and (info['video']['caption'] or info['video']['prompt']):
+            video_data.append((order, shot_name, info['video']['caption'], info['video']['prompt']))
+
+        # Notes
+        if info['notes'].strip():
+            notes_list.append((order, shot_name, info['notes']))
+
+    md_lines = [
+        f"# {project_info.get('title', default_title)}",
+        "",
+        "## Project Information",
+    ]
+
+    # Add bullet points for non-empty project fields
+    if project_info.get('short_description'):
+        md_lines.append(f"- **Short Description:** {project_info.get('short_description')}")
+
+    if project_info.get('notes'):
+        md_lines.append(f"- **Project Notes:** {project_info.get('notes')}")
+
+    if project_info.get('tags'):
+        md_lines.append(f"- **Tags:** {', '.join(project_info.get('tags'))}")
+
+    md_lines.extend([
+        "",
+        f"**Export Date:** {timestamp}",
+        f"**Export Type:** {export_type}",
+        ""
+    ])
+
+    for title, rows in (("First Frame", first_data), ("Last Frame", last_data), ("Video", video_data)):
+        if not rows:
+            continue
+        md_lines.extend([
+            f"## {title}",
+            "| Order | Shot Name | Captions | Prompts |",
+            "|-------|-----------|----------|---------|"
+        ])
+        for order, name, caption, prompt in rows:
+            md_lines.append(f"| {order:03d} | {name} | {_md_cell(caption)} | {_md_cell(prompt)} |")
+        md_lines.append("")
+
+    # Notes table
+    if notes_list:
+        md_lines.extend([
+            "## Notes",
+            "| Order | Shot Name | Notes |",
+            "|-------|-----------|-------|"
+        ])
+        for order, name, notes in notes_list:
+            md_lines.append(f"| {order:03d} | {name} | {_md_cell(notes)} |")
+        md_lines.append("")
+
+    return '\n'.join(md_lines)
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class ExportJob:
+    """Copy an export plan into ``export_dir`` with a bounded thread pool."""
+
+    def __init__(self, plan, export_dir, workers=None, incremental=False, transcoder=None, project_path=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.plan = plan
+        self.export_dir = Path(export_dir)
+        self.transcoder = transcoder
+        # Measured throughput is recorded per project for dry-run estimates
+        self.project_path = project_path
+        if workers is None and transcoder is not None:
+            workers = transcoder.workers
+        self.workers = max(1, int(workers or EXPORT_WORKERS))
+        self.incremental = incremental
+
+        self.status = 'pending'
+        self.error = None
+        self.started = None
+        self.finished = None
+        self.files_done = 0
+        self.files_skipped = 0
+        self.bytes_done = 0
+        self.bytes_copied = 0
+        self.files_renamed = 0
+        self.files_deleted = 0
+        self.current = {}
+        self.errors = []
+
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+
+    @property
+    def total_files(self):
+        return len(self.plan['items'])
+
+    @property
+    def total_bytes(self):
+        return self.plan['total_bytes']
+
+    @property
+    def mode(self):
+        """Key under which this kind of job records its throughput."""
+        return f"preset:{self.plan['preset']}" if self.plan.get('preset') else 'copy'
+
+    def cancel(self):
+        self._cancel.set()
+
+    def progress(self):
+        with self._lock:
+            elapsed = ((self.finished or time.monotonic()) - self.started) if self.started else 0.0
+            throughput = self.bytes_done / elapsed if elapsed > 0 else 0.0
+            remaining = self.total_bytes - self.bytes_done
+            return {
+                'id': self.id,
+                'status': self.status,
+                'error': self.error,
+                'export_path': str(self.export_dir),
+                'files_done': self.files_done,
+                'files_skipped': self.files_skipped,
+                'files_renamed': self.files_renamed,
+                'files_deleted': self.files_deleted,
+                'total_files': self.total_files,
+                'bytes_done': self.bytes_done,
+                'total_bytes': self.total_bytes,
+                'elapsed': round(elapsed, 3),
+                'throughput': round(throughput),
+                'eta': round(remaining / throughput, 1) if throughput > 0 else None,
+                'current': sorted(self.current.values()),
+                'errors': list(self.errors),
+                'missing': self.plan.get('missing', []),
+            }
+
+    def run(self):
+        """Execute the job in the calling thread. Raises on failure."""
+        with self._lock:
+            self.status = 'running'
+            self.started = time.monotonic()
+        try:
+            self._execute()
+            with self._lock:
+                self.status = 'done'
+            self._record_throughput()
+        except ExportCancelled:
+            with self._lock:
+                self.status = 'cancelled'
+        except Exception as e:
+            with self._lock:
+                self.status = 'failed'
+                self.error = str(e)
+            raise
+        finally:
+            with self._lock:
+                self.finished = time.monotonic()
+        return str(self.export_dir)
+
+    def _record_throughput(self):
+        if not self.project_path or self.mode is None or self.bytes_copied < MIN_THROUGHPUT_SAMPLE:
+            return
+        try:
+            record_export_throughput(self.project_path, self.mode, self.bytes_copied,
+                                     time.monotonic() - self.started)
+        except Exception:
+            logger.exception("Failed to record export throughput")
+
+    def check(self, stats=None):
+        """Resolve the job without writing anything and report what it would do.
+
+        Returns totals, missing sources, destination conflicts, free space on
+        the target volume and an estimated duration from the throughput
+        measured by earlier exports of this project.  ``ok`` is false when the
+        export would fail or clobber files.
+        """
+        items = self.plan['items']
+        counts = {'images': 0, 'videos': 0}
+        for item in items:
+            counts[item['dst'].split('/', 1)[0]] = counts.get(item['dst'].split('/', 1)[0], 0) + 1
+
+        conflicts = []
+        seen = {}
+        for item in items:
+            # Case-insensitive filesystems (Windows, macOS) collide on case alone
+            key = item['dst'].lower()
+            if key in seen:
+                conflicts.append({'dst': item['dst'], 'shots': [seen[key]['shot'], item['shot']],
+                                  'reason': 'duplicate destination'})
+            else:
+                seen[key] = item
+            if len(str(self.export_dir / item['dst'])) > MAX_PORTABLE_PATH:
+                conflicts.append({'dst': item['dst'], 'shots': [item['shot']], 'reason': 'path too long'})
+
+        existing, bytes_to_copy = self._pending_bytes()
+        required = bytes_to_copy
+        free = _free_space(self.export_dir)
+        stats = load_export_stats(self.project_path) if stats is None and self.project_path else (stats or {})
+        throughput = (stats.get(self.mode) or {}).get('bytes_per_sec') if self.mode else None
+
+        errors = []
+        if conflicts:
+            errors.append(f"{len(conflicts)} destination conflict(s)")
+        if free is not None and required > free:
+            errors.append(f"Not enough free space on target: {required} bytes needed, {free} available")
+
+        return {
+            'export_path': str(self.export_dir),
+            'mode': self.mode,
+            'total_files': len(items),
+            'total_bytes': self.total_bytes,
+            'counts': counts,
+            'existing_files': existing,
+            'bytes_to_copy': bytes_to_copy,
+            'required_bytes': required,
+            'free_bytes': free,
+            'missing': self.plan.get('missing', []),
+            'conflicts': conflicts,
+            'warnings': self.plan.get('warnings', []),
+            'throughput': round(throughput) if throughput else None,
+            'estimated_seconds': round(bytes_to_copy / throughput, 1) if throughput else None,
+            'errors': errors,
+            'ok': not errors,
+        }
+
+    def _pending_bytes(self):
+        """Return ``(files already in place, bytes still to write)``."""
+        existing = 0
+        pending = 0
+        for item in self.plan['items']:
+            try:
+                st = (self.export_dir / item['dst']).stat()
+            except OSError:
+                pending += item['size']
+                continue
+            if item.get('preset') or (st.st_size == item['size'] and st.st_mtime_ns == item['mtime_ns']):
+                existing += 1
+            else:
+                pending += item['size']
+        return existing, pending
+
+    def _execute(self):
+        self.export_dir.mkdir(parents=True, exist_ok=True)
+        if self.incremental:
+            self._reconcile(load_export_manifest(self.export_dir))
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"export-{self.id}") as pool:
+            futures = [pool.submit(self._copy_item, item) for item in self.plan['items']]
+            for future in as_completed(futures):
+                future.result()
+        if self.plan.get('summary') is not None:
+            self._write_summary()
+        save_export_manifest(self.export_dir, self.plan)
+
+    def _reconcile(self, manifest):
+        """Bring a previous export in line with the plan before copying.
+
+        Files whose source is unchanged but whose name changed (new order or
+        display name) are renamed rather than copied again, and files that
+        are no longer part of the export are deleted.  Renames go through
+        temporary names so that swapped positions cannot clobber each other.
+        """
+        manifest = {dst: entry for dst, entry in manifest.items() if self._inside(dst) is not None}
+        wanted = {item['dst'] for item in self.plan['items']}
+        previous = {entry['src']: (dst, entry) for dst, entry in manifest.items()}
+
+        renames = []
+        for item in self.plan['items']:
+            prev = previous.get(item['src'])
+            if not prev or prev[0] == item['dst']:
+                continue
+            old_dst, entry = prev
+            if entry.get('size') == item['size'] and entry.get('mtime_ns') == item['mtime_ns'] \
+                    and entry.get('preset') == item.get('preset') and self._inside(item['dst']) is not None:
+                renames.append((old_dst, item['dst']))
+
+        staged = []
+        for old_dst, new_dst in renames:
+            old_path = self._inside(old_dst)
+            tmp = old_path.with_name(old_path.name + '.rename')
+            try:
+                os.replace(old_path, tmp)
+                staged.append((old_dst, tmp, new_dst))
+            except OSError:
+                # Left in place: deleted below and copied again
+                continue
+
+        renamed_from = {old for old, _, _ in staged}
+        for dst in manifest:
+            if dst in wanted or dst in renamed_from:
+                continue
+            try:
+                self._inside(dst).unlink()
+                self.files_deleted += 1
+            except FileNotFoundError:
+                pass
+
+        for _, tmp, new_dst in staged:
+            target = self._inside(new_dst)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp, target)
+            self.files_renamed += 1
+
+        for subdir in ('images', 'videos'):
+            try:
+                (self.export_dir / subdir).rmdir()
+            except OSError:
+                pass
+
+    def _inside(self, dst):
+        """Resolve ``dst`` below ``export_dir``; ``None`` if it points elsewhere.
+
+        Manifest keys come from a file in the export folder, which anyone
+        can edit, so they are never trusted to stay inside it.
+        """
+        root = self.export_dir.resolve()
+        path = (root / dst).resolve()
+        if path == root or not path.is_relative_to(root):
+            logger.warning("Ignoring export entry outside %s: %s", self.export_dir, dst)
+            return None
+        return path
+
+    def _copy_item(self, item):
+        if self._cancel.is_set():
+            raise ExportCancelled()
+        if item.get('preset'):
+            return self._transcode_item(item)
+        src = Path(item['src'])
+        dst = self.export_dir / item['dst']
+        dst.parent.mkdir(parents=True, exist_ok=True)
+
+        # Resume: copy2 preserves mtime, so a finished copy matches the source
+        try:
+            st = dst.stat()
+            if st.st_size == item['size'] and st.st_mtime_ns == item['mtime_ns']:
+                with self._lock:
+                    self.files_done += 1
+                    self.files_skipped += 1
+                    self.bytes_done += item['size']
+                return
+        except OSError:
+            pass
+
+        partial = dst.with_name(dst.name + '.partial')
+        with self._lock:
+            self.current[item['dst']] = item['dst']
+        try:
+            with open(src, 'rb') as fsrc, open(partial, 'wb') as fdst:
+                while True:
+                    if self._cancel.is_set():
+                        raise ExportCancelled()
+                    chunk = fsrc.read(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    fdst.write(chunk)
+                    with self._lock:
+                        self.bytes_done += len(chunk)
+                        self.bytes_copied += len(chunk)
+            shutil.copystat(str(src), str(partial))
+            os.replace(partial, dst)
+            with self._lock:
+                self.files_done += 1
+        except ExportCancelled:
+            partial.unlink(missing_ok=True)
+            raise
+        except Exception as e:
+            partial.unlink(missing_ok=True)
+            with self._lock:
+                self.errors.append({'file': item['dst'], 'error': str(e)})
+            raise
+        finally:
+            with self._lock:
+                self.current.pop(item['dst'], None)
+
+    def _transcode_item(self, item):
+        """Export a preset output, reusing the project's transcode cache."""
+        dst = self.export_dir / item['dst']
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self.current[item['dst']] = item['dst']
+        try:
+            out, created = self.transcoder.output_for(item)
+            out_st = out.stat()
+            try:
+                st = dst.stat()
+                skipped = st.st_size == out_st.st_size and st.st_mtime_ns == out_st.st_mtime_ns
+            except OSError:
+                skipped = False
+            if not skipped:
+                link_or_copy(out, dst)
+            with self._lock:
+                self.files_done += 1
+                self.files_skipped += int(skipped)
+                self.bytes_done += item['size']
+                if created:
+                    self.bytes_copied += item['size']
+        except Exception as e:
+            with self._lock:
+                self.errors.append({'file': item['dst'], 'error': str(e)})
+            raise
+        finally:
+            with self._lock:
+                self.current.pop(item['dst'], None)
+
+    def _write_summary(self):
+        atomic_write_text(self.export_dir / SUMMARY_FILENAME, self.plan['summary'])
+
+
+def load_export_manifest(export_dir):
+    """Return ``{dst: entry}`` recorded by the previous export into ``export_dir``."""
+    path = Path(export_dir) / MANIFEST_FILENAME
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict) and data.get('version') == MANIFEST_VERSION:
+            return data.get('entries', {})
+    except FileNotFoundError:
+        pass
+    except Exception:
+        logger.exception("Error loading export manifest %s", path)
+    return {}
+
+
+def save_export_manifest(export_dir, plan):
+    entries = {
+        item['dst']: {
+            'src': item['src'],
+            'size': item['size'],
+            'mtime_ns': item['mtime_ns'],
+            'shot': item['shot'],
+            'asset': item['asset'],
+            'preset': item.get('preset'),
+        }
+        for item in plan['items']
+    }
+    atomic_write_json(Path(export_dir) / MANIFEST_FILENAME,
+                      {'version': MANIFEST_VERSION, 'export_type': plan['export_type'],
+                       'timestamp': plan['timestamp'], 'entries': entries}, indent=2)
+
+
+def _free_space(path):
+    """Return free bytes on the volume that will hold ``path``."""
+    path = Path(path)
+    for candidate in (path, *path.parents):
+        if candidate.exists():
+            try:
+                return shutil.disk_usage(candidate).free
+            except OSError:
+                return None
+    return None
+
+
+def load_export_stats(project_path):
+    path = get_project_state_dir(project_path) / EXPORT_STATS_FILE
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except Exception:
+        logger.exception("Error loading export stats")
+        return {}
+
+
+def record_export_throughput(project_path, mode, nbytes, elapsed):
+    """Fold a measured export rate into the project's running average."""
+    if elapsed <= 0:
+        return
+    rate = nbytes / elapsed
+    with _stats_lock:
+        stats = load_export_stats(project_path)
+        entry = stats.get(mode) or {}
+        previous = entry.get('bytes_per_sec')
+        entry['bytes_per_sec'] = rate if not previous else previous * (1 - THROUGHPUT_SMOOTHING) + rate * THROUGHPUT_SMOOTHING
+        entry['samples'] = entry.get('samples', 0) + 1
+        stats[mode] = entry
+        atomic_write_json(get_project_state_dir(project_path) / EXPORT_STATS_FILE, stats, indent=2)
+
+
+class ZipExportJob(ExportJob):
+    """Write an export plan into a single ZIP file at ``export_dir``."""
+
+    @property
+    def mode(self):
+        return 'zip'
+
+    def _pending_bytes(self):
+        # The archive is always rewritten from scratch
+        return 0, self.total_bytes
+
+    def _execute(self):
+        self.export_dir.parent.mkdir(parents=True, exist_ok=True)
+        partial = self.export_dir.with_name(self.export_dir.name + '.partial')
+        try:
+            with open(partial, 'wb') as f:
+                for _ in iter_zip_export(self.plan, f, root=self.export_dir.stem, job=self):
+                    if self._cancel.is_set():
+                        raise ExportCancelled()
+            os.replace(partial, self.export_dir)
+        finally:
+            partial.unlink(missing_ok=True)
+
+
+class _StreamSink:
+    """Write-only, non-seekable file object buffering zipfile output."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip_export(plan, fileobj, root='', job=None):
+    """Write the plan as a ZIP archive into ``fileobj``, yielding after each chunk.
+
+    Media is stored uncompressed (it is already compressed) and read straight
+    from the promoted files, so memory use stays at one chunk regardless of
+    project size.  ``export_summary.md`` is generated from the plan.
+    """
+    prefix = f"{root}/" if root else ''
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for item in plan['items']:
+            zinfo = zipfile.ZipInfo.from_file(item['src'], prefix + item['dst'], strict_timestamps=False)
+            zinfo.compress_type = zipfile.ZIP_STORED
+            with open(item['src'], 'rb') as src, zf.open(zinfo, 'w', force_zip64=zinfo.file_size > ZIP64_THRESHOLD) as dst:
+                while True:
+                    chunk = src.read(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    if job is not None:
+                        with job._lock:
+                            job.bytes_done += len(chunk)
+                            job.bytes_copied += len(chunk)
+                    yield
+            if job is not None:
+                with job._lock:
+                    job.files_done += 1
+        if plan.get('summary') is not None:
+            zinfo = zipfile.ZipInfo(prefix + SUMMARY_FILENAME, date_time=time.localtime()[:6])
+            zf.writestr(zinfo, plan['summary'], compress_type=zipfile.ZIP_DEFLATED)
+    yield
+
+
+def stream_zip_export(plan, root=''):
+    """Yield the bytes of a ZIP archive of the plan for a streaming response."""
+    sink = _StreamSink()
+    for _ in iter_zip_export(plan, sink, root):
+        data = sink.drain()
+        if data:
+            yield data
+    data = sink.drain()
+    if data:
+        yield data
+
+
+class ExportJobManager:
+    """Registry running export jobs on background threads."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def start(self, job):
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+
+        def _run():
+            try:
+                job.run()
+                logger.info("Export %s finished: %s", job.id, job.export_dir)
+            except Exception:
+                logger.exception("Export %s failed", job.id)
+
+        threading.Thread(target=_run, name=f"export-{job.id}", daemon=True).start()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel_all(self):
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status in {'pending', 'running'}:
+                    job.cancel()
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if j.status in {'done', 'failed', 'cancelled'}]
+        for job in finished[:-MAX_FINISHED_JOBS] if len(finished) > MAX_FINISHED_JOBS else []:
+            self._jobs.pop(job.id, None)
+
+
+def resolve_export_dir(project_path, export_name=None, timestamp=None, suffix=''):
+    """Return ``<project>/exports/<name><suffix>`` (timestamped when no name is given).
+
+    ``export_name`` comes from the client, so it is reduced to a single
+    file name; one that sanitises to nothing (e.g. ``..``) counts as absent.
+    """
+    exports_root = Path(project_path) / 'exports'
+    exports_root.mkdir(exist_ok=True)
+    timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+    name = sanitize_filename(export_name).strip(' .') if export_name else ''
+    return exports_root / f"{name or f'export_{timestamp}'}{suffix}"
@@ -0,0 +1,154 @@
+"""Named export presets that transcode or resize promoted assets.
+
+Each preset has an optional ``video`` rule (ffmpeg output arguments and
+container extension) and an optional ``image`` rule (Pillow output format,
+quality and maximum size).  Assets without a rule are copied unchanged.
+
+Outputs are cached in ``.shotbuddy/transcode/<preset>/`` keyed by the source's
+SHA-256 and a hash of the preset definition, so re-exporting unchanged shots
+never re-encodes them, and editing a preset invalidates only its own outputs.
+The export job runs the transcodes on a pool sized to the CPU count.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import uuid
+from pathlib import Path
+
+from PIL import Image
+
+from app.config.constants import ALLOWED_VIDEO_EXTENSIONS, TRANSCODE_WORKERS, get_project_state_dir
+
+logger = logging.getLogger(__name__)
+
+TRANSCODE_CACHE_DIR = "transcode"
+
+EXPORT_PRESETS = {
+    "review_h264": {
+        "label": "H.264 review copies (1080p, JPEG stills)",
+        "video": {
+            "ext": ".mp4",
+            "args": ["-vf", "scale=-2:'min(1080,ih)'", "-c:v", "libx264", "-preset", "medium", "-crf", "20",
+                     "-pix_fmt", "yuv420p", "-c:a", "aac", "-b:a", "192k", "-movflags", "+faststart"],
+        },
+        "image": {"ext": ".jpg", "format": "JPEG", "quality": 90, "max_size": [1920, 1080]},
+    },
+    "h264_720p": {
+        "label": "H.264 720p",
+        "video": {
+            "ext": ".mp4",
+            "args": ["-vf", "scale=-2:'min(720,ih)'", "-c:v", "libx264", "-preset", "medium", "-crf", "22",
+                     "-pix_fmt", "yuv420p", "-c:a", "aac", "-b:a", "128k", "-movflags", "+faststart"],
+        },
+        "image": {"ext": ".jpg", "format": "JPEG", "quality": 85, "max_size": [1280, 720]},
+    },
+    "prores_proxy": {
+        "label": "ProRes 422 Proxy",
+        "video": {
+            "ext": ".mov",
+            "args": ["-c:v", "prores_ks", "-profile:v", "0", "-pix_fmt", "yuv422p10le", "-c:a", "pcm_s16le"],
+        },
+        "image": None,
+    },
+    "jpeg_stills": {
+        "label": "JPEG stills (full resolution)",
+        "video": None,
+        "image": {"ext": ".jpg", "format": "JPEG", "quality": 95, "max_size": None},
+    },
+}
+
+
+def list_presets():
+    return [{"name": name, "label": preset["label"]} for name, preset in EXPORT_PRESETS.items()]
+
+
+def get_preset(name):
+    if name not in EXPORT_PRESETS:
+        raise ValueError(f"Unknown export preset: {name}")
+    return EXPORT_PRESETS[name]
+
+
+def _rule_for(preset, src):
+    kind = "video" if Path(src).suffix.lower() in ALLOWED_VIDEO_EXTENSIONS else "image"
+    return kind, preset.get(kind)
+
+
+def apply_preset(plan, name):
+    """Mark plan items handled by preset ``name`` and rename their destinations."""
+    preset = get_preset(name)
+    needs_ffmpeg = False
+    for item in plan['items']:
+        kind, rule = _rule_for(preset, item['src'])
+        if not rule:
+            continue
+        item['preset'] = name
+        item['dst'] = str(Path(item['dst']).with_suffix(rule['ext']).as_posix())
+        needs_ffmpeg = needs_ffmpeg or kind == "video"
+    if needs_ffmpeg and not shutil.which("ffmpeg"):
+        raise ValueError(f"ffmpeg not found; cannot export with preset {name}")
+    plan['preset'] = name
+    return plan
+
+
+class Transcoder:
+    """Produce cached preset outputs for an export job."""
+
+    def __init__(self, project_path, media_probe, workers=None):
+        self.root = get_project_state_dir(project_path) / TRANSCODE_CACHE_DIR
+        self.media_probe = media_probe
+        self.workers = max(1, int(workers or TRANSCODE_WORKERS))
+        # Split the cores between concurrent ffmpeg processes
+        self.threads = max(1, (os.cpu_count() or 1) // self.workers)
+
+    def output_for(self, item):
+        """Return ``(path, created)`` of the cached output for ``item``.
+
+        The output is transcoded first if it is not cached yet.
+        """
+        preset = get_preset(item['preset'])
+        kind, rule = _rule_for(preset, item['src'])
+        preset_key = hashlib.blake2b(json.dumps(rule, sort_keys=True).encode("utf-8"), digest_size=4).hexdigest()
+        digest = self.media_probe.digest(item['src'])
+        out = self.root / item['preset'] / digest[:2] / f"{digest}-{preset_key}{rule['ext']}"
+        if out.exists():
+            return out, False
+
+        out.parent.mkdir(parents=True, exist_ok=True)
+        tmp = out.with_name(f".{out.stem}.{uuid.uuid4().hex[:8]}.partial{out.suffix}")
+        try:
+            if kind == "video":
+                self._transcode_video(item['src'], tmp, rule)
+            else:
+                self._convert_image(item['src'], tmp, rule)
+            os.replace(tmp, out)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return out, True
+
+    def _transcode_video(self, src, dst, rule):
+        ffmpeg = shutil.which("ffmpeg")
+        if not ffmpeg:
+            raise RuntimeError("ffmpeg not found")
+        cmd = [ffmpeg, "-y", "-v", "error", "-i", str(src), "-threads", str(self.threads), *rule['args'], str(dst)]
+        result = subprocess.run(cmd, capture_output=True, shell=False)  # noqa: S603
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.decode("utf-8", "replace").strip() or f"ffmpeg failed for {src}")
+
+    @staticmethod
+    def _convert_image(src, dst, rule):
+        with Image.open(src) as img:
+            if rule.get('max_size'):
+                img.thumbnail(tuple(rule['max_size']), Image.Resampling.LANCZOS)
+            if rule['format'] == "JPEG" and img.mode in ("RGBA", "LA", "P"):
+                if img.mode == "P":
+                    img = img.convert("RGBA")
+                background = Image.new("RGB", img.size, (0, 0, 0))
+                background.paste(img, mask=img.split()[-1])
+                img = background
+            elif rule['format'] == "JPEG" and img.mode != "RGB":
+                img = img.convert("RGB")
+            img.save(str(dst), rule['format'], quality=rule.get('quality', 90))
@@ -1,5 +1,4 @@
 import logging
-import shutil
 from pathlib import Path
 
 from PIL import Image
@@ -7,10 +6,12 @@ from PIL import Image
 from app.config.constants import (
     ALLOWED_IMAGE_EXTENSIONS,
     ALLOWED_VIDEO_EXTENSIONS,
+    DUPLICATE_UPLOAD_POLICY,
     THUMBNAIL_SIZE,
     get_project_thumbnail_cache_dir,
 )
-from app.services.prompt_importer import extract_prompt_from_png
+from app.services.content_store import copy_file, get_content_store, link_or_copy
+from app.services.prompt_importer import extract_prompt_from_image
 from app.services.shot_manager import get_shot_manager
 
 logger = logging.getLogger(__name__)
@@ -28,6 +29,7 @@ class FileHandler:
         self.latest_images_dir.mkdir(parents=True, exist_ok=True)
         self.latest_videos_dir.mkdir(parents=True, exist_ok=True)
         self.thumbnail_cache_dir = get_project_thumbnail_cache_dir(self.project_path)
+        self.content_store = get_content_store(self.project_path)
 
     def clear_thumbnail_cache(self):
         """Remove all files from the thumbnail cache."""
@@ -44,6 +46,14 @@ class FileHandler:
 
     def save_file(self, file, shot_name, file_type):
         """Save uploaded file with proper versioning"""
+        # Version numbering and final replacement must not interleave with
+        # other writes to the same shot.  Uploads are not undoable, so the
+        # prompt import and promotion they trigger stay out of the journal.
+        manager = get_shot_manager(self.project_path)
+        with manager.locks.shot(shot_name), manager.journal.suspended():
+            return self._save_file(file, shot_name, file_type)
+
+    def _save_file(self, file, shot_name, file_type):
         shot_dir = self.wip_dir / shot_name
         file_ext = Path(file.filename).suffix.lower()
 
@@ -75,7 +85,9 @@ class FileHandler:
 
             wip_filename = f'{base}_v{version:03d}{file_ext}'
             wip_path = wip_dir / wip_filename
-            file.save(str(wip_path))
+            duplicate = self._write_version(file, wip_path, self._version_files(wip_dir, base, ALLOWED_IMAGE_EXTENSIONS))
+            if duplicate and not wip_path.exists():
+                return self._reuse_duplicate(manager, shot_name, canonical_type, duplicate)
 
             final_dir = self.latest_images_dir
             final_path = final_dir / f'{base}{file_ext}'
@@ -85,7 +97,7 @@ class FileHandler:
                 if existing_file != wip_path:
                     existing_file.unlink()
 
-            shutil.copy2(str(wip_path), str(final_path))
+            self._place_final(wip_path, final_path)
 
             # Update current version marker so UI shows the promoted version correctly
             try:
@@ -93,9 +105,9 @@ class FileHandler:
             except Exception as e:
                 logger.warning("Failed to set current version marker: %s", e)
 
-            # Attempt to extract embedded prompt metadata from PNG files
-            if file_ext == '.png':
-                prompt_data = extract_prompt_from_png(final_path)
+            # Attempt to extract embedded prompt metadata (PNG text chunks, EXIF/XMP)
+            if file_ext in ALLOWED_IMAGE_EXTENSIONS:
+                prompt_data = extract_prompt_from_image(final_path)
                 if prompt_data and prompt_data.get('prompt'):
                     prompt_text = prompt_data['prompt'].strip()
                     neg = prompt_data.get('negative_prompt', '').strip()
@@ -119,7 +131,9 @@ class FileHandler:
 
             wip_filename = f'{base}_v{version:03d}{file_ext}'
             wip_path = wip_dir / wip_filename
-            file.save(str(wip_path))
+            duplicate = self._write_version(file, wip_path, self._version_files(wip_dir, base, ALLOWED_VIDEO_EXTENSIONS))
+            if duplicate and not wip_path.exists():
+                return self._reuse_duplicate(manager, shot_name, 'video', duplicate)
 
             final_dir = self.latest_videos_dir
             final_path = final_dir / f'{base}{file_ext}'
@@ -128,7 +142,7 @@ class FileHandler:
                 if existing_file != wip_path:
                     existing_file.unlink()
 
-            shutil.copy2(str(wip_path), str(final_path))
+            self._place_final(wip_path, final_path)
             # Update current version marker so UI shows the promoted version correctly
             try:
                 manager.set_current_version(shot_name, 'video', version)
@@ -137,6 +151,7 @@ class FileHandler:
 
             # Thumbnails for videos
             thumbnail_path = self.create_video_thumbnail(str(final_path), base)
+            manager.proxies.request(final_path)
 
         else:
             # lipsync driver/target/result
@@ -146,24 +161,105 @@ class FileHandler:
             version = self.get_next_version(dest_dir, base, file_ext)
             wip_filename = f'{base}_v{version:03d}{file_ext}'
             wip_path = dest_dir / wip_filename
-            file.save(str(wip_path))
+            duplicate = self._write_version(file, wip_path, self._version_files(dest_dir, base, ALLOWED_VIDEO_EXTENSIONS))
+            if duplicate and not wip_path.exists():
+                return self._reuse_duplicate(manager, shot_name, file_type, duplicate)
 
             final_path = dest_dir / f'{base}{file_ext}'
             for existing_file in dest_dir.glob(f'{base}.*'):
                 if existing_file != wip_path:
                     existing_file.unlink()
 
-            shutil.copy2(str(wip_path), str(final_path))
+            self._place_final(wip_path, final_path)
 
             # Thumbnails for lipsync videos
             thumbnail_path = self.create_video_thumbnail(str(final_path), base)
+            if file_type == 'result':
+                manager.proxies.request(final_path)
 
-        return {
+        result = {
             'wip_path': str(wip_path).replace('\\', '/'),
             'final_path': str(final_path).replace('\\', '/'),
             'version': version,
             'thumbnail': f"/api/shots/thumbnail/{Path(thumbnail_path).name}" if thumbnail_path else None
         }
+        if duplicate:
+            result['duplicate_of'] = self._version_of(duplicate)
+            result['skipped'] = False
+        return result
+
+    def _version_files(self, wip_dir, base, extensions):
+        """Return existing version files of a slot."""
+        if not wip_dir.exists():
+            return []
+        return [f for f in wip_dir.glob(f'{base}_v*.*') if f.suffix.lower() in extensions]
+
+    @staticmethod
+    def _version_of(path):
+        try:
+            return int(Path(path).stem.split('_v')[-1])
+        except ValueError:
+            return None
+
+    def _write_version(self, file, wip_path, existing_versions):
+        """Write an upload to ``wip_path``.
+
+        With the content store enabled the upload is hashed while streamed
+        into the store and ``wip_path`` becomes a link to the object.  Returns
+        the existing version file holding identical bytes, if any; when the
+        duplicate policy is ``skip`` nothing is written in that case.
+        """
+        if self.content_store is None:
+            file.save(str(wip_path))
+            return None
+
+        digest, obj = self.content_store.add_upload(file, wip_path.suffix)
+        duplicate = self.content_store.find_duplicate(obj, existing_versions)
+        if duplicate and DUPLICATE_UPLOAD_POLICY == 'skip':
+            logger.info("Upload for %s is identical to %s; skipping new version", wip_path.name, duplicate.name)
+            return duplicate
+        link_or_copy(obj, wip_path)
+        self.content_store.record(digest, wip_path)
+        return duplicate
+
+    def _place_final(self, wip_path, final_path):
+        """Materialise the promoted final from a version file.
+
+        Finals are never hard links to versions: tools that edit a final in
+        place would otherwise silently change the version too.
+        """
+        copy_file(wip_path, final_path)
+
+    def _reuse_duplicate(self, manager, shot_name, file_type, duplicate):
+        """Promote the existing version holding the uploaded bytes."""
+        version = self._version_of(duplicate)
+        if file_type in {'driver', 'target', 'result'}:
+            dest_dir = duplicate.parent
+            base = f'{shot_name}_{file_type}'
+            final_path = dest_dir / f'{base}{duplicate.suffix}'
+            for existing_file in dest_dir.glob(f'{base}.*'):
+                if existing_file != duplicate:
+                    existing_file.unlink()
+            self._place_final(duplicate, final_path)
+            thumbnail_path = self.create_video_thumbnail(str(final_path), base)
+            if file_type == 'result':
+                manager.proxies.request(final_path)
+            thumbnail = f"/api/shots/thumbnail/{Path(thumbnail_path).name}" if thumbnail_path else None
+        else:
+            final_path = Path(manager.promote_asset(shot_name, file_type, version))
+            if file_type == 'video':
+                thumbnail = manager.get_video_thumbnail_path(final_path, shot_name)
+            else:
+                thumbnail = manager.get_thumbnail_path(final_path, shot_name)
+
+        return {
+            'wip_path': str(duplicate).replace('\\', '/'),
+            'final_path': str(final_path).replace('\\', '/'),
+            'version': version,
+            'thumbnail': thumbnail,
+            'duplicate_of': version,
+            'skipped': True,
+        }
 
     def get_next_version(self, wip_dir, base_name, file_ext):
         if not wip_dir.exists():
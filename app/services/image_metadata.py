@@ -0,0 +1,375 @@
+"""Header-only text metadata readers for PNG, JPEG and WebP files.
+
+The readers walk the container structure (PNG chunks, JPEG segments and RIFF
+chunks) and stop as soon as the text metadata has been collected.  Pixel data
+is skipped with ``seek`` and never read or decoded, so importing a prompt from
+a large 16-bit PNG only costs a few KB of reads.
+"""
+
+import html
+import logging
+import re
+import struct
+import zlib
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Upper bound for a single metadata chunk/segment we are willing to read.
+# Embedded ComfyUI workflows can be several MB, anything beyond this is
+# almost certainly not text metadata.
+MAX_METADATA_CHUNK = 64 * 1024 * 1024
+
+_EXIF_HEADER = b"Exif\x00\x00"
+_XMP_HEADER = b"http://ns.adobe.com/xap/1.0/\x00"
+
+# EXIF tags that generators use to store prompts
+_TAG_IMAGE_DESCRIPTION = 0x010E
+_TAG_MAKE = 0x010F
+_TAG_MODEL = 0x0110
+_TAG_EXIF_IFD = 0x8769
+_TAG_USER_COMMENT = 0x9286
+_TAG_XP_COMMENT = 0x9C9C
+
+_EXIF_TEXT_TAGS = {
+    _TAG_IMAGE_DESCRIPTION: "ImageDescription",
+    _TAG_MAKE: "Make",
+    _TAG_MODEL: "Model",
+    _TAG_USER_COMMENT: "UserComment",
+    _TAG_XP_COMMENT: "XPComment",
+}
+
+# ComfyUI stores ``prompt:{...}``/``workflow:{...}`` in Make/Model for WebP
+_PREFIXED_KEY_RE = re.compile(r"^\s*(prompt|workflow|parameters)\s*:", re.IGNORECASE)
+
+_XMP_ELEMENT_RE = re.compile(
+    r"<(?:[\w-]+:)?(parameters|prompt|workflow|UserComment)\b[^>]*>(.*?)</(?:[\w-]+:)?\1>",
+    re.IGNORECASE | re.DOTALL,
+)
+_XMP_ATTRIBUTE_RE = re.compile(
+    r"\b(?:[\w-]+:)?(parameters|prompt|workflow|UserComment)\s*=\s*\"([^\"]*)\"",
+    re.IGNORECASE,
+)
+_XMP_DESCRIPTION_RE = re.compile(
+    r"<dc:description\b[^>]*>.*?<rdf:li\b[^>]*>(.*?)</rdf:li>",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def detect_image_format(header: bytes):
+    """Return ``'PNG'``, ``'JPEG'``, ``'WEBP'`` or ``None`` for a file header."""
+    if header.startswith(PNG_SIGNATURE):
+        return "PNG"
+    if header.startswith(b"\xff\xd8"):
+        return "JPEG"
+    if len(header) >= 12 and header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "WEBP"
+    return None
+
+
+def read_text_metadata(path):
+    """Return ``(format, metadata)`` for ``path`` without decoding the image.
+
+    ``metadata`` maps metadata keys (PNG text keywords, ``parameters`` for
+    EXIF UserComment, ``prompt``/``workflow`` for ComfyUI EXIF tags, ...) to
+    their text values.  ``format`` is ``None`` for unsupported files.
+    """
+    path = Path(path)
+    with path.open("rb") as f:
+        header = f.read(12)
+        image_format = detect_image_format(header)
+        if image_format == "PNG":
+            f.seek(len(PNG_SIGNATURE))
+            return image_format, _read_png_text(f)
+        if image_format == "JPEG":
+            f.seek(2)
+            return image_format, _read_jpeg_text(f)
+        if image_format == "WEBP":
+            return image_format, _read_webp_text(f, header)
+    return None, {}
+
+
+# ---------------------------------------------------------------------------
+# PNG
+# ---------------------------------------------------------------------------
+
+def _read_png_text(f):
+    """Collect tEXt/iTXt/zTXt chunks, stopping at the image data.
+
+    Text chunks almost always precede IDAT.  When none were found before the
+    first IDAT chunk the remaining chunks are still visited, but image data is
+    skipped with ``seek`` rather than read.
+    """
+    metadata = {}
+    while True:
+        head = f.read(8)
+        if len(head) < 8:
+            break
+        length, chunk_type = struct.unpack(">I4s", head)
+        if chunk_type == b"IEND":
+            break
+        if chunk_type == b"IDAT":
+            if metadata:
+                break
+            f.seek(length + 4, 1)
+            continue
+        if chunk_type in (b"tEXt", b"iTXt", b"zTXt") and length <= MAX_METADATA_CHUNK:
+            data = f.read(length)
+            f.seek(4, 1)  # CRC
+            try:
+                key, value = _decode_png_text_chunk(chunk_type, data)
+            except Exception as e:
+                logger.debug("Skipping malformed %s chunk: %s", chunk_type.decode(), e)
+                continue
+            if key:
+                metadata[key] = value
+            continue
+        if chunk_type == b"eXIf" and length <= MAX_METADATA_CHUNK:
+            data = f.read(length)
+            f.seek(4, 1)
+            metadata.update(_parse_exif(data))
+            continue
+        f.seek(length + 4, 1)
+    return metadata
+
+
+def _decode_png_text_chunk(chunk_type, data):
+    """Decode a single PNG text chunk into ``(keyword, text)``."""
+    keyword, _, rest = data.partition(b"\x00")
+    key = keyword.decode("latin-1")
+    if chunk_type == b"tEXt":
+        return key, rest.decode("latin-1")
+    if chunk_type == b"zTXt":
+        # compression method byte followed by zlib stream
+        return key, zlib.decompress(rest[1:]).decode("latin-1")
+    # iTXt: compression flag, method, language tag \0, translated keyword \0, text
+    compressed = rest[0] if rest else 0
+    rest = rest[2:]
+    _language, _, rest = rest.partition(b"\x00")
+    _translated, _, text = rest.partition(b"\x00")
+    if compressed:
+        text = zlib.decompress(text)
+    return key, text.decode("utf-8", errors="replace")
+
+
+# ---------------------------------------------------------------------------
+# JPEG
+# ---------------------------------------------------------------------------
+
+def _read_jpeg_text(f):
+    """Collect EXIF, XMP and COM segments, stopping at start-of-scan."""
+    metadata = {}
+    while True:
+        byte = f.read(1)
+        if not byte:
+            break
+        if byte != b"\xff":
+            continue
+        marker = f.read(1)
+        while marker == b"\xff":  # fill bytes
+            marker = f.read(1)
+        if not marker:
+            break
+        code = marker[0]
+        if code == 0xD9 or code == 0xDA:  # EOI / SOS: no metadata beyond this point
+            break
+        if code == 0x01 or 0xD0 <= code <= 0xD8:  # markers without payload
+            continue
+        raw_len = f.read(2)
+        if len(raw_len) < 2:
+            break
+        length = struct.unpack(">H", raw_len)[0] - 2
+        if length < 0:
+            break
+        if code in (0xE1, 0xFE):  # APP1 (EXIF/XMP), COM
+            data = f.read(length)
+            if code == 0xFE:
+                text = data.decode("utf-8", errors="replace").strip("\x00").strip()
+                if text:
+                    metadata.setdefault("comment", text)
+            elif data.startswith(_EXIF_HEADER):
+                metadata.update(_parse_exif(data[len(_EXIF_HEADER):]))
+            elif data.startswith(_XMP_HEADER):
+                metadata.update(_parse_xmp(data[len(_XMP_HEADER):]))
+        else:
+            f.seek(length, 1)
+    return metadata
+
+
+# ---------------------------------------------------------------------------
+# WebP
+# ---------------------------------------------------------------------------
+
+_VP8X_FLAG_XMP = 0x04
+_VP8X_FLAG_EXIF = 0x08
+
+
+def _read_webp_text(f, header):
+    """Collect EXIF and XMP chunks from a RIFF/WebP container.
+
+    Metadata chunks follow the image data in extended (VP8X) files, so image
+    chunks are skipped with ``seek``.  Simple (non-VP8X) files cannot carry
+    metadata and return immediately.
+    """
+    metadata = {}
+    riff_size = struct.unpack("<I", header[4:8])[0]
+    end = 8 + riff_size
+    pending = None
+    f.seek(12)
+    while f.tell() + 8 <= end:
+        head = f.read(8)
+        if len(head) < 8:
+            break
+        chunk_type, length = struct.unpack("<4sI", head)
+        padded = length + (length & 1)
+        if chunk_type == b"VP8X":
+            data = f.read(length)
+            f.seek(padded - length, 1)
+            flags = data[0] if data else 0
+            pending = set()
+            if flags & _VP8X_FLAG_EXIF:
+                pending.add(b"EXIF")
+            if flags & _VP8X_FLAG_XMP:
+                pending.add(b"XMP ")
+            if not pending:
+                break
+            continue
+        if pending is None:
+            # Simple lossy/lossless file without VP8X header
+            break
+        if chunk_type in (b"EXIF", b"XMP ") and length <= MAX_METADATA_CHUNK:
+            data = f.read(length)
+            f.seek(padded - length, 1)
+            if chunk_type == b"EXIF":
+                if data.startswith(_EXIF_HEADER):
+                    data = data[len(_EXIF_HEADER):]
+                metadata.update(_parse_exif(data))
+            else:
+                metadata.update(_parse_xmp(data))
+            pending.discard(chunk_type)
+            if not pending:
+                break
+            continue
+        f.seek(padded, 1)
+    return metadata
+
+
+# ---------------------------------------------------------------------------
+# EXIF / XMP payloads
+# ---------------------------------------------------------------------------
+
+def _parse_exif(data):
+    """Return prompt-related text from a TIFF-structured EXIF payload."""
+    metadata = {}
+    try:
+        tags = _read_exif_text_tags(data)
+    except Exception as e:
+        logger.debug("Failed to parse EXIF payload: %s", e)
+        return metadata
+
+    for tag, value in tags.items():
+        if not value:
+            continue
+        match = _PREFIXED_KEY_RE.match(value)
+        if match:
+            metadata[match.group(1).lower()] = value[match.end():].strip()
+        elif tag in (_TAG_USER_COMMENT, _TAG_XP_COMMENT):
+            metadata.setdefault("parameters", value)
+        elif tag == _TAG_IMAGE_DESCRIPTION:
+            metadata.setdefault("ImageDescription", value)
+    return metadata
+
+
+def _read_exif_text_tags(data):
+    """Walk IFD0 and the EXIF sub-IFD returning ``{tag: text}``."""
+    if data[:2] == b"II":
+        endian = "<"
+    elif data[:2] == b"MM":
+        endian = ">"
+    else:
+        return {}
+    ifd_offset = struct.unpack(endian + "I", data[4:8])[0]
+
+    tags = {}
+    visited = set()
+    queue = [ifd_offset]
+    while queue:
+        offset = queue.pop(0)
+        if offset in visited or offset + 2 > len(data):
+            continue
+        visited.add(offset)
+        count = struct.unpack(endian + "H", data[offset:offset + 2])[0]
+        for i in range(count):
+            entry = offset + 2 + i * 12
+            if entry + 12 > len(data):
+                break
+            tag, typ, n = struct.unpack(endian + "HHI", data[entry:entry + 8])
+            if tag == _TAG_EXIF_IFD:
+                queue.append(struct.unpack(endian + "I", data[entry + 8:entry + 12])[0])
+                continue
+            if tag not in _EXIF_TEXT_TAGS:
+                continue
+            # Only ASCII (2), BYTE (1) and UNDEFINED (7) carry text
+            if typ not in (1, 2, 7):
+                continue
+            if n <= 4:
+                raw = data[entry + 8:entry + 8 + n]
+            else:
+                value_offset = struct.unpack(endian + "I", data[entry + 8:entry + 12])[0]
+                raw = data[value_offset:value_offset + n]
+            tags[tag] = _decode_exif_text(tag, raw, endian)
+    return tags
+
+
+def _decode_exif_text(tag, raw, endian):
+    """Decode the text of an EXIF tag according to its conventions."""
+    if tag == _TAG_USER_COMMENT:
+        code, body = raw[:8], raw[8:]
+        if code.startswith(b"UNICODE"):
+            return _decode_utf16(body, endian)
+        if code.startswith(b"JIS"):
+            return body.decode("shift_jis", errors="replace").strip("\x00").strip()
+        return body.decode("utf-8", errors="replace").strip("\x00").strip()
+    if tag == _TAG_XP_COMMENT:
+        return raw.decode("utf-16-le", errors="replace").strip("\x00").strip()
+    return raw.decode("utf-8", errors="replace").strip("\x00").strip()
+
+
+def _decode_utf16(body, endian):
+    """Decode UTF-16 text whose byte order may not match the TIFF header."""
+    if body[:2] in (b"\xff\xfe", b"\xfe\xff"):
+        return body.decode("utf-16", errors="replace").strip("\x00").strip()
+    # Writers disagree on byte order; ASCII-range text has its zero byte
+    # first in big-endian encoding.
+    if len(body) >= 2 and body[0] == 0 and body[1] != 0:
+        encoding = "utf-16-be"
+    elif len(body) >= 2 and body[1] == 0 and body[0] != 0:
+        encoding = "utf-16-le"
+    else:
+        encoding = "utf-16-be" if endian == ">" else "utf-16-le"
+    return body.decode(encoding, errors="replace").strip("\x00").strip()
+
+
+def _parse_xmp(data):
+    """Return prompt-related text from an XMP packet."""
+    metadata = {}
+    text = data.decode("utf-8", errors="replace")
+    for match in _XMP_ELEMENT_RE.finditer(text):
+        key = match.group(1).lower()
+        value = html.unescape(re.sub(r"<[^>]+>", "", match.group(2))).strip()
+        if value:
+            metadata.setdefault("parameters" if key == "usercomment" else key, value)
+    for match in _XMP_ATTRIBUTE_RE.finditer(text):
+        key = match.group(1).lower()
+        value = html.unescape(match.group(2)).strip()
+        if value:
+            metadata.setdefault("parameters" if key == "usercomment" else key, value)
+    if not metadata:
+        match = _XMP_DESCRIPTION_RE.search(text)
+        if match:
+            value = html.unescape(match.group(1)).strip()
+            if value:
+                metadata["description"] = value
+    return metadata
@@ -0,0 +1,463 @@
+"""Watch-folder ingestion of generator output into shots.
+
+An :class:`IngestService` polls configured folders (e.g. ComfyUI or A1111
+output directories), maps each new file to a shot and slot through a filename
+rule or a JSON sidecar, and feeds it through :meth:`FileHandler.save_file` so
+versioning, promotion, prompt import and thumbnails behave exactly like a
+browser upload.
+
+Files are handed from the scanner to a pool of worker threads through a
+bounded queue; when the workers fall behind the scanner blocks (backpressure)
+instead of buffering thousands of paths.  Every ingested file is appended to
+a ledger in ``.shotbuddy`` so a restart does not ingest it again.  Files that
+fail (a lock timeout, a full disk, an unmapped name) are retried with
+exponential backoff, and right away once they change.
+"""
+
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from app.config.constants import (
+    ALLOWED_IMAGE_EXTENSIONS,
+    ALLOWED_VIDEO_EXTENSIONS,
+    get_project_state_dir,
+)
+from app.services.atomic_io import atomic_write_json, atomic_write_text
+from app.services.shot_manager import validate_shot_name
+
+logger = logging.getLogger(__name__)
+
+INGEST_CONFIG_FILE = "ingest.json"
+INGEST_LEDGER_FILE = "ingest_ledger.jsonl"
+
+# Retry delay after the n-th consecutive failure of a file: 2, 4, 8 ... seconds
+RETRY_BASE_SECONDS = 2.0
+RETRY_MAX_SECONDS = 600.0
+
+# Default rule: a shot name anywhere at the start of the filename, optionally
+# followed by a slot keyword, e.g. ``SH010_first_00012_.png`` or ``SH020-video.mp4``.
+DEFAULT_PATTERN = r"^(?P<shot>SH\d{3}(?:_\d{3})?)(?:[_\-. ](?P<slot>first|last|image|video|driver|target|result))?"
+
+SLOT_ALIASES = {
+    "first": "first_image",
+    "first_image": "first_image",
+    "image": "first_image",
+    "last": "last_image",
+    "last_image": "last_image",
+    "video": "video",
+    "driver": "driver",
+    "target": "target",
+    "result": "result",
+}
+
+DEFAULT_CONFIG = {
+    "enabled": False,
+    "folders": [],
+    "workers": 4,
+    "queue_size": 64,
+    "interval": 2.0,
+    "settle_seconds": 2.0,
+}
+
+
+def load_ingest_config(project_path):
+    """Return the ingest configuration for a project, filled with defaults."""
+    path = get_project_state_dir(project_path) / INGEST_CONFIG_FILE
+    config = dict(DEFAULT_CONFIG)
+    try:
+        if path.exists():
+            with path.open('r', encoding='utf-8') as f:
+                data = json.load(f)
+                if isinstance(data, dict):
+                    config.update(data)
+    except Exception:
+        logger.exception("Error loading ingest config")
+    return config
+
+
+def save_ingest_config(project_path, data):
+    """Validate and persist the ingest configuration for a project."""
+    config = load_ingest_config(project_path)
+    for key in DEFAULT_CONFIG:
+        if key in data:
+            config[key] = data[key]
+
+    folders = []
+    for folder in config.get("folders") or []:
+        if isinstance(folder, str):
+            folder = {"path": folder}
+        if not isinstance(folder, dict) or not folder.get("path"):
+            raise ValueError("Each ingest folder needs a path")
+        pattern = folder.get("pattern") or DEFAULT_PATTERN
+        try:
+            compiled = re.compile(pattern, re.IGNORECASE)
+        except re.error as e:
+            raise ValueError(f"Invalid filename pattern: {e}")
+        if "shot" not in compiled.groupindex:
+            raise ValueError("Filename pattern must define a 'shot' group")
+        slot = folder.get("default_image_slot", "first_image")
+        if SLOT_ALIASES.get(slot) not in {"first_image", "last_image"}:
+            raise ValueError("default_image_slot must be first_image or last_image")
+        folders.append({
+            "path": str(folder["path"]),
+            "pattern": pattern,
+            "recursive": bool(folder.get("recursive", False)),
+            "default_image_slot": SLOT_ALIASES[slot],
+        })
+    config["folders"] = folders
+    config["enabled"] = bool(config.get("enabled"))
+    config["workers"] = max(1, int(config.get("workers") or 1))
+    config["queue_size"] = max(1, int(config.get("queue_size") or 1))
+    config["interval"] = max(0.2, float(config.get("interval") or DEFAULT_CONFIG["interval"]))
+    config["settle_seconds"] = max(0.0, float(config.get("settle_seconds") or 0))
+
+    path = get_project_state_dir(project_path) / INGEST_CONFIG_FILE
+    atomic_write_json(path, config, indent=2)
+    return config
+
+
+class LocalFile:
+    """Minimal stand-in for an uploaded ``FileStorage`` backed by a local path."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.filename = self.path.name
+
+    def save(self, dst):
+        shutil.copyfile(str(self.path), str(dst))
+
+
+class IngestLedger:
+    """Append-only record of ingested source files keyed by path, size and mtime.
+
+    Only successful ingests are recorded; failures are retried by the service.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        lines = 0
+        try:
+            with self.path.open('r', encoding='utf-8') as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    # Ledgers written by older versions also hold failures
+                    if isinstance(entry, dict) and entry.get("source") and entry.get("status") == "ok":
+                        self._entries[entry["source"]] = entry
+        except Exception:
+            logger.exception("Error loading ingest ledger")
+            return
+        # Superseded entries only accumulate when files are re-rendered in
+        # place; rewrite the ledger once they dominate it.
+        if lines > 2 * len(self._entries) + 100:
+            self._compact()
+
+    def _compact(self):
+        try:
+            atomic_write_text(self.path, "".join(json.dumps(entry) + "\n" for entry in self._entries.values()))
+        except Exception:
+            logger.exception("Error compacting ingest ledger")
+
+    def is_processed(self, source, size, mtime_ns):
+        entry = self._entries.get(source)
+        return bool(entry) and entry.get("size") == size and entry.get("mtime_ns") == mtime_ns
+
+    def record(self, entry):
+        with self._lock:
+            self._entries[entry["source"]] = entry
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open('a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def resolve_target(path, folder):
+    """Return ``(shot_name, file_type)`` for a source file or raise ``ValueError``.
+
+    A sidecar (``<file>.json`` or ``<stem>.json``) with ``shot_name`` and
+    optional ``file_type`` takes precedence over the folder's filename rule.
+    """
+    path = Path(path)
+    ext = path.suffix.lower()
+    is_image = ext in ALLOWED_IMAGE_EXTENSIONS
+
+    sidecar = read_sidecar(path)
+    shot_name = sidecar.get("shot_name") or sidecar.get("shot")
+    slot = sidecar.get("file_type") or sidecar.get("slot")
+
+    if not shot_name:
+        match = re.search(folder.get("pattern") or DEFAULT_PATTERN, path.name, re.IGNORECASE)
+        if not match:
+            raise ValueError(f"Filename does not match ingest rule: {path.name}")
+        shot_name = match.group("shot").upper()
+        if not slot and "slot" in match.groupdict():
+            slot = match.group("slot")
+
+    if slot:
+        file_type = SLOT_ALIASES.get(str(slot).lower())
+        if not file_type:
+            raise ValueError(f"Unknown slot: {slot}")
+    else:
+        file_type = folder.get("default_image_slot", "first_image") if is_image else "video"
+
+    if is_image and file_type not in {"first_image", "last_image"}:
+        raise ValueError(f"Image file mapped to video slot {file_type}: {path.name}")
+    if not is_image and file_type in {"first_image", "last_image"}:
+        raise ValueError(f"Video file mapped to image slot {file_type}: {path.name}")
+    shot_name = str(shot_name)
+    validate_shot_name(shot_name)
+    return shot_name, file_type
+
+
+def read_sidecar(path):
+    """Return the JSON sidecar dict for ``path`` or an empty dict."""
+    for candidate in (path.with_name(path.name + ".json"), path.with_suffix(".json")):
+        if candidate.exists():
+            try:
+                with candidate.open('r', encoding='utf-8') as f:
+                    data = json.load(f)
+                    if isinstance(data, dict):
+                        return data
+            except Exception:
+                logger.warning("Ignoring unreadable ingest sidecar %s", candidate)
+    return {}
+
+
+class IngestService:
+    """Background watcher feeding generator output into a project."""
+
+    def __init__(self, app, project_path, config=None):
+        self.app = app
+        self.project_path = Path(project_path).resolve()
+        self.config = config or load_ingest_config(self.project_path)
+        self.ledger = IngestLedger(get_project_state_dir(self.project_path) / INGEST_LEDGER_FILE)
+
+        self._queue = queue.Queue(maxsize=self.config["queue_size"])
+        self._stop = threading.Event()
+        self._threads = []
+        self._pending = {}      # source -> (size, mtime_ns) seen on the previous scan
+        self._failures = {}     # source -> (stamp, attempts, retry_at)
+        self._in_flight = set()
+        self._state_lock = threading.Lock()
+
+        self.stats = {"ingested": 0, "failed": 0, "last_error": None, "last_ingested": None}
+
+    # -- lifecycle ---------------------------------------------------------
+
+    @property
+    def running(self):
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        scanner = threading.Thread(target=self._scan_loop, name="ingest-scanner", daemon=True)
+        self._threads = [scanner]
+        for i in range(self.config["workers"]):
+            self._threads.append(
+                threading.Thread(target=self._worker_loop, name=f"ingest-worker-{i}", daemon=True)
+            )
+        for t in self._threads:
+            t.start()
+        logger.info("Started ingest for %s watching %d folder(s)", self.project_path, len(self.config["folders"]))
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+        logger.info("Stopped ingest for %s", self.project_path)
+
+    def status(self):
+        return {
+            "project": str(self.project_path),
+            "running": self.running,
+            "folders": self.config["folders"],
+            "queued": self._queue.qsize(),
+            "in_flight": len(self._in_flight),
+            "retrying": len(self._failures),
+            "ledger_entries": len(self.ledger),
+            **self.stats,
+        }
+
+    # -- scanning ----------------------------------------------------------
+
+    def _scan_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.scan_once()
+            except Exception:
+                logger.exception("Ingest scan failed")
+            self._stop.wait(self.config["interval"])
+
+    def scan_once(self):
+        """Scan all folders once and enqueue files that have settled."""
+        now = time.time()
+        seen = {}
+        for folder in self.config["folders"]:
+            for entry in self._iter_files(Path(folder["path"]), folder.get("recursive", False)):
+                if self._stop.is_set():
+                    return
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                source = os.path.abspath(entry.path)
+                stamp = (st.st_size, st.st_mtime_ns)
+                seen[source] = stamp
+                if self.ledger.is_processed(source, *stamp):
+                    continue
+                with self._state_lock:
+                    if source in self._in_flight:
+                        continue
+                    failure = self._failures.get(source)
+                    if failure and failure[0] == stamp and now < failure[2]:
+                        continue
+                # Generators write frames incrementally; only take a file once
+                # its size and mtime are unchanged across scans.
+                settled = self._pending.get(source) == stamp and now - st.st_mtime >= self.config["settle_seconds"]
+                if not settled:
+                    continue
+                with self._state_lock:
+                    self._in_flight.add(source)
+                # Blocks while the workers are saturated (backpressure)
+                while not self._stop.is_set():
+                    try:
+                        self._queue.put((source, stamp, folder), timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                else:
+                    # Stopped before it was queued; the next start picks it up
+                    with self._state_lock:
+                        self._in_flight.discard(source)
+                    return
+        self._pending = seen
+        with self._state_lock:
+            # Forget failures of files that were removed
+            for source in self._failures.keys() - seen.keys():
+                del self._failures[source]
+
+    @staticmethod
+    def _iter_files(root, recursive):
+        allowed = ALLOWED_IMAGE_EXTENSIONS | ALLOWED_VIDEO_EXTENSIONS
+        if not root.is_dir():
+            return
+        stack = [root]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    # Name order keeps numbered frames in version order
+                    for entry in sorted(it, key=lambda e: e.name):
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive and not entry.name.startswith('.'):
+                                stack.append(Path(entry.path))
+                        elif entry.is_file() and Path(entry.name).suffix.lower() in allowed:
+                            yield entry
+            except OSError as e:
+                logger.warning("Cannot scan ingest folder %s: %s", current, e)
+
+    # -- processing --------------------------------------------------------
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            try:
+                source, stamp, folder = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._ingest(source, stamp, folder)
+            finally:
+                with self._state_lock:
+                    self._in_flight.discard(source)
+                self._queue.task_done()
+
+    def _ingest(self, source, stamp, folder):
+        from app.services.file_handler import FileHandler
+        from app.services.shot_manager import get_shot_manager
+
+        entry = {
+            "source": source,
+            "size": stamp[0],
+            "mtime_ns": stamp[1],
+            "ingested": datetime.now().isoformat(),
+        }
+        try:
+            shot_name, file_type = resolve_target(source, folder)
+            entry.update({"shot_name": shot_name, "file_type": file_type})
+            with self.app.app_context():
+                manager = get_shot_manager(self.project_path)
+                with manager.locks.shot(shot_name), manager.journal.suspended():
+                    handler = FileHandler(self.project_path)
+                    result = handler.save_file(LocalFile(source), shot_name, file_type)
+                    sidecar_prompt = read_sidecar(Path(source)).get("prompt")
+                    if isinstance(sidecar_prompt, str) and sidecar_prompt.strip():
+                        manager.save_prompt(
+                            shot_name, file_type, result["version"], sidecar_prompt.strip()
+                        )
+                self.app.config['PROJECT_MANAGER'].update_project_timestamp(self.project_path)
+            entry.update({"status": "ok", "version": result["version"]})
+            self.ledger.record(entry)
+            with self._state_lock:
+                self._failures.pop(source, None)
+                self.stats["ingested"] += 1
+                self.stats["last_ingested"] = entry
+            logger.info("Ingested %s as %s %s v%03d", source, shot_name, file_type, result["version"])
+        except Exception as e:
+            entry.update({"status": "error", "error": str(e)})
+            with self._state_lock:
+                previous = self._failures.get(source)
+                attempts = previous[1] + 1 if previous and previous[0] == stamp else 1
+                delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+                self._failures[source] = (stamp, attempts, time.time() + delay)
+                self.stats["failed"] += 1
+                self.stats["last_error"] = entry
+            logger.warning("Failed to ingest %s (attempt %d, retrying in %.0fs): %s", source, attempts, delay, e)
+
+
+def find_ingest_service(app, project_path):
+    """Return the registered ``IngestService`` for a project or ``None``."""
+    return app.config.get('INGEST_SERVICES', {}).get(str(Path(project_path).resolve()))
+
+
+def get_ingest_service(app, project_path):
+    """Return the registered ``IngestService`` for a project, creating it if needed."""
+    # Worker threads need the real application object, not the context proxy
+    app = getattr(app, '_get_current_object', lambda: app)()
+    services = app.config.setdefault('INGEST_SERVICES', {})
+    key = str(Path(project_path).resolve())
+    if key not in services:
+        services[key] = IngestService(app, key)
+    return services[key]
+
+
+def ensure_ingest_running(app, project_path):
+    """Start ingestion for a project if its configuration enables it."""
+    try:
+        config = load_ingest_config(project_path)
+        if config.get("enabled") and config.get("folders"):
+            get_ingest_service(app, project_path).start()
+    except Exception:
+        logger.exception("Failed to start ingest for %s", project_path)
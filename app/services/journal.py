@@ -0,0 +1,244 @@
+"""Persistent undo log.
+
+Every metadata change made through :class:`ShotManager` (notes, caption,
+prompt, display name, reorder, archive, rename, promote) is appended as one
+JSON line to ``.shotbuddy/journal.jsonl`` with the value before and after the
+change.  The project files stay the source of truth for the current state;
+the log only holds the history that undo and redo walk through, and a change
+costs this small append on top of the usual metadata write.  Undo and redo
+are logged as lines of their own.
+
+On startup the undo and redo stacks are rebuilt by reading the log.  Once it
+has ``JOURNAL_COMPACT_LINES`` lines it is rewritten with only the last
+``SHOTBUDDY_UNDO_LIMIT`` operations of each stack.  A log whose size differs
+from what this instance last read or wrote was written by another process
+and is reloaded before the next operation.
+"""
+
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from app.config.constants import UNDO_LIMIT, get_project_state_dir
+from app.services.atomic_io import atomic_write_bytes, sync_appended
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FILE = "journal.jsonl"
+JOURNAL_COMPACT_LINES = 1000
+
+
+def _remove_seq(stack, seq):
+    for i in range(len(stack) - 1, -1, -1):
+        if stack[i]["seq"] == seq:
+            return stack.pop(i)
+    return None
+
+
+class Journal:
+    """Operation history of one project."""
+
+    def __init__(self, project_path, limit=UNDO_LIMIT):
+        self.path = get_project_state_dir(project_path) / JOURNAL_FILE
+        self.limit = max(1, limit)
+        self._lock = threading.Lock()
+        # Serialises undo/redo so two clicks never apply the same entry
+        self._undo_lock = threading.Lock()
+        self._local = threading.local()
+        self._seq = 0
+        self._lines = 0
+        # Journal size after our last read or append; a different size means
+        # another process (or manager instance) wrote to it
+        self._size = 0
+        self._undo = []
+        self._redo = []
+        self._load()
+
+    # -- persistence -------------------------------------------------------
+
+    def _load(self):
+        self._seq = self._lines = self._size = 0
+        self._undo, self._redo = [], []
+        try:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    self._size += len(line)
+                    self._lines += 1
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A torn last line from a crash mid-append
+                        continue
+                    self._replay(entry)
+        except FileNotFoundError:
+            pass
+        except Exception:
+            logger.exception("Error loading journal")
+        self._trim()
+
+    def _refresh(self):
+        """Reload if the journal changed behind our back; caller holds ``_lock``."""
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        if size != self._size:
+            self._load()
+
+    def _replay(self, entry):
+        self._seq = max(self._seq, entry["seq"])
+        kind = entry["kind"]
+        if kind == "op":
+            self._undo.append(entry)
+            self._redo.clear()
+        elif kind == "undo":
+            undone = _remove_seq(self._undo, entry["target"])
+            if undone is not None:
+                self._redo.append(undone)
+        elif kind == "redo":
+            redone = _remove_seq(self._redo, entry["target"])
+            if redone is not None:
+                self._undo.append(redone)
+
+    def _trim(self):
+        del self._undo[:-self.limit]
+        del self._redo[:-self.limit]
+
+    def _append(self, kind, **fields):
+        """Append a line; the caller holds ``_lock``."""
+        self._seq += 1
+        entry = {"seq": self._seq, "ts": datetime.now().isoformat(), "kind": kind, **fields}
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with open(self.path, "ab") as f:
+            f.write(line)
+            sync_appended(f, self.path)
+        self._size += len(line)
+        self._lines += 1
+        return entry
+
+    def _compact(self):
+        """Rewrite the log with only the live stacks; the caller holds ``_lock``.
+
+        The kept operations are written oldest first, followed by undo lines
+        that move the redo stack's entries back off the undo stack, so a
+        reload rebuilds both stacks in the same order.
+        """
+        if self._lines < JOURNAL_COMPACT_LINES:
+            return
+        self._trim()
+        entries = self._undo + self._redo[::-1]
+        lines = [json.dumps(entry, ensure_ascii=False) for entry in entries]
+        for entry in self._redo:
+            self._seq += 1
+            lines.append(json.dumps({"seq": self._seq, "ts": datetime.now().isoformat(), "kind": "undo",
+                                     "target": entry["seq"]}))
+        data = "".join(line + "\n" for line in lines).encode("utf-8")
+        try:
+            atomic_write_bytes(self.path, data, durable=True)
+        except OSError:
+            logger.exception("Failed to compact journal %s", self.path)
+            return
+        self._lines = len(lines)
+        self._size = len(data)
+
+    # -- recording ---------------------------------------------------------
+
+    @contextmanager
+    def suspended(self):
+        """Do not record changes made by this thread inside the block."""
+        previous = getattr(self._local, "suspended", False)
+        self._local.suspended = True
+        try:
+            yield
+        finally:
+            self._local.suspended = previous
+
+    @contextmanager
+    def grouped(self):
+        """Record the changes this thread makes inside the block as one entry.
+
+        The entry has op ``batch`` and lists the changes under ``entries``;
+        ``before`` and ``after`` hold their before and after values in order.
+        Changes made before an exception are still recorded.  A group with a
+        single change records it as it is.
+        """
+        if getattr(self._local, "group", None) is not None:
+            yield
+            return
+        self._local.group = []
+        try:
+            yield
+        finally:
+            changes, self._local.group = self._local.group, None
+            if len(changes) == 1:
+                self.record(**changes[0])
+            elif changes:
+                self.record("batch", None, [c["before"] for c in changes], [c["after"] for c in changes],
+                            entries=changes)
+
+    def record(self, op, shot, before, after, **details):
+        """Record one operation; unchanged values are not recorded."""
+        if before == after or getattr(self._local, "suspended", False):
+            return None
+        group = getattr(self._local, "group", None)
+        if group is not None:
+            group.append({"op": op, "shot": shot, "before": before, "after": after, **details})
+            return None
+        with self._lock:
+            self._refresh()
+            entry = self._append("op", op=op, shot=shot, before=before, after=after, **details)
+            self._undo.append(entry)
+            self._redo.clear()
+            self._trim()
+            self._compact()
+            return entry
+
+    # -- undo / redo -------------------------------------------------------
+
+    def undo(self, apply):
+        """Revert the latest operation with ``apply(entry, entry['before'])``."""
+        return self._step("undo", "before", apply)
+
+    def redo(self, apply):
+        """Re-apply the latest undone operation with ``apply(entry, entry['after'])``."""
+        return self._step("redo", "after", apply)
+
+    def _step(self, kind, value_key, apply):
+        with self._undo_lock:
+            with self._lock:
+                self._refresh()
+                source, target = (self._undo, self._redo) if kind == "undo" else (self._redo, self._undo)
+                if not source:
+                    return None
+                entry = source.pop()
+            try:
+                # Shot locks are taken inside apply, so _lock must not be held
+                with self.suspended():
+                    apply(entry, entry[value_key])
+            except Exception:
+                with self._lock:
+                    source.append(entry)
+                raise
+            with self._lock:
+                self._append(kind, target=entry["seq"])
+                target.append(entry)
+                self._trim()
+                self._compact()
+            return entry
+
+    def __len__(self):
+        """Number of operations held for undo and redo."""
+        with self._lock:
+            return len(self._undo) + len(self._redo)
+
+    def history(self, limit=20):
+        with self._lock:
+            self._refresh()
+            return {
+                "undo": [dict(e) for e in reversed(self._undo[-limit:])],
+                "redo": [dict(e) for e in reversed(self._redo[-limit:])],
+                "can_undo": bool(self._undo),
+                "can_redo": bool(self._redo),
+            }
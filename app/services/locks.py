@@ -0,0 +1,155 @@
+"""Per-shot and project-wide locks shared by threads and processes.
+
+Each lock is a ``threading.RLock`` for the threads of this process combined
+with an OS file lock on ``.shotbuddy/locks/<name>.lock`` (``fcntl.flock`` on
+POSIX, ``msvcrt.locking`` on Windows), so several Shotbuddy processes serving
+the same project serialise their writes too.  Locks are re-entrant within a
+thread; the file lock is taken by the outermost acquisition only.
+
+To avoid deadlocks, locks are always taken in this order:
+
+1. ``ORDER_LOCK`` - the shot set and ``.shot_order.json`` (create, rename,
+   reorder)
+2. shot locks, several at once in sorted name order (:meth:`LockManager.shots`)
+3. ``ARCHIVE_LOCK`` - ``.archived_shots.json``
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from app.config.constants import LOCK_TIMEOUT, get_project_state_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+LOCK_DIR = "locks"
+ORDER_LOCK = "order"
+ARCHIVE_LOCK = "archive"
+
+_POLL_INTERVAL = 0.02
+
+# Lock objects are shared by every LockManager of a project, so a ShotManager
+# rebuilt after clear_shot_manager_cache() still excludes the old instance
+_registry = {}
+_registry_guard = threading.Lock()
+
+
+class LockTimeout(RuntimeError):
+    """Raised when a lock could not be acquired within the timeout."""
+
+
+def _try_lock_file(fd):
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock_file(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class _NamedLock:
+    """Re-entrant thread lock backed by a cross-process lock file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        if not self._lock.acquire(timeout=timeout):
+            raise LockTimeout(f"Timed out waiting for lock {self.path.stem}")
+        if self._depth == 0:
+            try:
+                self._acquire_file(deadline)
+            except BaseException:
+                self._lock.release()
+                raise
+        self._depth += 1
+
+    def _acquire_file(self, deadline):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        while not _try_lock_file(fd):
+            if time.monotonic() >= deadline:
+                os.close(fd)
+                raise LockTimeout(f"Timed out waiting for lock {self.path.stem} held by another process")
+            time.sleep(_POLL_INTERVAL)
+        self._fd = fd
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            fd, self._fd = self._fd, None
+            try:
+                _unlock_file(fd)
+            except OSError:
+                logger.warning("Failed to unlock %s", self.path)
+            finally:
+                os.close(fd)
+        self._lock.release()
+
+
+class LockManager:
+    """Named locks for one project."""
+
+    def __init__(self, project_path, timeout=LOCK_TIMEOUT):
+        self.root = get_project_state_dir(project_path) / LOCK_DIR
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+
+    def _get(self, name):
+        path = self.root / f"{name}.lock"
+        with _registry_guard:
+            lock = _registry.get(path)
+            if lock is None:
+                lock = _registry[path] = _NamedLock(path)
+            return lock
+
+    @contextmanager
+    def _hold(self, name):
+        lock = self._get(name)
+        lock.acquire(self.timeout)
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def project(self, name):
+        """Project-wide lock, e.g. ``ORDER_LOCK`` or ``ARCHIVE_LOCK``."""
+        return self._hold(f"project-{name}")
+
+    def shot(self, shot_name):
+        """Lock for the files of one shot; raises ``ValueError`` for an invalid name."""
+        from app.services.shot_manager import validate_shot_name
+
+        # The name becomes part of a path, so it is checked before any file
+        # or registry entry is created for it
+        validate_shot_name(shot_name)
+        return self._hold(f"shot-{shot_name}")
+
+    @contextmanager
+    def shots(self, *shot_names):
+        """Lock several shots at once, in a deadlock-free order."""
+        with ExitStack() as stack:
+            for name in sorted(set(shot_names)):
+                stack.enter_context(self.shot(name))
+            yield
@@ -0,0 +1,505 @@
+"""Media probing with a persistent per-project cache.
+
+Image dimensions come from the file header via Pillow's lazy ``Image.open``.
+Video duration, frame rate, resolution, codec, pixel format and the audio
+sample rate and channel count are read from the MP4/MOV ``moov`` box, skipping ``mdat`` with ``seek``; ``ffprobe`` is only used when
+the container cannot be parsed.  Results are cached in
+``.shotbuddy/media_probe.json`` keyed by path and validated against the file's
+size and mtime, so listing a project never re-probes unchanged media.  Content
+hashes requested through :meth:`MediaProbeCache.digest` are cached the same
+way.  New results are written out debounced, together with the shot list
+cache, and at shutdown.
+"""
+
+import json
+import logging
+import os
+import shutil
+import struct
+import subprocess
+import threading
+from pathlib import Path
+
+from PIL import Image
+
+from app.config.constants import (
+    ALLOWED_IMAGE_EXTENSIONS,
+    ALLOWED_VIDEO_EXTENSIONS,
+    SHOT_CACHE_FLUSH_DELAY,
+    get_project_state_dir,
+)
+from app.services.atomic_io import atomic_write_json
+from app.services.content_store import hash_file
+from app.services.write_behind import WriteBehind
+
+logger = logging.getLogger(__name__)
+
+MEDIA_PROBE_FILE = "media_probe.json"
+
+# Bump when the shape of probe results changes to invalidate old entries
+PROBE_VERSION = 2
+
+# A moov box larger than this is not read into memory
+MAX_MOOV_SIZE = 64 * 1024 * 1024
+
+VIDEO_CODECS = {
+    b"avc1": "h264",
+    b"avc3": "h264",
+    b"hvc1": "hevc",
+    b"hev1": "hevc",
+    b"av01": "av1",
+    b"vp09": "vp9",
+    b"mp4v": "mpeg4",
+    b"jpeg": "mjpeg",
+    b"apcn": "prores",
+    b"apch": "prores",
+    b"apcs": "prores",
+    b"apco": "prores",
+    b"ap4h": "prores",
+    b"ap4x": "prores",
+}
+
+AUDIO_CODECS = {
+    b"mp4a": "aac",
+    b"Opus": "opus",
+    b"ac-3": "ac3",
+    b"ec-3": "eac3",
+    b"lpcm": "pcm",
+    b"sowt": "pcm_s16le",
+    b"twos": "pcm_s16be",
+    b"in24": "pcm_s24",
+}
+
+# ProRes flavours have a fixed pixel format; 4444 carries alpha at depth 32
+PRORES_PIX_FMTS = {
+    b"apco": "yuv422p10le",
+    b"apcs": "yuv422p10le",
+    b"apcn": "yuv422p10le",
+    b"apch": "yuv422p10le",
+    b"ap4h": "yuv444p12le",
+    b"ap4x": "yuv444p12le",
+}
+
+# H.264 profiles whose avcC record carries chroma format and bit depth
+AVC_HIGH_PROFILES = {100, 110, 122, 144, 244, 44, 83, 86, 118, 128, 138, 139, 134, 135}
+
+CHROMA_PIX_FMTS = {0: "gray", 1: "yuv420p", 2: "yuv422p", 3: "yuv444p"}
+
+# vpcC chroma subsampling value -> chroma format (both 4:2:0 sitings map to 1)
+VP9_CHROMA_FORMATS = {0: 1, 1: 1, 2: 2, 3: 3}
+
+
+def probe_file(path):
+    """Return a probe dict for an image or video file, or ``None``."""
+    path = Path(path)
+    ext = path.suffix.lower()
+    try:
+        if ext in ALLOWED_IMAGE_EXTENSIONS:
+            return probe_image(path)
+        if ext in ALLOWED_VIDEO_EXTENSIONS:
+            return probe_video(path)
+    except Exception as e:
+        logger.warning("Failed to probe %s: %s", path, e)
+    return None
+
+
+def probe_image(path):
+    """Return dimensions and format of an image without decoding pixels."""
+    with Image.open(path) as img:
+        width, height = img.size
+        return {
+            "kind": "image",
+            "width": width,
+            "height": height,
+            "codec": (img.format or "").lower(),
+            "mode": img.mode,
+        }
+
+
+def probe_video(path):
+    """Return duration, fps, resolution and codec of a video file."""
+    info = None
+    try:
+        info = _probe_mp4(path)
+    except Exception as e:
+        logger.debug("MP4 header parse failed for %s: %s", path, e)
+    if info and info.get("duration"):
+        return info
+    return _probe_ffprobe(path) or info
+
+
+# ---------------------------------------------------------------------------
+# MP4/MOV header parsing
+# ---------------------------------------------------------------------------
+
+def _iter_boxes(data, start, end):
+    """Yield ``(type, payload_start, box_end)`` for boxes in ``data[start:end]``."""
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack(">I4s", data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield box_type, pos + header, min(pos + size, end)
+        pos += size
+
+
+def _find_box(data, start, end, box_type):
+    for typ, payload, box_end in _iter_boxes(data, start, end):
+        if typ == box_type:
+            return payload, box_end
+    return None
+
+
+def _read_moov(path):
+    """Return the raw ``moov`` payload, skipping other top-level boxes."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        file_size = f.tell()
+        pos = 0
+        while pos + 8 <= file_size:
+            f.seek(pos)
+            head = f.read(16)
+            size, box_type = struct.unpack(">I4s", head[:8])
+            header = 8
+            if size == 1:
+                size = struct.unpack(">Q", head[8:16])[0]
+                header = 16
+            elif size == 0:
+                size = file_size - pos
+            if size < header:
+                return None
+            if box_type == b"moov":
+                if size > MAX_MOOV_SIZE:
+                    return None
+                f.seek(pos + header)
+                return f.read(size - header)
+            pos += size
+    return None
+
+
+def _full_box_times(data, payload):
+    """Return ``(timescale, duration)`` from an mvhd/mdhd full box."""
+    version = data[payload]
+    if version == 1:
+        timescale, duration = struct.unpack(">IQ", data[payload + 20:payload + 32])
+    else:
+        timescale, duration = struct.unpack(">II", data[payload + 12:payload + 20])
+    return timescale, duration
+
+
+def _yuv_pix_fmt(chroma, depth):
+    """Return the ffmpeg pixel format name for a chroma format and bit depth."""
+    name = CHROMA_PIX_FMTS.get(chroma)
+    if name is None:
+        return None
+    return f"{name}{depth}le" if depth > 8 else name
+
+
+def _skip_parameter_sets(data, pos, count):
+    for _ in range(count):
+        pos += 2 + struct.unpack(">H", data[pos:pos + 2])[0]
+    return pos
+
+
+def _avc_pix_fmt(data, start, end):
+    """Read chroma format and bit depth from an ``avcC`` record."""
+    if data[start + 1] not in AVC_HIGH_PROFILES:
+        return "yuv420p"
+    pos = _skip_parameter_sets(data, start + 6, data[start + 5] & 0x1F)
+    pos = _skip_parameter_sets(data, pos + 1, data[pos])
+    if pos + 2 > end:
+        # Extension omitted by the encoder; 4:2:0 8-bit is the norm
+        return "yuv420p"
+    return _yuv_pix_fmt(data[pos] & 0x03, (data[pos + 1] & 0x07) + 8)
+
+
+def _av1_pix_fmt(data, start):
+    flags = data[start + 2]
+    depth = 12 if flags & 0x60 == 0x60 else 10 if flags & 0x40 else 8
+    if flags & 0x10:
+        return _yuv_pix_fmt(0, depth)
+    subsampling_x, subsampling_y = flags & 0x08, flags & 0x04
+    return _yuv_pix_fmt(1 if subsampling_y else 2 if subsampling_x else 3, depth)
+
+
+def _video_pix_fmt(data, entry, entry_end, fourcc):
+    """Return the pixel format of a visual sample entry, or ``None``."""
+    if fourcc in PRORES_PIX_FMTS:
+        depth = struct.unpack(">H", data[entry + 82:entry + 84])[0]
+        return "yuva444p12le" if fourcc in {b"ap4h", b"ap4x"} and depth == 32 else PRORES_PIX_FMTS[fourcc]
+    if fourcc == b"mp4v":
+        return "yuv420p"
+    # Codec configuration boxes follow the 86-byte visual sample entry
+    for typ, payload, box_end in _iter_boxes(data, entry + 86, entry_end):
+        if typ == b"avcC":
+            return _avc_pix_fmt(data, payload, box_end)
+        if typ == b"hvcC":
+            return _yuv_pix_fmt(data[payload + 16] & 0x03, (data[payload + 17] & 0x07) + 8)
+        if typ == b"av1C":
+            return _av1_pix_fmt(data, payload)
+        if typ == b"vpcC":
+            packed = data[payload + 6]
+            return _yuv_pix_fmt(VP9_CHROMA_FORMATS.get((packed >> 1) & 0x07), packed >> 4)
+    return None
+
+
+def _audio_format(data, entry):
+    """Return ``(sample_rate, channels)`` of a sound sample entry."""
+    if struct.unpack(">H", data[entry + 16:entry + 18])[0] == 2:
+        # QuickTime v2 entries store a float64 rate and a 32-bit channel count
+        sample_rate = struct.unpack(">d", data[entry + 40:entry + 48])[0]
+        channels = struct.unpack(">I", data[entry + 48:entry + 52])[0]
+    else:
+        channels = struct.unpack(">H", data[entry + 24:entry + 26])[0]
+        sample_rate = struct.unpack(">I", data[entry + 32:entry + 36])[0] >> 16
+    return int(sample_rate), channels
+
+
+def _probe_mp4(path):
+    moov = _read_moov(path)
+    if not moov:
+        return None
+    end = len(moov)
+
+    info = {"kind": "video"}
+    mvhd = _find_box(moov, 0, end, b"mvhd")
+    if mvhd:
+        timescale, duration = _full_box_times(moov, mvhd[0])
+        if timescale:
+            info["duration"] = round(duration / timescale, 3)
+
+    info["has_audio"] = False
+    for typ, payload, box_end in _iter_boxes(moov, 0, end):
+        if typ != b"trak":
+            continue
+        mdia = _find_box(moov, payload, box_end, b"mdia")
+        if not mdia:
+            continue
+        hdlr = _find_box(moov, mdia[0], mdia[1], b"hdlr")
+        handler = moov[hdlr[0] + 8:hdlr[0] + 12] if hdlr else b""
+        stbl = None
+        minf = _find_box(moov, mdia[0], mdia[1], b"minf")
+        if minf:
+            stbl = _find_box(moov, minf[0], minf[1], b"stbl")
+        fourcc = entry = entry_end = None
+        if stbl:
+            stsd = _find_box(moov, stbl[0], stbl[1], b"stsd")
+            if stsd:
+                # First sample entry: size, format, then the entry body
+                entry = stsd[0] + 8
+                entry_end = min(entry + struct.unpack(">I", moov[entry:entry + 4])[0], stsd[1])
+                fourcc = moov[entry + 4:entry + 8]
+
+        if handler == b"soun":
+            if not info["has_audio"]:
+                info["has_audio"] = True
+                if fourcc:
+                    info["audio_codec"] = AUDIO_CODECS.get(fourcc, fourcc.decode("latin-1").strip())
+                    info["sample_rate"], info["channels"] = _audio_format(moov, entry)
+            continue
+        if handler != b"vide" or "codec" in info:
+            continue
+
+        if fourcc:
+            info["codec"] = VIDEO_CODECS.get(fourcc, fourcc.decode("latin-1").strip())
+            pix_fmt = _video_pix_fmt(moov, entry, entry_end, fourcc)
+            if pix_fmt:
+                info["pix_fmt"] = pix_fmt
+        tkhd = _find_box(moov, payload, box_end, b"tkhd")
+        if tkhd:
+            width, height = struct.unpack(">II", moov[tkhd[1] - 8:tkhd[1]])
+            info["width"] = width >> 16
+            info["height"] = height >> 16
+        mdhd = _find_box(moov, mdia[0], mdia[1], b"mdhd")
+        frames = 0
+        if stbl:
+            stts = _find_box(moov, stbl[0], stbl[1], b"stts")
+            if stts:
+                count = struct.unpack(">I", moov[stts[0] + 4:stts[0] + 8])[0]
+                for i in range(count):
+                    offset = stts[0] + 8 + i * 8
+                    frames += struct.unpack(">I", moov[offset:offset + 4])[0]
+        if mdhd:
+            timescale, duration = _full_box_times(moov, mdhd[0])
+            if timescale and duration:
+                track_duration = duration / timescale
+                info.setdefault("duration", round(track_duration, 3))
+                if frames:
+                    info["frames"] = frames
+                    info["fps"] = round(frames / track_duration, 3)
+    return info
+
+
+# ---------------------------------------------------------------------------
+# ffprobe fallback
+# ---------------------------------------------------------------------------
+
+def _parse_rate(rate):
+    try:
+        num, _, den = str(rate).partition("/")
+        num, den = float(num), float(den or 1)
+        return round(num / den, 3) if den else None
+    except ValueError:
+        return None
+
+
+def _probe_ffprobe(path):
+    ffprobe = shutil.which("ffprobe")
+    if not ffprobe:
+        logger.warning("ffprobe not found; cannot probe %s", path)
+        return None
+    cmd = [ffprobe, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", str(path)]
+    result = subprocess.run(cmd, check=True, capture_output=True, shell=False, timeout=60)  # noqa: S603
+    data = json.loads(result.stdout or b"{}")
+
+    info = {"kind": "video", "has_audio": False}
+    try:
+        info["duration"] = round(float(data.get("format", {}).get("duration")), 3)
+    except (TypeError, ValueError):
+        pass
+    for stream in data.get("streams", []):
+        if stream.get("codec_type") == "audio":
+            if not info["has_audio"]:
+                info["has_audio"] = True
+                info["audio_codec"] = stream.get("codec_name")
+                if str(stream.get("sample_rate", "")).isdigit():
+                    info["sample_rate"] = int(stream["sample_rate"])
+                if stream.get("channels"):
+                    info["channels"] = stream["channels"]
+        elif stream.get("codec_type") == "video" and "codec" not in info:
+            info["codec"] = stream.get("codec_name")
+            info["width"] = stream.get("width")
+            info["height"] = stream.get("height")
+            if stream.get("pix_fmt"):
+                info["pix_fmt"] = stream["pix_fmt"]
+            fps = _parse_rate(stream.get("avg_frame_rate")) or _parse_rate(stream.get("r_frame_rate"))
+            if fps:
+                info["fps"] = fps
+            if str(stream.get("nb_frames", "")).isdigit():
+                info["frames"] = int(stream["nb_frames"])
+    return info
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+class MediaProbeCache:
+    """Probe results for a project's media, persisted in ``.shotbuddy``."""
+
+    def __init__(self, project_path, flush_delay=SHOT_CACHE_FLUSH_DELAY):
+        self.path = get_project_state_dir(project_path) / MEDIA_PROBE_FILE
+        self._lock = threading.RLock()
+        self._entries = None
+        self._writer = WriteBehind(self._write, flush_delay, flush_delay * 4)
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        try:
+            if self.path.exists():
+                with self.path.open('r', encoding='utf-8') as f:
+                    data = json.load(f)
+                    if isinstance(data, dict) and data.get("version") == PROBE_VERSION:
+                        self._entries = data.get("entries", {})
+        except Exception:
+            logger.exception("Error loading media probe cache")
+
+    def get(self, path):
+        """Return cached or fresh probe info for ``path`` (``None`` if unavailable)."""
+        if not path:
+            return None
+        path = Path(path)
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        key = str(path)
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+                return entry.get("info")
+
+        info = probe_file(path)
+        with self._lock:
+            self._entries[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "info": info}
+        self._writer.mark()
+        return info
+
+    def _current_entry(self, path):
+        """Return the entry for ``path`` if it matches the file on disk."""
+        path = Path(path)
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        with self._lock:
+            self._load()
+            entry = self._entries.get(str(path))
+            if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+                return entry
+        return None
+
+    def cached(self, path):
+        """Return probe info for ``path`` if already known, without probing."""
+        entry = self._current_entry(path)
+        return entry.get("info") if entry else None
+
+    def cached_digest(self, path):
+        """Return the SHA-256 of ``path`` if already known, without hashing."""
+        entry = self._current_entry(path)
+        return entry.get("sha256") if entry else None
+
+    def digest(self, path):
+        """Return the SHA-256 of ``path``, hashed once per size/mtime."""
+        path = Path(path)
+        st = path.stat()
+        key = str(path)
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns \
+                    and entry.get("sha256"):
+                return entry["sha256"]
+
+        value = hash_file(path)
+        self.get(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+                entry["sha256"] = value
+        self._writer.mark()
+        return value
+
+    def forget(self, path):
+        with self._lock:
+            self._load()
+            removed = self._entries.pop(str(path), None) is not None
+        if removed:
+            self._writer.mark()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries or ())
+
+    def flush(self):
+        """Write pending changes to ``.shotbuddy/media_probe.json`` now."""
+        self._writer.flush()
+
+    def _write(self):
+        with self._lock:
+            if self._entries is None:
+                return
+            entries = dict(self._entries)
+        # Drop entries for files that no longer exist
+        entries = {k: v for k, v in entries.items() if os.path.exists(k)}
+        atomic_write_json(self.path, {"version": PROBE_VERSION, "entries": entries})
+        logger.debug("Saved media probe cache with %d entries", len(entries))
@@ -2,13 +2,39 @@
 
 import json
 import logging
+import threading
 from datetime import datetime
 from pathlib import Path
 
-from app.config.constants import PROJECTS_FILE
+from app.config.constants import METADATA_FLUSH_DELAY, METADATA_FLUSH_MAX_DELAY, PROJECTS_FILE
+from app.services.atomic_io import atomic_write_json
+from app.services.write_behind import WriteBehind
 
 logger = logging.getLogger(__name__)
 
+# A browser session keeps its own current project in this cookie (set when a
+# project is opened or created); API clients can send the header instead.
+# Without either, the server-wide current project from projects.json is used.
+PROJECT_COOKIE = 'shotbuddy_project'
+PROJECT_HEADER = 'X-Shotbuddy-Project'
+
+
+def session_project_path():
+    """Return the project path chosen by the current request, if any."""
+    from flask import has_request_context, request
+
+    if not has_request_context():
+        return None
+    raw = request.headers.get(PROJECT_HEADER) or request.cookies.get(PROJECT_COOKIE)
+    if not raw:
+        return None
+    from app.utils import sanitize_path
+    try:
+        return str(sanitize_path(raw).resolve())
+    except (OSError, ValueError):
+        return None
+
+
 class ProjectManager:
     def __init__(self):
         self.projects_file = Path(PROJECTS_FILE).resolve()
@@ -18,6 +44,16 @@ class ProjectManager:
             'last_scanned': {},
             'last_project_location': None
         }
+        # Cached results of get_current_project() by project path; see
+        # invalidate_project_context()
+        self._contexts = {}
+        self._context_lock = threading.Lock()
+        # Write-behind state: projects.json and 'updated' stamps are written
+        # on a short debounce instead of once per request (see flush())
+        self._info_lock = threading.RLock()
+        self._projects_dirty = False
+        self._pending_timestamps = {}
+        self._writer = WriteBehind(self._write_pending, METADATA_FLUSH_DELAY, METADATA_FLUSH_MAX_DELAY)
         self.ensure_config_dir()
         self.load_projects()
 
@@ -47,12 +83,46 @@ class ProjectManager:
         logger.info("Loaded current project: %s", self.projects.get('current_project'))
 
     def save_projects(self):
-        try:
-            with self.projects_file.open('w') as f:
-                json.dump(self.projects, f, indent=2)
-            logger.info("Saved current project: %s", self.projects.get('current_project'))
-        except Exception as e:
-            logger.warning("Failed to save projects.json: %s", e)
+        """Schedule a write of projects.json (coalesced, see flush())."""
+        with self._info_lock:
+            self._projects_dirty = True
+        self._writer.mark()
+
+    def flush(self):
+        """Write pending projects.json and timestamp changes now."""
+        self._writer.flush()
+
+    def _write_pending(self):
+        """Write projects.json and pending stamps; raise if anything failed.
+
+        Stamps stay in ``_pending_timestamps`` (and so visible to
+        load_project_info()) until they are on disk, and whatever failed is
+        left pending for the write-behind retry.
+        """
+        with self._info_lock:
+            projects = json.loads(json.dumps(self.projects)) if self._projects_dirty else None
+            self._projects_dirty = False
+            stamps = dict(self._pending_timestamps)
+        failed = []
+        if projects is not None:
+            try:
+                atomic_write_json(self.projects_file, projects, durable=True, indent=2)
+                logger.info("Saved current project: %s", projects.get('current_project'))
+            except Exception as e:
+                logger.warning("Failed to save projects.json: %s", e)
+                with self._info_lock:
+                    self._projects_dirty = True
+                failed.append(str(self.projects_file))
+        for project_path, updated in stamps.items():
+            if not self._write_project_timestamp(Path(project_path), updated):
+                failed.append(project_path)
+                continue
+            with self._info_lock:
+                # Keep a newer stamp that arrived during the write
+                if self._pending_timestamps.get(project_path) == updated:
+                    del self._pending_timestamps[project_path]
+        if failed:
+            raise OSError(f"Failed to write project metadata for {', '.join(failed)}")
 
     def get_last_project_location(self):
         """Get the last location used for project creation"""
@@ -90,9 +160,9 @@ class ProjectManager:
         }
         
         # Save the project info file
-        with open(project_info_path, 'w', encoding='utf-8') as f:
-            json.dump(project_info, f, indent=2, ensure_ascii=False)
-        
+        atomic_write_json(project_info_path, project_info, indent=2, ensure_ascii=False)
+
+        self._update_context_info(project_path, project_info)
         return project_info
 
     def load_project_info(self, project_path):
@@ -120,14 +190,17 @@ class ProjectManager:
                     if 'created' not in project_info:
                         project_info['created'] = created_default
                         # Persist the backfilled created timestamp
-                        with open(project_info_path, 'w', encoding='utf-8') as fw:
-                            json.dump(project_info, fw, indent=2, ensure_ascii=False)
+                        atomic_write_json(project_info_path, project_info, indent=2, ensure_ascii=False)
                     for key, value in defaults.items():
                         if key not in project_info:
                             project_info[key] = value
                     # For backward compatibility, if notes is empty but description exists, use description as notes
                     if not project_info.get('notes') and project_info.get('description'):
                         project_info['notes'] = project_info['description']
+                    # A newer 'updated' may still be waiting to be written
+                    pending = self._pending_timestamps.get(str(project_path.resolve()))
+                    if pending:
+                        project_info['updated'] = pending
                     return project_info
             except Exception as e:
                 logger.error("Failed to load project info: %s", e)
@@ -151,6 +224,12 @@ class ProjectManager:
         """Save project information to file."""
         # Convert to Path object if it's a string
         project_path = Path(project_path)
+        with self._info_lock:
+            # This write sets 'updated' itself, superseding a pending stamp
+            self._pending_timestamps.pop(str(project_path.resolve()), None)
+            return self._save_project_info(project_path, info_data)
+
+    def _save_project_info(self, project_path, info_data):
         project_info_path = self.get_project_info_file_path(project_path)
 
         # Load existing project info to preserve created timestamp
@@ -204,25 +283,52 @@ class ProjectManager:
         merged_info['description'] = merged_info.get('notes', '')
 
         # Write to file
-        with open(project_info_path, 'w', encoding='utf-8') as f:
-            json.dump(merged_info, f, indent=2, ensure_ascii=False)
+        atomic_write_json(project_info_path, merged_info, indent=2, ensure_ascii=False)
 
+        self._update_context_info(project_path, merged_info)
         return merged_info
 
     def update_project_timestamp(self, project_path):
-        """Update only the 'updated' timestamp for a project. Best-effort operation."""
+        """Update only the 'updated' timestamp for a project. Best-effort operation.
+
+        The new timestamp is visible immediately through get_current_project()
+        and load_project_info(); the file is rewritten on the write-behind
+        debounce, so a burst of edits costs one write.
+        """
         try:
-            # Convert to Path object if it's a string
-            project_path = Path(project_path)
-            project_info_path = self.get_project_info_file_path(project_path)
+            project_path = Path(project_path).resolve()
+            updated = datetime.now().isoformat()
+            with self._info_lock:
+                self._pending_timestamps[str(project_path)] = updated
+            self._update_context_info(project_path, {'updated': updated}, merge=True)
+            self._writer.mark()
+        except Exception as e:
+            logger.warning("Failed to update project timestamp for %s: %s", project_path, e)
+            # Don't raise - timestamp updates are best-effort
 
-            # Load existing project info or create defaults
-            if project_info_path.exists():
-                try:
-                    with open(project_info_path, encoding='utf-8') as f:
-                        project_info = json.load(f)
-                except Exception as e:
-                    logger.warning("Failed to load existing project info for timestamp update: %s", e)
+    def _write_project_timestamp(self, project_path, updated):
+        """Persist a coalesced 'updated' timestamp to project_info.json.
+
+        Returns False if the file could not be written.
+        """
+        try:
+            project_info_path = self.get_project_info_file_path(project_path)
+            with self._info_lock:
+                if self._pending_timestamps.get(str(project_path), updated) != updated:
+                    # A newer stamp arrived meanwhile; the next flush writes it
+                    return True
+                if not project_path.is_dir():
+                    # Project removed or moved; nothing left to stamp
+                    return True
+                # Load existing project info or create defaults
+                project_info = None
+                if project_info_path.exists():
+                    try:
+                        with open(project_info_path, encoding='utf-8') as f:
+                            project_info = json.load(f)
+                    except Exception as e:
+                        logger.warning("Failed to load existing project info for timestamp update: %s", e)
+                if project_info is None:
                     # Create default structure with created from folder ctime
                     created_default = datetime.fromtimestamp(project_path.stat().st_ctime).isoformat()
                     project_info = {
@@ -232,34 +338,22 @@ class ProjectManager:
                         'notes': '',
                         'tags': [],
                         'created': created_default,
-                        'updated': datetime.now().isoformat(),
+                        'updated': updated,
                         'version': '1.0.0'
                     }
-            else:
-                # Create default structure with created from folder ctime
-                created_default = datetime.fromtimestamp(project_path.stat().st_ctime).isoformat()
-                project_info = {
-                    'title': project_path.name,
-                    'description': '',
-                    'short_description': '',
-                    'notes': '',
-                    'tags': [],
-                    'created': created_default,
-                    'updated': datetime.now().isoformat(),
-                    'version': '1.0.0'
-                }
-
-            # Update only the timestamp
-            project_info['updated'] = datetime.now().isoformat()
+                if project_info.get('updated', '') >= updated:
+                    # save_project_info() already wrote a newer timestamp
+                    return True
 
-            # Write back to file
-            with open(project_info_path, 'w', encoding='utf-8') as f:
-                json.dump(project_info, f, indent=2, ensure_ascii=False)
+                # Update only the timestamp
+                project_info['updated'] = updated
+                atomic_write_json(project_info_path, project_info, durable=True, indent=2, ensure_ascii=False)
 
             logger.debug("Updated project timestamp for: %s", project_path)
+            return True
         except Exception as e:
             logger.warning("Failed to update project timestamp for %s: %s", project_path, e)
-            # Don't raise - timestamp updates are best-effort
+            return False
 
     def create_project(self, project_path, project_name):
         from app.utils import sanitize_path
@@ -291,6 +385,7 @@ class ProjectManager:
         path = sanitize_path(path).resolve()
         path_str = str(path)
         self.projects['current_project'] = path_str
+        self.invalidate_project_context(path_str)
 
         # Always move the project to the front of recent projects
         if path_str in self.projects['recent_projects']:
@@ -303,42 +398,86 @@ class ProjectManager:
 
         self.save_projects()
 
-    def get_current_project(self):
+    def invalidate_project_context(self, project_path=None):
+        """Drop cached projects (or only ``project_path``) so the next lookup re-reads them."""
+        with self._context_lock:
+            if project_path is None:
+                self._contexts.clear()
+            else:
+                self._contexts.pop(str(Path(project_path).resolve()), None)
+
+    def _update_context_info(self, project_path, info, merge=False):
+        """Keep the cached context in step with a project_info.json write."""
+        with self._context_lock:
+            context = self._contexts.get(str(Path(project_path).resolve()))
+            if context is None:
+                return
+            if merge:
+                context['info'] = {**context['info'], **info}
+            else:
+                context['info'] = dict(info)
+
+    def get_current_project(self, refresh=False):
+        """Return the current project as a dict, or ``None``.
+
+        Inside a request, the project chosen by the session cookie or header
+        (see ``session_project_path``) wins over the server-wide one, so
+        several users can work on different projects at once.
+
+        The result is cached, so routes can call this on every request
+        without touching the disk.  The cache is dropped when the current
+        project changes and kept up to date by the project info writers;
+        pass ``refresh=True`` to re-read it (e.g. after external edits).
+        """
+        session_path = session_project_path()
+        path = session_path or self.projects.get('current_project')
+        with self._context_lock:
+            context = self._contexts.get(path) if path else None
+            if not refresh and context is not None:
+                return {**context, 'info': dict(context['info']), 'shots': []}
+
+        context = self._load_project_context(session_path) if session_path else None
+        if context is None:
+            context = self._load_current_project()
+        if context is None:
+            return None
+        with self._context_lock:
+            self._contexts[context['path']] = context
+        return {**context, 'info': dict(context['info']), 'shots': []}
+
+    def _load_project_context(self, project_path):
+        """Return the context dict of a project folder, or ``None`` if it is not one."""
+        from app.utils import sanitize_path
+        project_path = sanitize_path(project_path).resolve()
+        if not (project_path / 'shots').exists():
+            return None
+        created = datetime.fromtimestamp(project_path.stat().st_ctime).isoformat()
+        # Load project information
+        project_info = self.load_project_info(project_path)
+        return {
+            'name': project_path.name,
+            'path': str(project_path),
+            'created': created,
+            'info': project_info,
+            'shots': []
+        }
+
+    def _load_current_project(self):
         project_path = self.projects.get('current_project')
         if not project_path:
             logger.warning("No current project path set.")
             return None
-        from app.utils import sanitize_path
-        project_path = sanitize_path(project_path).resolve()
-        shots_dir = project_path / 'shots'
-
-        if shots_dir.exists():
-            created = datetime.fromtimestamp(project_path.stat().st_ctime).isoformat()
-            # Load project information
-            project_info = self.load_project_info(project_path)
-            return {
-                'name': project_path.name,
-                'path': str(project_path),
-                'created': created,
-                'info': project_info,
-                'shots': []
-            }
+
+        context = self._load_project_context(project_path)
+        if context is not None:
+            return context
 
         for recent in self.projects.get('recent_projects', []):
-            recent_path = sanitize_path(recent).resolve()
-            if (recent_path / 'shots').exists():
-                logger.info("Falling back to recent project: %s", recent_path)
-                self.set_current_project(recent_path)
-                created = datetime.fromtimestamp(recent_path.stat().st_ctime).isoformat()
-                # Load project information
-                project_info = self.load_project_info(recent_path)
-                return {
-                    'name': recent_path.name,
-                    'path': str(recent_path),
-                    'created': created,
-                    'info': project_info,
-                    'shots': []
-                }
+            context = self._load_project_context(recent)
+            if context is not None:
+                logger.info("Falling back to recent project: %s", context['path'])
+                self.set_current_project(Path(context['path']))
+                return context
 
         logger.error("No valid project found.")
         return None
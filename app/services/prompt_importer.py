@@ -1,27 +1,33 @@
-import json
 import logging
 
-from PIL import Image
+from app.services.comfyui_parser import parse_comfyui_prompt
+from app.services.image_metadata import read_text_metadata
 
 logger = logging.getLogger(__name__)
 
+# Free-form text fields that only count as a prompt when they carry
+# AUTOMATIC1111-style generation parameters.
+_FALLBACK_TEXT_KEYS = ["description", "imagedescription", "comment"]
 
-def extract_prompt_from_png(path):
-    """Return prompt and negative prompt from PNG metadata if available."""
+
+def extract_prompt_from_image(path):
+    """Return prompt and negative prompt from PNG/JPEG/WebP metadata if available.
+
+    Only the container headers are read (see ``image_metadata``); the image
+    itself is never decoded.
+    """
     try:
-        with Image.open(path) as img:
-            if img.format != "PNG":
-                logger.info("%s is not a PNG file", path)
-                return None
-            metadata = {}
-            metadata.update(getattr(img, "text", {}) or {})
-            metadata.update(img.info or {})
+        image_format, metadata = read_text_metadata(path)
     except Exception as e:
         logger.warning("Failed to read image metadata for %s: %s", path, e)
         return None
 
+    if image_format is None:
+        logger.info("%s is not a PNG, JPEG or WebP file", path)
+        return None
+
     if not metadata:
-        logger.info("No PNG metadata found in %s", path)
+        logger.info("No %s metadata found in %s", image_format, path)
         return None
 
     key = _find_key(metadata, ["parameters"])
@@ -33,19 +39,33 @@ def extract_prompt_from_png(path):
             logger.warning("Failed to parse AUTOMATIC1111 prompt in %s", path)
         return result
 
-    key = _find_key(metadata, ["prompt", "workflow"])
-    if key:
-        result = _parse_comfyui(metadata[key])
+    # The API-format "prompt" is cheaper to walk; fall back to the UI workflow
+    comfy_keys = [k for k in (_find_key(metadata, ["prompt"]), _find_key(metadata, ["workflow"])) if k]
+    if comfy_keys:
+        for key in comfy_keys:
+            result = _parse_comfyui(metadata[key])
+            if result:
+                logger.info("Extracted ComfyUI prompt from %s", path)
+                return result
+        logger.warning("Failed to parse ComfyUI prompt in %s", path)
+        return None
+
+    key = _find_key(metadata, _FALLBACK_TEXT_KEYS)
+    if key and _looks_like_a1111(metadata[key]):
+        result = _parse_a1111(metadata[key])
         if result:
-            logger.info("Extracted ComfyUI prompt from %s", path)
-        else:
-            logger.warning("Failed to parse ComfyUI prompt in %s", path)
-        return result
+            logger.info("Extracted AUTOMATIC1111 prompt from %s", path)
+            return result
 
     logger.info("No recognizable prompt metadata in %s", path)
     return None
 
 
+def extract_prompt_from_png(path):
+    """Return prompt and negative prompt from PNG metadata if available."""
+    return extract_prompt_from_image(path)
+
+
 def _find_key(metadata, names):
     """Return the key from metadata matching one of the names."""
     lower = {k.lower(): k for k in metadata.keys()}
@@ -58,6 +78,12 @@ def _find_key(metadata, names):
     return None
 
 
+def _looks_like_a1111(text: str):
+    """Return True if ``text`` contains AUTOMATIC1111 generation parameters."""
+    lowered = text.lower()
+    return "negative prompt:" in lowered or "steps:" in lowered
+
+
 def _parse_a1111(text: str):
     """Parse AUTOMATIC1111/Forge style metadata."""
     lines = [line.strip() for line in text.splitlines() if line.strip()]
@@ -74,44 +100,4 @@ def _parse_a1111(text: str):
 
 def _parse_comfyui(json_text: str):
     """Parse ComfyUI prompt or workflow JSON string."""
-    try:
-        data = json.loads(json_text)
-    except Exception as e:
-        logger.warning("Failed to parse ComfyUI JSON: %s", e)
-        return None
-
-    if not isinstance(data, dict):
-        return None
-
-    nodes = data.get("nodes") or data.get("workflow") or data
-    positive = None
-    negative = None
-
-    def handle_node(node):
-        nonlocal positive, negative
-        if node.get("class_type") in {"CLIPTextEncode", "CLIPTextEncodeSDXL"}:
-            widgets = node.get("widgets_values")
-            if isinstance(widgets, list):
-                if len(widgets) > 0 and positive is None and isinstance(widgets[0], str):
-                    positive = widgets[0]
-                if len(widgets) > 1 and negative is None and isinstance(widgets[1], str):
-                    negative = widgets[1]
-            inputs = node.get("inputs", {})
-            if positive is None and isinstance(inputs.get("text"), str):
-                positive = inputs.get("text")
-            if negative is None and isinstance(inputs.get("negative"), str):
-                negative = inputs.get("negative")
-
-    if isinstance(nodes, dict):
-        for node in nodes.values():
-            if isinstance(node, dict):
-                handle_node(node)
-    elif isinstance(nodes, list):
-        for node in nodes:
-            if isinstance(node, dict):
-                handle_node(node)
-
-    if positive or negative:
-        return {"prompt": positive or "", "negative_prompt": negative or ""}
-    return None
-
+    return parse_comfyui_prompt(json_text)
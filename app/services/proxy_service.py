@@ -0,0 +1,209 @@
+"""Low-bitrate H.264 review proxies for promoted videos.
+
+When a video or lipsync result is uploaded or promoted, a background worker
+transcodes a small H.264 proxy into ``.shotbuddy/proxies/<aa>/<sha256>.mp4``.
+Proxies are keyed by the source's content hash, so the same render promoted
+in several places is encoded once.  Sources that are already light H.264 get
+no proxy.  The cache is bounded by ``SHOTBUDDY_PROXY_CACHE_MB``; the least
+recently served proxies are evicted first.  Recency is tracked in memory,
+not by touching the proxy file, so serving a proxy never changes its
+validators; after a restart the creation time stands in for it.
+
+Serving never probes, hashes or encodes in the request: :meth:`ProxyService.lookup`
+only uses probe results and digests the worker has already computed, queues
+a proxy when none exists yet and lets the caller fall back to the master.
+"""
+
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from app.config.constants import PROXY_CACHE_MAX_BYTES, get_project_state_dir
+
+logger = logging.getLogger(__name__)
+
+PROXY_DIR = "proxies"
+PROXY_QUEUE_SIZE = 64
+
+# Sources that are H.264 at or under these limits are served as they are
+PROXY_MAX_SOURCE_BITRATE = 4_000_000
+PROXY_MAX_SOURCE_HEIGHT = 720
+
+PROXY_ARGS = [
+    "-vf", "scale=-2:'min(540,ih)'",
+    "-c:v", "libx264", "-preset", "veryfast", "-crf", "28",
+    "-maxrate", "1500k", "-bufsize", "3000k", "-pix_fmt", "yuv420p",
+    "-c:a", "aac", "-b:a", "96k", "-ac", "2",
+    "-movflags", "+faststart",
+]
+
+
+def needs_proxy(info, size):
+    """Return False for sources that are already cheap to stream."""
+    if not info or not info.get("duration"):
+        return True
+    bitrate = size * 8 / info["duration"]
+    return not (
+        info.get("codec") == "h264"
+        and bitrate <= PROXY_MAX_SOURCE_BITRATE
+        and (info.get("height") or 0) <= PROXY_MAX_SOURCE_HEIGHT
+    )
+
+
+class ProxyService:
+    """Per-project proxy cache with a single background encoder."""
+
+    def __init__(self, project_path, media_probe, max_bytes=PROXY_CACHE_MAX_BYTES):
+        self.root = get_project_state_dir(project_path) / PROXY_DIR
+        self.media_probe = media_probe
+        self.max_bytes = max_bytes
+        self._queue = queue.Queue(maxsize=PROXY_QUEUE_SIZE)
+        self._pending = set()
+        # Proxy path -> time it was last served, for eviction order
+        self._last_used = {}
+        self._lock = threading.Lock()
+        self._worker = None
+        self._closed = False
+
+    def proxy_path(self, digest):
+        return self.root / digest[:2] / f"{digest}.mp4"
+
+    def request(self, path):
+        """Queue a proxy for ``path``; returns immediately."""
+        if not path or not shutil.which("ffmpeg"):
+            return
+        key = str(path)
+        with self._lock:
+            if self._closed or key in self._pending:
+                return
+            try:
+                self._queue.put_nowait(key)
+            except queue.Full:
+                logger.debug("Proxy queue full; skipping %s", key)
+                return
+            self._pending.add(key)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="proxy-worker", daemon=True)
+                self._worker.start()
+
+    def lookup(self, path):
+        """Return the ready proxy for ``path`` or ``None`` (queuing one if needed)."""
+        path = Path(path)
+        digest = self.media_probe.cached_digest(path)
+        if digest:
+            proxy = self.proxy_path(digest)
+            if proxy.exists():
+                with self._lock:
+                    self._last_used[proxy] = time.time()
+                return proxy
+            info = self.media_probe.cached(path)
+            if info is not None and not needs_proxy(info, path.stat().st_size):
+                return None
+        self.request(path)
+        return None
+
+    def stop(self, timeout=5.0):
+        """Drop queued proxies and stop the worker after the one in progress."""
+        with self._lock:
+            self._closed = True
+            worker = self._worker
+            while True:
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                except queue.Empty:
+                    break
+            self._pending.clear()
+            if worker is not None:
+                # Wakes the worker; the queue was just emptied so this fits
+                self._queue.put_nowait(None)
+        if worker is not None:
+            worker.join(timeout)
+
+    def _run(self):
+        while True:
+            try:
+                key = self._queue.get(timeout=5)
+            except queue.Empty:
+                with self._lock:
+                    if self._queue.empty():
+                        self._worker = None
+                        return
+                continue
+            if key is None:
+                self._queue.task_done()
+                with self._lock:
+                    self._worker = None
+                return
+            try:
+                self._generate(Path(key))
+            except Exception:
+                logger.exception("Failed to build proxy for %s", key)
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                self._queue.task_done()
+
+    def _generate(self, src):
+        if not src.exists():
+            return
+        digest = self.media_probe.digest(src)
+        proxy = self.proxy_path(digest)
+        if proxy.exists():
+            return
+        if not needs_proxy(self.media_probe.get(src), src.stat().st_size):
+            return
+        ffmpeg = shutil.which("ffmpeg")
+        if not ffmpeg:
+            return
+
+        proxy.parent.mkdir(parents=True, exist_ok=True)
+        tmp = proxy.with_name(f".{proxy.stem}.{uuid.uuid4().hex[:8]}.partial.mp4")
+        try:
+            cmd = [ffmpeg, "-y", "-v", "error", "-i", str(src), *PROXY_ARGS, str(tmp)]
+            result = subprocess.run(cmd, capture_output=True, shell=False)  # noqa: S603
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.decode("utf-8", "replace").strip() or "ffmpeg failed")
+            os.replace(tmp, proxy)
+            logger.info("Built review proxy for %s", src)
+        finally:
+            tmp.unlink(missing_ok=True)
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used proxies until the cache fits its budget."""
+        entries = []
+        total = 0
+        with self._lock:
+            last_used = dict(self._last_used)
+        for path in self.root.glob("*/*.mp4"):
+            if path.name.startswith("."):
+                continue
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((last_used.get(path, st.st_mtime), st.st_size, path))
+            total += st.st_size
+        entries.sort()
+        for _used, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                continue
+            with self._lock:
+                self._last_used.pop(path, None)
+
+    def status(self):
+        size = sum(p.stat().st_size for p in self.root.glob("*/*.mp4")) if self.root.exists() else 0
+        with self._lock:
+            return {"pending": len(self._pending), "cache_bytes": size, "max_bytes": self.max_bytes}
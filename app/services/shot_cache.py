@@ -0,0 +1,176 @@
+"""Persisted cache of ``ShotManager.get_shot_info`` results.
+
+Each entry stores a shot's info dict together with a *stamp*: the mtimes of
+the shot folder and its ``images``/``videos``/``lipsync`` subfolders, of its
+notes/captions/meta/``shot.json`` files, and the name, mtime and size of its
+files in ``latest_images``/``latest_videos``.  Metadata is written by
+replacing files (see :mod:`app.services.atomic_io`) and uploads add files, so
+any change made through Shotbuddy changes the stamp.  An entry is served as
+long as its stamp still matches, which costs a handful of ``stat`` calls
+instead of globbing, reading prompts and checking thumbnails.
+
+Entries whose mtimes were within ``_RACY_NS`` of the moment they were
+stamped are not cached: on filesystems with coarse timestamps a later write
+could keep the same mtime.
+
+The cache is written to ``.shotbuddy/shot_cache.json`` at most every
+``SHOTBUDDY_SHOT_CACHE_FLUSH_SECONDS`` while it changes and at shutdown, and
+read back lazily on first use, so the first listing after a restart only has
+to validate the stamps.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from app.config.constants import SHOT_CACHE_FLUSH_DELAY, get_project_state_dir
+from app.services.atomic_io import atomic_write_json
+from app.services.shot_document import SHOT_DOCUMENT_FILE
+from app.services.write_behind import WriteBehind
+
+logger = logging.getLogger(__name__)
+
+SHOT_CACHE_FILE = "shot_cache.json"
+# Bump when the shape of get_shot_info() changes
+CACHE_VERSION = 1
+
+# FAT stores mtimes with 2 s resolution
+_RACY_NS = 2_000_000_000
+
+_STAMP_DIRS = ("", "images", "videos", "lipsync")
+_STAMP_FILES = ("notes.txt", "captions.json", "meta.json", SHOT_DOCUMENT_FILE)
+
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _final_owner(name):
+    """Return the shot a file in ``latest_images``/``latest_videos`` belongs to."""
+    stem = name.split(".", 1)[0]
+    for suffix in ("_first", "_last"):
+        if stem.endswith(suffix):
+            return stem[: -len(suffix)]
+    return stem
+
+
+def scan_finals(final_dirs, shot_name=None):
+    """Map shot names to ``[name, mtime_ns, size]`` of their promoted files.
+
+    One ``scandir`` per folder covers every shot; pass ``shot_name`` to keep
+    only that shot's files.
+    """
+    finals = {}
+    for final_dir in final_dirs:
+        try:
+            with os.scandir(final_dir) as it:
+                for entry in it:
+                    if shot_name is not None and not entry.name.startswith(shot_name):
+                        continue
+                    owner = _final_owner(entry.name)
+                    if shot_name is not None and owner != shot_name:
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    finals.setdefault(owner, []).append([entry.name, st.st_mtime_ns, st.st_size])
+        except OSError:
+            continue
+    for files in finals.values():
+        files.sort()
+    return finals
+
+
+class ShotInfoCache:
+    """``get_shot_info`` results of one project, validated by stamps."""
+
+    def __init__(self, project_path, flush_delay=SHOT_CACHE_FLUSH_DELAY):
+        self.project_path = os.path.realpath(project_path)
+        self.path = get_project_state_dir(project_path) / SHOT_CACHE_FILE
+        self._lock = threading.Lock()
+        self._entries = None
+        # Approximate size of each entry as JSON, for the project LRU
+        self._sizes = {}
+        self._writer = WriteBehind(self._write, flush_delay, flush_delay * 4)
+
+    def _load(self):
+        """Read the persisted entries; the caller holds ``_lock``."""
+        if self._entries is not None:
+            return
+        self._entries = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            # Paths and thumbnail URLs in the entries are absolute, so a
+            # moved project starts over
+            if data.get("version") == CACHE_VERSION and data.get("project") == self.project_path:
+                self._entries = data.get("entries", {})
+                if self._entries:
+                    average = self.path.stat().st_size // len(self._entries)
+                    self._sizes = dict.fromkeys(self._entries, average)
+        except FileNotFoundError:
+            pass
+        except Exception:
+            logger.exception("Error loading shot cache")
+
+    @staticmethod
+    def stamp(shot_dir, finals):
+        """Return the stamp of a shot, or ``None`` if it must not be cached."""
+        taken = time.time_ns()
+        dirs = [_mtime_ns(os.path.join(shot_dir, sub)) for sub in _STAMP_DIRS]
+        if dirs[0] is None:
+            return None
+        files = [_mtime_ns(os.path.join(shot_dir, name)) for name in _STAMP_FILES]
+        mtimes = [m for m in dirs + files if m is not None] + [f[1] for f in finals]
+        if max(mtimes) >= taken - _RACY_NS:
+            return None
+        return [dirs, files, finals]
+
+    def get(self, shot_name, stamp):
+        if stamp is None:
+            return None
+        with self._lock:
+            self._load()
+            entry = self._entries.get(shot_name)
+        if entry is not None and entry["stamp"] == stamp:
+            return entry["info"]
+        return None
+
+    def put(self, shot_name, stamp, info):
+        if stamp is None:
+            return
+        with self._lock:
+            self._load()
+            self._entries[shot_name] = {"stamp": stamp, "info": info}
+            self._sizes[shot_name] = len(json.dumps(info))
+        self._writer.mark()
+
+    @property
+    def approx_bytes(self):
+        """Rough memory held by the cached entries."""
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def flush(self):
+        """Write pending changes to ``.shotbuddy/shot_cache.json`` now."""
+        self._writer.flush()
+
+    def _write(self):
+        with self._lock:
+            if self._entries is None:
+                return
+            entries = dict(self._entries)
+        shots_dir = os.path.join(self.project_path, "shots", "wip")
+        entries = {name: e for name, e in entries.items() if os.path.isdir(os.path.join(shots_dir, name))}
+        atomic_write_json(
+            self.path,
+            {"version": CACHE_VERSION, "project": self.project_path, "entries": entries},
+            ensure_ascii=False,
+        )
+        logger.debug("Saved shot cache with %d entries", len(entries))
@@ -0,0 +1,199 @@
+"""Consolidated per-shot metadata in ``shots/wip/<shot>/shot.json``.
+
+The classic layout spreads one shot's metadata over ``notes.txt``,
+``captions.json``, ``meta.json``, a ``*_prompt.txt`` per version and slot and
+``.version`` markers in three folders.  A shot that has a ``shot.json`` is
+read from that one file instead::
+
+    {
+      "version": 1,
+      "display_name": "Opening",
+      "notes": "...",
+      "captions": {"first_image": "...", "last_image": "...", "video": "..."},
+      "current_versions": {"first_image": 3, "video": 2},
+      "prompts": {"first_image": {"3": "..."}, "video": {"1": "..."}}
+    }
+
+Writes to such a shot update ``shot.json`` and, unless
+``SHOTBUDDY_LEGACY_WRITE_THROUGH=0``, the classic files as well, so older
+Shotbuddy versions opening the project keep working.  New shots get a
+``shot.json`` when ``SHOTBUDDY_SHOT_DOCUMENTS=1``.
+
+Existing projects are converted in either direction with::
+
+    python -m app.services.shot_document to-json <project>
+    python -m app.services.shot_document to-legacy <project>
+
+``to-json`` also refreshes the documents after the project was edited with
+an older version that only knows the classic files.
+"""
+
+import argparse
+import json
+import logging
+import re
+import sys
+from pathlib import Path
+
+from app.services.atomic_io import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+SHOT_DOCUMENT_FILE = "shot.json"
+DOCUMENT_VERSION = 1
+
+VERSIONED_ASSETS = ("first_image", "last_image", "video", "driver", "target", "result")
+
+# Prompt file names, keyed by the asset they belong to.  The legacy single
+# image ("image") is folded into first_image, mirroring load_prompt().
+_PROMPT_PATTERNS = [
+    ("images", "first_image", r"^{shot}_first_v(\d{{3,}})_image_prompt\.txt$"),
+    ("images", "last_image", r"^{shot}_last_v(\d{{3,}})_image_prompt\.txt$"),
+    ("images", "image", r"^{shot}_v(\d{{3,}})_image_prompt\.txt$"),
+    ("videos", "video", r"^{shot}_v(\d{{3,}})_video_prompt\.txt$"),
+    ("lipsync", "driver", r"^{shot}_driver_v(\d{{3,}})_prompt\.txt$"),
+    ("lipsync", "target", r"^{shot}_target_v(\d{{3,}})_prompt\.txt$"),
+    ("lipsync", "result", r"^{shot}_result_v(\d{{3,}})_prompt\.txt$"),
+]
+
+
+def document_asset(asset_type):
+    """Return the key an asset type is stored under in a shot document."""
+    return "first_image" if asset_type == "image" else asset_type
+
+
+def new_document():
+    return {
+        "version": DOCUMENT_VERSION,
+        "display_name": "",
+        "notes": "",
+        "captions": {},
+        "current_versions": {},
+        "prompts": {},
+    }
+
+
+def document_path(shot_dir):
+    return Path(shot_dir) / SHOT_DOCUMENT_FILE
+
+
+def load_document(shot_dir):
+    """Return the shot document in ``shot_dir`` or ``None`` if there is none."""
+    try:
+        with open(document_path(shot_dir), encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.exception("Error loading shot document in %s", shot_dir)
+        return None
+    if not isinstance(data, dict):
+        return None
+    doc = new_document()
+    doc.update(data)
+    return doc
+
+
+def save_document(shot_dir, doc):
+    atomic_write_json(document_path(shot_dir), doc, ensure_ascii=False, indent=2)
+
+
+def _read_marker(path):
+    try:
+        return int(path.read_text(encoding="utf-8").strip())
+    except (OSError, ValueError):
+        return None
+
+
+def build_document(manager, shot_name):
+    """Collect a shot's metadata from the classic files into a document."""
+    shot_dir = manager.wip_dir / shot_name
+    doc = new_document()
+    doc["display_name"] = manager.load_meta(shot_name, document=None).get("display_name", "")
+    notes_file = shot_dir / "notes.txt"
+    if notes_file.exists():
+        doc["notes"] = notes_file.read_text(encoding="utf-8").strip()
+    doc["captions"] = manager.load_captions(shot_name, document=None)
+
+    for asset in VERSIONED_ASSETS:
+        version = _read_marker(manager._version_marker_path(asset, shot_name))
+        if version is None and asset == "first_image":
+            version = _read_marker(manager._version_marker_path("image", shot_name))
+        if version is not None:
+            doc["current_versions"][asset] = version
+
+    legacy_image = {}
+    for sub, asset, pattern in _PROMPT_PATTERNS:
+        folder = shot_dir / sub
+        if not folder.is_dir():
+            continue
+        regex = re.compile(pattern.format(shot=re.escape(shot_name)))
+        for path in folder.iterdir():
+            match = regex.match(path.name)
+            if not match:
+                continue
+            text = path.read_text(encoding="utf-8").strip()
+            target = legacy_image if asset == "image" else doc["prompts"].setdefault(asset, {})
+            target[str(int(match.group(1)))] = text
+    for version, text in legacy_image.items():
+        doc["prompts"].setdefault("first_image", {}).setdefault(version, text)
+    return doc
+
+
+def write_legacy_files(manager, shot_name, doc):
+    """Write a document's contents to the classic per-file layout."""
+    shot_dir = manager.wip_dir / shot_name
+    manager.save_shot_notes(shot_name, doc.get("notes", ""), document=None)
+    manager.save_display_name(shot_name, doc.get("display_name", ""), document=None)
+    for asset, caption in doc.get("captions", {}).items():
+        manager.save_caption(shot_name, asset, caption, document=None)
+    for asset, version in doc.get("current_versions", {}).items():
+        manager.set_current_version(shot_name, asset, version, document=None)
+    for asset, prompts in doc.get("prompts", {}).items():
+        for version, text in prompts.items():
+            manager.save_prompt(shot_name, asset, int(version), text, document=None)
+    logger.debug("Wrote classic metadata files for %s", shot_dir)
+
+
+def migrate_project(project_path, direction):
+    """Convert every shot of a project; returns the number of shots converted."""
+    from app.services.shot_manager import SHOT_NAME_RE, ShotManager
+
+    manager = ShotManager(project_path)
+    count = 0
+    for shot_dir in sorted(manager.wip_dir.iterdir()):
+        if not shot_dir.is_dir() or not SHOT_NAME_RE.match(shot_dir.name):
+            continue
+        shot_name = shot_dir.name
+        with manager.locks.shot(shot_name), manager.journal.suspended():
+            if direction == "to-json":
+                save_document(shot_dir, build_document(manager, shot_name))
+            else:
+                doc = load_document(shot_dir)
+                if doc is None:
+                    continue
+                write_legacy_files(manager, shot_name, doc)
+                document_path(shot_dir).unlink()
+        count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.services.shot_document",
+        description="Convert shot metadata between shot.json and the classic per-file layout.",
+    )
+    parser.add_argument("direction", choices=["to-json", "to-legacy"])
+    parser.add_argument("project", help="Path to the project folder")
+    args = parser.parse_args(argv)
+
+    project = Path(args.project).resolve()
+    if not (project / "shots").is_dir():
+        parser.error(f"{project} is not a Shotbuddy project")
+    count = migrate_project(project, args.direction)
+    print(f"Converted {count} shot(s) {args.direction.replace('-', ' ')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
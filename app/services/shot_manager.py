@@ -1,6 +1,11 @@
 import json
 import logging
+import os
 import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
 from pathlib import Path
 
 from PIL import Image
@@ -8,10 +13,26 @@ from PIL import Image
 from app.config.constants import (
     ALLOWED_IMAGE_EXTENSIONS,
     ALLOWED_VIDEO_EXTENSIONS,
+    LEGACY_WRITE_THROUGH,
+    SHOT_CACHE_ENABLED,
+    SHOT_DOCUMENTS_ENABLED,
+    SHOT_MANAGER_CACHE_BYTES,
+    SHOT_MANAGER_CACHE_SIZE,
     THUMBNAIL_SIZE,
     get_project_thumbnail_cache_dir,
 )
+from app.services.animatic import AnimaticJob, animatic_suffix, require_ffmpeg
+from app.services.atomic_io import atomic_write_json, atomic_write_text
+from app.services.content_store import copy_file, get_content_store
+from app.services.export_engine import ExportJob, ZipExportJob, plan_export, resolve_export_dir
+from app.services.export_presets import Transcoder, apply_preset
+from app.services.journal import Journal
+from app.services.locks import ARCHIVE_LOCK, ORDER_LOCK, LockManager
+from app.services.media_probe import MediaProbeCache
 from app.services.project_manager import ProjectManager
+from app.services.proxy_service import ProxyService
+from app.services.shot_cache import ShotInfoCache, scan_finals
+from app.services.shot_document import document_asset, load_document, new_document, save_document
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +41,57 @@ logger = logging.getLogger(__name__)
 # underscores is not allowed.
 SHOT_NAME_RE = re.compile(r"^SH\d{3}(?:_\d{3})?$")
 
+# Default for the ``document`` argument of the metadata accessors: load the
+# shot's shot.json.  ``None`` means "use the classic files only".
+_UNSET = object()
+
+# Operations accepted by ShotManager.apply_batch() and their fields besides
+# shot_name; the names match the single-shot routes
+BATCH_OPERATIONS = {
+    'notes': ('notes',),
+    'caption': ('asset_type', 'caption'),
+    'prompt': ('asset_type', 'version', 'prompt'),
+    'display_name': ('display_name',),
+    'archive': ('archived',),
+    'promote': ('asset_type', 'version'),
+}
+MAX_BATCH_OPERATIONS = 1000
+# Asset types each batch operation accepts, as in the single-shot methods
+_BATCH_ASSET_TYPES = {
+    'caption': {'first_image', 'last_image', 'video'},
+    'prompt': {'image', 'first_image', 'last_image', 'video', 'driver', 'target', 'result'},
+    'promote': {'image', 'first_image', 'last_image', 'video'},
+}
+
+# Version media and prompt files of a shot, without the "<shot>_" prefix:
+# first_v002.png, v002.png (legacy first image), last_v001_image_prompt.txt,
+# v003_video_prompt.txt, driver_v001.mp4, ...
+_VERSION_FILE_RE = re.compile(
+    r"^(?:(?P<part>first|last|driver|target|result)_)?v(?P<version>\d{3,})"
+    r"(?P<suffix>_image_prompt\.txt|_video_prompt\.txt|_prompt\.txt|\.[^.]+)$"
+)
+# Subfolder -> {name part: (slot, prompt suffix, media extensions)}
+_VERSION_FOLDERS = {
+    'images': {
+        'first': ('first_image', '_image_prompt.txt', ALLOWED_IMAGE_EXTENSIONS),
+        'last': ('last_image', '_image_prompt.txt', ALLOWED_IMAGE_EXTENSIONS),
+        None: ('first_image', '_image_prompt.txt', ALLOWED_IMAGE_EXTENSIONS),  # legacy
+    },
+    'videos': {None: ('video', '_video_prompt.txt', ALLOWED_VIDEO_EXTENSIONS)},
+    'lipsync': {
+        part: (part, '_prompt.txt', ALLOWED_VIDEO_EXTENSIONS) for part in ('driver', 'target', 'result')
+    },
+}
+VERSION_SLOTS = ('first_image', 'last_image', 'video', 'driver', 'target', 'result')
+
+
+class BatchOperationError(ValueError):
+    """A batch operation failed after ``applied`` earlier operations took effect."""
+
+    def __init__(self, message, applied):
+        super().__init__(message)
+        self.applied = applied
+
 
 def validate_shot_name(name):
     if not SHOT_NAME_RE.match(name):
@@ -72,12 +144,32 @@ def save_display_name(shot_name, display_name):
     path = _meta_file(shot_name)
     path.parent.mkdir(parents=True, exist_ok=True)
     try:
-        with path.open('w', encoding='utf-8') as f:
-            json.dump({"display_name": display_name}, f, ensure_ascii=False, indent=2)
+        atomic_write_json(path, {"display_name": display_name}, ensure_ascii=False, indent=2)
     except Exception as e:
         raise ValueError(f"Failed to save display name: {str(e)}")
 
 
+def compact_shot_info(info, root):
+    """Return ``info`` in the compact schema.
+
+    File paths are relative to ``root`` (the POSIX project path) and the
+    legacy ``image`` alias of ``first_image`` is left out.
+    """
+    prefix = root.rstrip('/') + '/'
+
+    def asset(data):
+        path = data.get('file')
+        if path and path.startswith(prefix):
+            return {**data, 'file': path[len(prefix):]}
+        return data
+
+    compact = {key: value for key, value in info.items() if key != 'image'}
+    for key in ('first_image', 'last_image', 'video'):
+        compact[key] = asset(info[key])
+    compact['lipsync'] = {part: asset(data) for part, data in info['lipsync'].items()}
+    return compact
+
+
 class ShotManager:
     def __init__(self, project_path):
         self.project_path = Path(project_path)
@@ -93,6 +185,30 @@ class ShotManager:
         self.latest_images_dir.mkdir(parents=True, exist_ok=True)
         self.latest_videos_dir.mkdir(parents=True, exist_ok=True)
         self.thumbnail_cache_dir = get_project_thumbnail_cache_dir(self.project_path)
+        self.media_probe = MediaProbeCache(self.project_path)
+        self.content_store = get_content_store(self.project_path)
+        self.proxies = ProxyService(self.project_path, self.media_probe)
+        self.locks = LockManager(self.project_path)
+        self.journal = Journal(self.project_path)
+        self.shot_cache = ShotInfoCache(self.project_path) if SHOT_CACHE_ENABLED else None
+
+    def flush(self):
+        """Write cached state kept in memory to ``.shotbuddy``."""
+        if self.shot_cache is not None:
+            self.shot_cache.flush()
+        self.media_probe.flush()
+
+    def close(self):
+        """Stop background work and write cached state; the manager is not used afterwards."""
+        self.proxies.stop()
+        self.flush()
+
+    def approx_memory(self):
+        """Rough number of bytes of cached state held by this manager."""
+        size = self.shot_cache.approx_bytes if self.shot_cache is not None else 0
+        # Probe results and journal entries are a few hundred bytes each
+        size += 512 * (len(self.media_probe) + len(self.journal))
+        return size
 
     def _load_shot_order(self):
         """Load shot order list from JSON file."""
@@ -116,8 +232,7 @@ class ShotManager:
                     cleaned.append(name)
                     seen.add(name)
             self.shots_dir.mkdir(parents=True, exist_ok=True)
-            with self.order_file.open('w', encoding='utf-8') as f:
-                json.dump(cleaned, f)
+            atomic_write_json(self.order_file, cleaned)
         except Exception:
             logger.warning("Failed to save shot order file")
 
@@ -136,29 +251,39 @@ class ShotManager:
 
     def _save_archived(self, names: set):
         """Persist archived shot names to JSON file."""
-        import json
         try:
             self.shots_dir.mkdir(parents=True, exist_ok=True)
-            with self.archive_file.open('w', encoding='utf-8') as f:
-                json.dump(sorted(list(names)), f)
+            atomic_write_json(self.archive_file, sorted(list(names)))
         except Exception:
             logger.warning("Failed to save archived shots file")
 
     def archive_shot(self, shot_name, archived: bool):
         """Toggle archived state for a shot and return updated shot info."""
-        validate_shot_name(shot_name)
-        shot_dir = self.wip_dir / shot_name
-        if not shot_dir.exists():
-            raise ValueError(f"Shot {shot_name} does not exist")
-
-        names = self._load_archived()
-        if archived:
-            names.add(shot_name)
-        else:
-            names.discard(shot_name)
-        self._save_archived(names)
+        self.set_archived({shot_name: archived})
         return self.get_shot_info(shot_name)
 
+    def set_archived(self, changes):
+        """Archive or unarchive shots given as ``{shot_name: archived}``.
+
+        The archive list is read and written once for all of them.
+        """
+        for shot_name in changes:
+            validate_shot_name(shot_name)
+            if not (self.wip_dir / shot_name).exists():
+                raise ValueError(f"Shot {shot_name} does not exist")
+
+        with self.locks.shots(*changes), self.locks.project(ARCHIVE_LOCK):
+            names = self._load_archived()
+            before = set(names)
+            for shot_name, archived in changes.items():
+                if archived:
+                    names.add(shot_name)
+                else:
+                    names.discard(shot_name)
+            self._save_archived(names)
+            for shot_name, archived in changes.items():
+                self.journal.record('archive', shot_name, shot_name in before, bool(archived))
+
     @staticmethod
     def _normalize_path(path):
         """Return a POSIX-style absolute path string or ``None``."""
@@ -170,6 +295,12 @@ class ShotManager:
         """Rename a shot and all associated files."""
         validate_shot_name(old_name)
         validate_shot_name(new_name)
+        with self.locks.project(ORDER_LOCK), self.locks.shots(old_name, new_name):
+            self._rename_shot_files(old_name, new_name)
+            self.journal.record('rename', new_name, old_name, new_name)
+        return self.get_shot_info(new_name)
+
+    def _rename_shot_files(self, old_name, new_name):
         old_dir = self.wip_dir / old_name
         new_dir = self.wip_dir / new_name
 
@@ -239,16 +370,15 @@ class ShotManager:
 
         # Preserve archived state across rename
         try:
-            names = self._load_archived()
-            if old_name in names:
-                names.discard(old_name)
-                names.add(new_name)
-                self._save_archived(names)
+            with self.locks.project(ARCHIVE_LOCK):
+                names = self._load_archived()
+                if old_name in names:
+                    names.discard(old_name)
+                    names.add(new_name)
+                    self._save_archived(names)
         except Exception:
             logger.exception("Error updating archived state during rename")
 
-        return self.get_shot_info(new_name)
-
     def create_shot_structure(self, shot_name):
         """Create folder structure for a shot."""
         validate_shot_name(shot_name)
@@ -263,6 +393,9 @@ class ShotManager:
         self.latest_images_dir.mkdir(parents=True, exist_ok=True)
         self.latest_videos_dir.mkdir(parents=True, exist_ok=True)
 
+        if SHOT_DOCUMENTS_ENABLED and self.load_shot_document(shot_name) is None:
+            save_document(shot_dir, new_document())
+
         return shot_dir
 
     def get_next_shot_number(self):
@@ -306,14 +439,22 @@ class ShotManager:
         else:
             shot_dirs = sorted(shot_dirs, key=lambda d: d.name)
 
-        shots = [self.get_shot_info(shot_dir.name) for shot_dir in shot_dirs]
-        return shots
+        return self.get_shots_info([shot_dir.name for shot_dir in shot_dirs])
+
+    def get_shots_info(self, shot_names):
+        """Return ``get_shot_info`` of several shots, reading shared state once."""
+        archived = self._load_archived()
+        finals = scan_finals([self.latest_images_dir, self.latest_videos_dir]) if self.shot_cache else None
+        return [self.get_shot_info(name, archived=archived, finals=finals) for name in shot_names]
 
     def save_shot_order(self, shot_order):
         """Save the order of shots."""
         if not isinstance(shot_order, list):
             raise ValueError('Shot order must be a list')
-        self._save_shot_order(shot_order)
+        with self.locks.project(ORDER_LOCK):
+            before = self._load_shot_order()
+            self._save_shot_order(shot_order)
+            self.journal.record('reorder', None, before, self._load_shot_order())
 
     def create_shot_between(self, after_shot=None):
         """Create a new shot between existing shots.
@@ -333,6 +474,12 @@ class ShotManager:
         if after_shot:
             validate_shot_name(after_shot)
 
+        with self.locks.project(ORDER_LOCK):
+            shot_name = self._insert_shot(after_shot)
+        return self.get_shot_info(shot_name)
+
+    def _insert_shot(self, after_shot):
+        """Create the next shot after ``after_shot`` and record it in the order."""
         existing = [s["name"] for s in self.get_shots()]
 
         if not after_shot:
@@ -378,8 +525,7 @@ class ShotManager:
             order_names = [shot_name]
 
         self._save_shot_order(order_names)
-
-        return self.get_shot_info(shot_name)
+        return shot_name
 
     def _create_subshot_name(self, base_shot, existing):
         """Return a new sub-shot name under ``base_shot``.
@@ -407,9 +553,34 @@ class ShotManager:
 
         return f"{base_shot}_{next_num:03d}"
 
-    def load_meta(self, shot_name):
+    def load_shot_document(self, shot_name):
+        """Return the shot's consolidated ``shot.json`` or ``None``."""
+        return load_document(self.wip_dir / shot_name)
+
+    def _document(self, shot_name, document):
+        return self.load_shot_document(shot_name) if document is _UNSET else document
+
+    def _update_document(self, shot_name, key_path, value, document=_UNSET):
+        """Set ``key_path`` in the shot document; return False if there is none.
+
+        The caller holds the shot lock.
+        """
+        doc = self._document(shot_name, document)
+        if doc is None:
+            return False
+        target = doc
+        for key in key_path[:-1]:
+            target = target.setdefault(key, {})
+        target[key_path[-1]] = value
+        save_document(self.wip_dir / shot_name, doc)
+        return True
+
+    def load_meta(self, shot_name, document=_UNSET):
         """Load meta dict for a shot from project path, with fallback to app-level."""
         validate_shot_name(shot_name)
+        doc = self._document(shot_name, document)
+        if doc is not None:
+            return {'display_name': doc.get('display_name', '')}
         project_path = getattr(self, 'project_path', None)
         if project_path:
             path = _project_meta_file(project_path, shot_name)
@@ -424,7 +595,7 @@ class ShotManager:
         # Fallback to app-level meta (for legacy data)
         return load_meta(shot_name)
 
-    def save_display_name(self, shot_name, display_name):
+    def save_display_name(self, shot_name, display_name, document=_UNSET):
         """Persist display name for a shot in project path."""
         validate_shot_name(shot_name)
         project_path = getattr(self, 'project_path', None)
@@ -433,25 +604,58 @@ class ShotManager:
         path = _project_meta_file(project_path, shot_name)
         path.parent.mkdir(parents=True, exist_ok=True)
         try:
-            with path.open('w', encoding='utf-8') as f:
-                json.dump({"display_name": display_name}, f, ensure_ascii=False, indent=2)
+            with self.locks.shot(shot_name):
+                doc = self._document(shot_name, document)
+                before = self.load_meta(shot_name, doc).get('display_name', '')
+                in_document = self._update_document(shot_name, ('display_name',), display_name, doc)
+                if not in_document or LEGACY_WRITE_THROUGH:
+                    atomic_write_json(path, {"display_name": display_name}, ensure_ascii=False, indent=2)
+                self.journal.record('display_name', shot_name, before, display_name)
         except Exception as e:
             raise ValueError(f"Failed to save display name: {str(e)}")
 
-    def get_shot_info(self, shot_name):
-        """Get information about a specific shot."""
+    def get_shot_info(self, shot_name, archived=None, finals=None):
+        """Get information about a specific shot.
+
+        ``archived`` (the set of archived shots) and ``finals`` (from
+        :func:`scan_finals`) let ``get_shots`` read them once for all shots.
+        """
         validate_shot_name(shot_name)
+        if archived is None:
+            archived = self._load_archived()
+
+        info = None
+        if self.shot_cache is not None:
+            if finals is None:
+                finals = scan_finals([self.latest_images_dir, self.latest_videos_dir], shot_name)
+            # Stamp before building, so a change made meanwhile is seen next time
+            stamp = self.shot_cache.stamp(self.wip_dir / shot_name, finals.get(shot_name, []))
+            info = self.shot_cache.get(shot_name, stamp)
+            if info is not None and not self._thumbnails_exist(info):
+                info = None
+            if info is None:
+                info = self._build_shot_info(shot_name)
+                self.shot_cache.put(shot_name, stamp, info)
+        else:
+            info = self._build_shot_info(shot_name)
+        return dict(info, archived=shot_name in archived)
+
+    def _thumbnails_exist(self, info):
+        """Check that the cached thumbnails of a shot were not deleted."""
+        assets = [info['first_image'], info['last_image'], info['video'], *info['lipsync'].values()]
+        for asset in assets:
+            url = asset.get('thumbnail')
+            if url and not (self.thumbnail_cache_dir / url.rsplit('/', 1)[-1]).exists():
+                return False
+        return True
+
+    def _build_shot_info(self, shot_name):
         shot_dir = self.wip_dir / shot_name
 
-        # Load notes
-        notes = ''
-        notes_file = shot_dir / 'notes.txt'
-        if notes_file.exists():
-            try:
-                with open(notes_file, encoding='utf-8') as f:
-                    notes = f.read().strip()
-            except Exception:
-                logger.exception("Error loading shot notes")
+        # Consolidated metadata, if the shot has been migrated to shot.json
+        doc = self.load_shot_document(shot_name)
+
+        notes = self.load_notes(shot_name, doc)
 
 
         # First/Last images
@@ -488,11 +692,11 @@ class ShotManager:
         first_image_path = self._normalize_path(first_image_path)
         last_image_path = self._normalize_path(last_image_path)
 
-        current_first_version = self.get_current_version(shot_name, 'first_image', first_max_version)
-        first_prompt = self.load_prompt(shot_name, 'first_image', current_first_version) if current_first_version > 0 else ''
+        current_first_version = self.get_current_version(shot_name, 'first_image', first_max_version, doc)
+        first_prompt = self.load_prompt(shot_name, 'first_image', current_first_version, doc) if current_first_version > 0 else ''
 
-        current_last_version = self.get_current_version(shot_name, 'last_image', last_max_version)
-        last_prompt = self.load_prompt(shot_name, 'last_image', current_last_version) if current_last_version > 0 else ''
+        current_last_version = self.get_current_version(shot_name, 'last_image', last_max_version, doc)
+        last_prompt = self.load_prompt(shot_name, 'last_image', current_last_version, doc) if current_last_version > 0 else ''
 
         # Latest video
         latest_video, max_video_version = self._get_latest_asset(
@@ -506,10 +710,10 @@ class ShotManager:
             max_video_version = max(max_video_version, detected_video_versions)
             
         latest_video = self._normalize_path(latest_video)
-        current_video_version = self.get_current_version(shot_name, 'video', max_video_version)
+        current_video_version = self.get_current_version(shot_name, 'video', max_video_version, doc)
         video_prompt = ''
         if current_video_version > 0:
-            video_prompt = self.load_prompt(shot_name, 'video', current_video_version)
+            video_prompt = self.load_prompt(shot_name, 'video', current_video_version, doc)
 
         # Lipsync videos
         lipsync_dir = shot_dir / 'lipsync'
@@ -522,12 +726,13 @@ class ShotManager:
             file_path = self._normalize_path(file_path)
             prompt_text = ''
             if ver > 0:
-                prompt_text = self.load_prompt(shot_name, part, ver)
+                prompt_text = self.load_prompt(shot_name, part, ver, doc)
             lipsync[part] = {
                 'file': file_path,
                 'version': ver,
                 'thumbnail': None,  # will be replaced with video thumb below
                 'prompt': prompt_text,
+                'media': self.media_probe.get(file_path),
             }
 
         # Thumbnails
@@ -542,7 +747,7 @@ class ShotManager:
         logger.debug("%s -> Last image thumbnail: %s", shot_name, last_thumb)
         logger.debug("%s -> Video thumbnail: %s", shot_name, video_thumb)
 
-        captions = self.load_captions(shot_name)
+        captions = self.load_captions(shot_name, doc)
 
         # Compose response with backward-compatible 'image' alias pointing to first_image
         first_image_dict = {
@@ -552,6 +757,7 @@ class ShotManager:
             'thumbnail': first_thumb,
             'prompt': first_prompt,
             'caption': captions.get('first_image', ''),
+            'media': self.media_probe.get(first_image_path),
         }
         last_image_dict = {
             'file': last_image_path,
@@ -560,9 +766,10 @@ class ShotManager:
             'thumbnail': last_thumb,
             'prompt': last_prompt,
             'caption': captions.get('last_image', ''),
+            'media': self.media_probe.get(last_image_path),
         }
 
-        meta = self.load_meta(shot_name)
+        meta = self.load_meta(shot_name, doc)
         return {
             'name': shot_name,
             'display_name': meta.get('display_name', ''),
@@ -577,21 +784,89 @@ class ShotManager:
                 'thumbnail': video_thumb,
                 'prompt': video_prompt,
                 'caption': captions.get('video', ''),
+                'media': self.media_probe.get(latest_video),
             },
             'lipsync': lipsync,
-            'archived': (shot_name in self._load_archived())
         }
 
 
+    def get_media_summary(self, shots=None):
+        """Summarise running time and formats of non-archived shots from probe data."""
+        if shots is None:
+            shots = self.get_shots()
+        active = [s for s in shots if not s['archived']]
+
+        running_time = 0.0
+        resolutions = {}
+        codecs = {}
+        frame_rates = {}
+        missing_video = []
+        for shot in active:
+            media = shot['video'].get('media')
+            if not media:
+                missing_video.append(shot['name'])
+                continue
+            running_time += media.get('duration') or 0
+            if media.get('width') and media.get('height'):
+                key = f"{media['width']}x{media['height']}"
+                resolutions[key] = resolutions.get(key, 0) + 1
+            if media.get('codec'):
+                codecs[media['codec']] = codecs.get(media['codec'], 0) + 1
+            if media.get('fps'):
+                fps = str(media['fps'])
+                frame_rates[fps] = frame_rates.get(fps, 0) + 1
+
+        return {
+            'shots': len(active),
+            'running_time': round(running_time, 3),
+            'resolutions': resolutions,
+            'codecs': codecs,
+            'frame_rates': frame_rates,
+            'missing_video': missing_video,
+        }
+
+    @staticmethod
+    def _find_final(final_dir, stem, extensions):
+        for ext in extensions:
+            candidate = final_dir / f'{stem}{ext}'
+            if candidate.exists():
+                return candidate
+        return None
+
+    def resolve_promoted_file(self, shot_name, asset_type):
+        """Return the promoted file for one asset of a shot, or ``None``.
+
+        Follows the same lookup as ``get_shot_info`` but only stats the
+        candidate paths, so media routes skip prompts, versions and thumbnails.
+        """
+        validate_shot_name(shot_name)
+        if asset_type == 'video':
+            return self._find_final(self.latest_videos_dir, shot_name, ALLOWED_VIDEO_EXTENSIONS)
+        if asset_type == 'last_image':
+            return self._find_final(self.latest_images_dir, f'{shot_name}_last', ALLOWED_IMAGE_EXTENSIONS)
+        if asset_type == 'first_image':
+            path = self._find_final(self.latest_images_dir, f'{shot_name}_first', ALLOWED_IMAGE_EXTENSIONS)
+            if path is None:
+                # Legacy single image, used only when no first-frame versions exist
+                images_dir = self.wip_dir / shot_name / 'images'
+                has_versions = images_dir.exists() and any(
+                    f.suffix.lower() in ALLOWED_IMAGE_EXTENSIONS for f in images_dir.glob(f'{shot_name}_first_v*')
+                )
+                if not has_versions:
+                    path = self._find_final(self.latest_images_dir, shot_name, ALLOWED_IMAGE_EXTENSIONS)
+            return path
+        if asset_type in ('driver', 'target', 'result'):
+            return self._find_final(self.wip_dir / shot_name / 'lipsync', f'{shot_name}_{asset_type}',
+                                    ALLOWED_VIDEO_EXTENSIONS)
+        raise ValueError(f"Invalid asset type: {asset_type}")
+
     def _get_latest_asset(self, final_dir, wip_dir, shot_name, extensions):
         """Helper for finding the latest final or highest versioned WIP asset."""
         latest_final = None
         if final_dir.exists():
-            for ext in extensions:
-                candidate = final_dir / f'{shot_name}{ext}'
-                if candidate.exists():
-                    latest_final = str(candidate)
-                    break
+            found = self._find_final(final_dir, shot_name, extensions)
+            if found:
+                latest_final = str(found)
 
         version = 0
         if wip_dir.exists():
@@ -666,8 +941,15 @@ class ShotManager:
         else:
             raise ValueError('Invalid asset type')
 
-    def get_current_version(self, shot_name, asset_type, max_version):
+    def get_current_version(self, shot_name, asset_type, max_version, document=_UNSET):
         """Read the currently promoted version from a marker file. Fallback to max_version."""
+        doc = self._document(shot_name, document)
+        if doc is not None:
+            v = doc.get('current_versions', {}).get(document_asset(asset_type))
+            if isinstance(v, int) and (max_version == 0 or 1 <= v <= max_version):
+                return v
+            return max_version
+
         def _read_marker(p):
             try:
                 if p.exists():
@@ -694,11 +976,19 @@ class ShotManager:
 
         return max_version
 
-    def set_current_version(self, shot_name, asset_type, version):
+    def set_current_version(self, shot_name, asset_type, version, document=_UNSET):
         """Persist the currently promoted version to a marker file."""
         marker = self._version_marker_path(asset_type, shot_name)
         marker.parent.mkdir(parents=True, exist_ok=True)
-        marker.write_text(str(int(version)), encoding='utf-8')
+        with self.locks.shot(shot_name):
+            key_path = ('current_versions', document_asset(asset_type))
+            in_document = self._update_document(shot_name, key_path, int(version), document)
+            if not in_document or LEGACY_WRITE_THROUGH:
+                atomic_write_text(marker, str(int(version)))
+
+    def _place_final(self, src, final_path):
+        """Copy a version file to its final location (reflinked where supported)."""
+        copy_file(src, final_path)
 
     def promote_asset(self, shot_name, asset_type, version):
         """Promote a specific WIP version to be the current final for image variants/video."""
@@ -706,9 +996,151 @@ class ShotManager:
         if asset_type not in {'image', 'first_image', 'last_image', 'video'}:
             raise ValueError('Invalid asset type')
 
-        shot_dir = self.wip_dir / shot_name
+        with self.locks.shot(shot_name):
+            # max_version 0 returns the marker as is, or 0 without one
+            marker_type = 'first_image' if asset_type == 'image' else asset_type
+            before = self.get_current_version(shot_name, marker_type, 0)
+            final_path = self._promote_asset(shot_name, asset_type, version)
+            self.journal.record('promote', shot_name, before, int(version), asset=asset_type)
+            return final_path
 
-        import shutil as _shutil
+    def apply_journal_entry(self, entry, value):
+        """Set the state changed by journal ``entry`` back to ``value``.
+
+        Used by undo (``value`` is the entry's ``before``) and redo (``after``).
+        """
+        op, shot_name = entry['op'], entry['shot']
+        if op == 'notes':
+            self.save_shot_notes(shot_name, value)
+        elif op == 'caption':
+            self.save_caption(shot_name, entry['asset'], value)
+        elif op == 'prompt':
+            self.save_prompt(shot_name, entry['asset'], entry['version'], value)
+        elif op == 'display_name':
+            self.save_display_name(shot_name, value)
+        elif op == 'reorder':
+            self.save_shot_order(value)
+        elif op == 'archive':
+            self.set_archived({shot_name: value})
+        elif op == 'rename':
+            current = entry['after'] if value == entry['before'] else entry['before']
+            self.rename_shot(current, value)
+        elif op == 'promote':
+            if not value:
+                raise ValueError(f"No earlier {entry['asset']} version of {shot_name} to go back to")
+            self.promote_asset(shot_name, entry['asset'], value)
+        elif op == 'batch':
+            # Undo reverts the changes last to first, redo replays them in order
+            steps = list(zip(entry['entries'], value))
+            for change, change_value in (reversed(steps) if value == entry['before'] else steps):
+                self.apply_journal_entry(change, change_value)
+        else:
+            raise ValueError(f"Unknown journal operation: {op}")
+
+    def undo(self):
+        """Revert the latest recorded change; returns its journal entry or ``None``."""
+        return self.journal.undo(self.apply_journal_entry)
+
+    def redo(self):
+        """Re-apply the latest undone change; returns its journal entry or ``None``."""
+        return self.journal.redo(self.apply_journal_entry)
+
+    def apply_batch(self, operations):
+        """Apply an ordered list of shot operations under one set of locks.
+
+        Each operation is a dict with ``op``, ``shot_name`` and the fields of
+        the matching single-shot route (see ``BATCH_OPERATIONS``).  Shots,
+        asset types and versions of all operations are checked before the
+        first one is applied; a failure while applying raises
+        :class:`BatchOperationError` with the number of operations that took
+        effect.  Consecutive archive changes are written together, before
+        the next non-archive operation, so operations always take effect in
+        request order.  The whole batch is one journal entry, undone in one
+        step.  Returns the names of the affected shots in the order they
+        first appear.
+        """
+        if not isinstance(operations, list) or not operations:
+            raise ValueError("Operations required")
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            raise ValueError(f"At most {MAX_BATCH_OPERATIONS} operations per batch")
+
+        affected = []
+        for i, operation in enumerate(operations, 1):
+            try:
+                self._validate_batch_operation(operation)
+            except ValueError as e:
+                raise ValueError(f"Operation {i}: {e}")
+            if operation['shot_name'] not in affected:
+                affected.append(operation['shot_name'])
+
+        applied = 0
+        archive_changes = {}
+        archive_ops = 0
+        with self.locks.shots(*affected), self.journal.grouped():
+            try:
+                for operation in operations:
+                    op, shot_name = operation['op'], operation['shot_name']
+                    if op == 'archive':
+                        archive_changes[shot_name] = bool(operation['archived'])
+                        archive_ops += 1
+                        continue
+                    if archive_changes:
+                        self.set_archived(archive_changes)
+                        applied += archive_ops
+                        archive_changes, archive_ops = {}, 0
+                    if op == 'notes':
+                        self.save_shot_notes(shot_name, operation['notes'])
+                    elif op == 'caption':
+                        self.save_caption(shot_name, operation['asset_type'], operation['caption'])
+                    elif op == 'prompt':
+                        self.save_prompt(shot_name, operation['asset_type'], int(operation['version']),
+                                         operation['prompt'])
+                    elif op == 'display_name':
+                        self.save_display_name(shot_name, operation['display_name'])
+                    elif op == 'promote':
+                        self.promote_asset(shot_name, operation['asset_type'], int(operation['version']))
+                    applied += 1
+                if archive_changes:
+                    self.set_archived(archive_changes)
+            except Exception as e:
+                op = operations[applied]['op']
+                raise BatchOperationError(
+                    f"Operation {applied + 1} ({op}) failed after {applied} operation(s) were applied: {e}",
+                    applied,
+                )
+        return affected
+
+    def _validate_batch_operation(self, operation):
+        """Raise ``ValueError`` unless ``operation`` can be applied as it is."""
+        if not isinstance(operation, dict) or operation.get('op') not in BATCH_OPERATIONS:
+            raise ValueError("unknown operation")
+        op = operation['op']
+        missing = [f for f in ('shot_name', *BATCH_OPERATIONS[op]) if operation.get(f) is None]
+        if missing:
+            raise ValueError(f"missing {', '.join(missing)}")
+        shot_name = operation['shot_name']
+        validate_shot_name(shot_name)
+        if not (self.wip_dir / shot_name).exists():
+            raise ValueError(f"shot {shot_name} does not exist")
+        if op not in _BATCH_ASSET_TYPES:
+            return
+        asset_type = operation['asset_type']
+        if asset_type not in _BATCH_ASSET_TYPES[op]:
+            raise ValueError(f"invalid asset type {asset_type}")
+        if 'version' not in BATCH_OPERATIONS[op]:
+            return
+        try:
+            version = int(operation['version'])
+        except (TypeError, ValueError):
+            raise ValueError("invalid version")
+        # Lipsync versions are not scanned by _detect_existing_versions
+        if asset_type in {'image', 'first_image', 'last_image', 'video'}:
+            slot = 'first_image' if asset_type == 'image' else asset_type
+            if not 1 <= version <= self._detect_existing_versions(shot_name, slot):
+                raise ValueError(f"{shot_name} has no {asset_type} version {version}")
+
+    def _promote_asset(self, shot_name, asset_type, version):
+        shot_dir = self.wip_dir / shot_name
 
         if asset_type in {'image', 'first_image', 'last_image'}:
             slot = 'first' if asset_type in {'image', 'first_image'} else 'last'
@@ -743,7 +1175,7 @@ class ShotManager:
                     logger.exception("Error unlinking existing final image")
 
             final_path = final_dir / f"{shot_name}_{slot}{src.suffix}"
-            _shutil.copy2(str(src), str(final_path))
+            self._place_final(src, final_path)
 
             # Update marker and regenerate thumbnail
             self.set_current_version(shot_name, 'first_image' if slot == 'first' else 'last_image', int(version))
@@ -783,7 +1215,7 @@ class ShotManager:
                 logger.exception("Error unlinking existing final video")
 
         final_path = final_dir / f"{shot_name}{src.suffix}"
-        _shutil.copy2(str(src), str(final_path))
+        self._place_final(src, final_path)
 
         self.set_current_version(shot_name, 'video', int(version))
         try:
@@ -796,9 +1228,10 @@ class ShotManager:
             logger.exception("Error unlinking old video thumbnail")
 
         _ = self.get_video_thumbnail_path(final_path, shot_name)
+        self.proxies.request(final_path)
         return self._normalize_path(final_path)
 
-    def save_shot_notes(self, shot_name, notes):
+    def save_shot_notes(self, shot_name, notes, document=_UNSET):
         """Save notes for a shot."""
         validate_shot_name(shot_name)
         shot_dir = self.wip_dir / shot_name
@@ -807,18 +1240,40 @@ class ShotManager:
 
         notes_file = shot_dir / 'notes.txt'
         try:
-            with open(notes_file, 'w', encoding='utf-8') as f:
-                f.write(notes)
+            with self.locks.shot(shot_name):
+                doc = self._document(shot_name, document)
+                before = self.load_notes(shot_name, doc)
+                in_document = self._update_document(shot_name, ('notes',), notes, doc)
+                if not in_document or LEGACY_WRITE_THROUGH:
+                    atomic_write_text(notes_file, notes)
+                self.journal.record('notes', shot_name, before, notes)
         except Exception as e:
             raise ValueError(f"Failed to save notes: {str(e)}")
 
+    def load_notes(self, shot_name, document=_UNSET):
+        """Load the notes text for a shot."""
+        doc = self._document(shot_name, document)
+        if doc is not None:
+            return doc.get('notes', '').strip()
+        notes_file = self.wip_dir / shot_name / 'notes.txt'
+        if notes_file.exists():
+            try:
+                with open(notes_file, encoding='utf-8') as f:
+                    return f.read().strip()
+            except Exception:
+                logger.exception("Error loading shot notes")
+        return ''
+
     def _captions_file(self, shot_name):
         """Return path to the captions JSON for a shot."""
         return (self.wip_dir / shot_name) / 'captions.json'
 
-    def load_captions(self, shot_name):
+    def load_captions(self, shot_name, document=_UNSET):
         """Load captions dict for a shot."""
         validate_shot_name(shot_name)
+        doc = self._document(shot_name, document)
+        if doc is not None:
+            return dict(doc.get('captions', {}))
         path = self._captions_file(shot_name)
         try:
             import json
@@ -831,7 +1286,7 @@ class ShotManager:
             logger.exception("Error loading shot captions")
         return {}
 
-    def save_caption(self, shot_name, asset_type, caption):
+    def save_caption(self, shot_name, asset_type, caption, document=_UNSET):
         """Persist caption text for given asset type for a shot."""
         validate_shot_name(shot_name)
         if asset_type not in {'first_image', 'last_image', 'video'}:
@@ -839,14 +1294,18 @@ class ShotManager:
         shot_dir = self.wip_dir / shot_name
         if not shot_dir.exists():
             raise ValueError(f"Shot {shot_name} does not exist")
-        captions = self.load_captions(shot_name)
-        captions[asset_type] = caption or ''
-        try:
-            import json
-            with self._captions_file(shot_name).open('w', encoding='utf-8') as f:
-                json.dump(captions, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            raise ValueError(f"Failed to save caption: {str(e)}")
+        with self.locks.shot(shot_name):
+            try:
+                doc = self._document(shot_name, document)
+                before = self.load_captions(shot_name, doc).get(asset_type, '')
+                in_document = self._update_document(shot_name, ('captions', asset_type), caption or '', doc)
+                if not in_document or LEGACY_WRITE_THROUGH:
+                    captions = self.load_captions(shot_name, document=None)
+                    captions[asset_type] = caption or ''
+                    atomic_write_json(self._captions_file(shot_name), captions, ensure_ascii=False, indent=2)
+                self.journal.record('caption', shot_name, before, caption or '', asset=asset_type)
+            except Exception as e:
+                raise ValueError(f"Failed to save caption: {str(e)}")
 
     def _prompt_file_path(self, shot_name, asset_type, version):
         """Return the path to the prompt file for a specific asset version."""
@@ -870,7 +1329,11 @@ class ShotManager:
             raise ValueError('Invalid asset type')
         return base_dir / filename
 
-    def load_prompt(self, shot_name, asset_type, version):
+    def load_prompt(self, shot_name, asset_type, version, document=_UNSET):
+        doc = self._document(shot_name, document)
+        if doc is not None:
+            prompts = doc.get('prompts', {}).get(document_asset(asset_type), {})
+            return (prompts.get(str(int(version))) or '').strip()
         path = self._prompt_file_path(shot_name, asset_type, version)
         if path.exists():
             try:
@@ -889,14 +1352,20 @@ class ShotManager:
                     return ''
         return ''
 
-    def save_prompt(self, shot_name, asset_type, version, prompt):
+    def save_prompt(self, shot_name, asset_type, version, prompt, document=_UNSET):
         """Save prompt for a specific asset version."""
         validate_shot_name(shot_name)
         path = self._prompt_file_path(shot_name, asset_type, version)
         path.parent.mkdir(parents=True, exist_ok=True)
         try:
-            with open(path, 'w', encoding='utf-8') as f:
-                f.write(prompt)
+            with self.locks.shot(shot_name):
+                doc = self._document(shot_name, document)
+                before = self.load_prompt(shot_name, asset_type, version, doc)
+                key_path = ('prompts', document_asset(asset_type), str(int(version)))
+                in_document = self._update_document(shot_name, key_path, prompt, doc)
+                if not in_document or LEGACY_WRITE_THROUGH:
+                    atomic_write_text(path, prompt)
+                self.journal.record('prompt', shot_name, before, prompt, asset=asset_type, version=int(version))
         except Exception as e:
             raise ValueError(f"Failed to save prompt: {str(e)}")
 
@@ -924,6 +1393,11 @@ class ShotManager:
         else:
             raise ValueError('Invalid asset type')
 
+        doc = self.load_shot_document(shot_name)
+        if doc is not None:
+            prompts = doc.get('prompts', {}).get(document_asset(asset_type), {})
+            return sorted(int(v) for v, text in prompts.items() if text)
+
         versions = set()
         if base_dir and base_dir.exists():
             for pattern in patterns:
@@ -939,6 +1413,138 @@ class ShotManager:
                         continue
         return sorted(versions)
 
+    def _scan_versions(self, shot_name):
+        """Scan a shot's version folders once.
+
+        Returns ``(media, prompts)``, both ``{slot: {version: DirEntry}}``.
+        The ``first`` naming wins over the legacy single-image naming.
+        """
+        media, prompts = {}, {}
+        prefix = f'{shot_name}_'
+        for sub, parts in _VERSION_FOLDERS.items():
+            try:
+                it = os.scandir(self.wip_dir / shot_name / sub)
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    if not entry.name.startswith(prefix):
+                        continue
+                    match = _VERSION_FILE_RE.match(entry.name[len(prefix):])
+                    if not match or match.group('part') not in parts:
+                        continue
+                    slot, prompt_suffix, extensions = parts[match.group('part')]
+                    suffix = match.group('suffix')
+                    if suffix == prompt_suffix:
+                        target = prompts
+                    elif suffix.lower() in extensions:
+                        target = media
+                    else:
+                        continue
+                    versions = target.setdefault(slot, {})
+                    version = int(match.group('version'))
+                    legacy = match.group('part') is None and sub == 'images'
+                    if legacy and version in versions:
+                        continue
+                    versions[version] = entry
+        return media, prompts
+
+    def get_version_history(self, shot_name, asset_type=None):
+        """Return every version of every slot of a shot (or of ``asset_type``).
+
+        Built from one scan per version folder: ``{slot: {'current_version':
+        n, 'versions': [...]}}`` with, per version, the file, size, mtime,
+        whether it is current, its prompt and a thumbnail URL.  Thumbnails of
+        other than the current versions are only created when their URL is
+        first requested (see ``get_version_thumbnail``).
+        """
+        validate_shot_name(shot_name)
+        if not (self.wip_dir / shot_name).exists():
+            raise ValueError(f"Shot {shot_name} does not exist")
+        slots = VERSION_SLOTS
+        if asset_type is not None:
+            if document_asset(asset_type) not in VERSION_SLOTS:
+                raise ValueError('Invalid asset type')
+            slots = (document_asset(asset_type),)
+
+        media, prompt_files = self._scan_versions(shot_name)
+        doc = self.load_shot_document(shot_name)
+        history = {}
+        for slot in slots:
+            files = media.get(slot, {})
+            if doc is not None:
+                prompts = {int(v): (text or '').strip()
+                           for v, text in doc.get('prompts', {}).get(slot, {}).items()}
+            else:
+                prompts = {}
+                for version, entry in prompt_files.get(slot, {}).items():
+                    try:
+                        with open(entry.path, encoding='utf-8') as f:
+                            prompts[version] = f.read().strip()
+                    except OSError:
+                        prompts[version] = ''
+
+            max_version = max(files, default=0)
+            if slot in ('driver', 'target', 'result'):
+                # Lipsync parts are not promoted; the latest one is shown
+                current = max_version
+            else:
+                current = self.get_current_version(shot_name, slot, max_version, doc)
+
+            versions = []
+            for version in sorted(set(files) | {v for v, text in prompts.items() if text}):
+                entry = files.get(version)
+                item = {
+                    'version': version,
+                    'file': None,
+                    'size': None,
+                    'mtime': None,
+                    'current': version == current,
+                    'prompt': prompts.get(version, ''),
+                    'thumbnail': None,
+                }
+                if entry is not None:
+                    st = entry.stat()
+                    item.update({
+                        'file': self._normalize_path(entry.path),
+                        'size': st.st_size,
+                        'mtime': datetime.fromtimestamp(st.st_mtime).isoformat(),
+                        'thumbnail': self._version_thumbnail_url(shot_name, slot, version, entry, st,
+                                                                 create=version == current),
+                    })
+                versions.append(item)
+            history[slot] = {'current_version': current, 'versions': versions}
+        return history
+
+    def _version_thumbnail_url(self, shot_name, slot, version, entry, st, create):
+        """Return the thumbnail URL of a version file, creating it only if ``create``."""
+        path = Path(entry.path)
+        if create:
+            if slot in ('first_image', 'last_image'):
+                return self.get_thumbnail_path(path, shot_name)
+            return self.get_video_thumbnail_path(path, shot_name)
+        suffix = '_thumb.jpg' if slot in ('first_image', 'last_image') else '_vthumb.jpg'
+        thumb_filename = f"{shot_name}_{path.stem}{suffix}"
+        try:
+            if (self.thumbnail_cache_dir / thumb_filename).stat().st_mtime >= st.st_mtime:
+                return f"/api/shots/thumbnail/{thumb_filename}"
+        except OSError:
+            pass
+        return f"/api/shots/version-thumbnail?shot_name={shot_name}&asset_type={slot}&version={version}"
+
+    def get_version_thumbnail(self, shot_name, asset_type, version):
+        """Create (if needed) the thumbnail of one version and return its URL or ``None``."""
+        validate_shot_name(shot_name)
+        slot = document_asset(asset_type)
+        if slot not in VERSION_SLOTS:
+            raise ValueError('Invalid asset type')
+        entry = self._scan_versions(shot_name)[0].get(slot, {}).get(int(version))
+        if entry is None:
+            raise ValueError(f"Version v{int(version):03d} not found for {shot_name} {asset_type}")
+        if slot in ('first_image', 'last_image'):
+            return self.get_thumbnail_path(Path(entry.path), shot_name)
+        return self.get_video_thumbnail_path(Path(entry.path), shot_name)
+
     def get_thumbnail_path(self, image_path, shot_name):
         """Return (and create if necessary) the thumbnail for an image."""
         if not image_path:
@@ -1015,195 +1621,233 @@ class ShotManager:
 
     def export_latest_assets(self, export_name=None, export_type='all', include_display_in_filename=True, include_metadata=True):
         """Export latest assets for non-archived shots in custom order."""
-        import re
-        import shutil
-        from datetime import datetime
-
-        # Get non-archived shots in order
-        non_archived_shots = [s for s in self.get_shots() if not s['archived']]
-        if not non_archived_shots:
-            raise ValueError("No non-archived shots found")
-
-        # Load project information
-        project_manager = ProjectManager()
-        project_info = project_manager.load_project_info(self.project_path)
-
-        # Create export directory
-        exports_root = self.project_path / 'exports'
-        exports_root.mkdir(exist_ok=True)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        export_dir_name = export_name or f'export_{timestamp}'
-        export_dir = exports_root / export_dir_name
-        export_dir.mkdir(exist_ok=True)
-
-        # Sanitize filename helper
-        def sanitize_filename(name):
-            return re.sub(r'[<>:\"/\\|?*]', '_', str(name))[:50] or ''
-
-        # Process each shot in order
-        for order, shot in enumerate(non_archived_shots, start=1):
-            shot_name = shot['name']
-            display_name = shot['display_name'] or ''
-            display_suffix = f"_{sanitize_filename(display_name)}" if include_display_in_filename and display_name else ''
-
-            # Get shot info
-            info = self.get_shot_info(shot_name)
-
-            # Images
-            if 'images' in export_type or export_type == 'all':
-                images_dir = export_dir / 'images'
-                images_dir.mkdir(exist_ok=True)
-
-                # First image
-                if info['first_image']['file']:
-                    src = Path(info['first_image']['file'])
-                    if src.exists():
-                        ext = src.suffix
-                        dst = images_dir / f"{order:03d}_{shot_name}{display_suffix}_first{ext}"
-                        shutil.copy2(src, dst)
-
-                # Last image
-                if info['last_image']['file']:
-                    src = Path(info['last_image']['file'])
-                    if src.exists():
-                        ext = src.suffix
-                        dst = images_dir / f"{order:03d}_{shot_name}{display_suffix}_last{ext}"
-                        shutil.copy2(src, dst)
+        job = self.create_export_job(export_name, export_type, include_display_in_filename, include_metadata)
+        return job.run()
+
+    def plan_export(self, export_type='all', include_display_in_filename=True, include_metadata=True):
+        """Return the export plan for the non-archived shots."""
+        project_info = ProjectManager().load_project_info(self.project_path)
+        return plan_export(self, export_type, include_display_in_filename, include_metadata, project_info)
+
+    def create_export_job(self, export_name=None, export_type='all', include_display_in_filename=True,
+                          include_metadata=True, export_format='folder', incremental=False, preset=None):
+        """Plan an export and return an ``ExportJob`` ready to run.
+
+        Exporting again under an existing ``export_name`` resumes into that
+        directory, skipping files that were already copied.  ``incremental``
+        additionally renames and deletes files so the directory matches the
+        current shots.  With ``export_format='zip'`` the job writes
+        ``exports/<name>.zip`` instead.  ``preset`` names an entry of
+        ``EXPORT_PRESETS`` to transcode assets on the way out.
+        """
+        if incremental and (export_format == 'zip' or not export_name):
+            raise ValueError("Incremental export requires an export name and folder format")
+        if preset and export_format == 'zip':
+            raise ValueError("Export presets are only supported for folder exports")
+        plan = self.plan_export(export_type, include_display_in_filename, include_metadata)
+        if export_format == 'zip':
+            export_path = resolve_export_dir(self.project_path, export_name, plan['timestamp'], '.zip')
+            return ZipExportJob(plan, export_path, project_path=self.project_path)
+        transcoder = None
+        if preset:
+            apply_preset(plan, preset)
+            transcoder = Transcoder(self.project_path, self.media_probe)
+        export_dir = resolve_export_dir(self.project_path, export_name, plan['timestamp'])
+        return ExportJob(plan, export_dir, incremental=incremental, transcoder=transcoder,
+                         project_path=self.project_path)
+
+    def create_animatic_job(self, export_name=None):
+        """Return an ``AnimaticJob`` joining the promoted videos in shot order."""
+        require_ffmpeg()
+        plan = self.plan_export('videos', include_display_in_filename=False, include_metadata=False)
+        if not plan['items']:
+            raise ValueError("No promoted shot videos to assemble")
+        name = export_name or f"animatic_{plan['timestamp']}"
+        output = resolve_export_dir(self.project_path, name, plan['timestamp'], animatic_suffix(plan, self.media_probe))
+        return AnimaticJob(plan, output, self.project_path, self.media_probe)
+
+
+class ShotManagerCache:
+    """``ShotManager`` instances of the open projects, least recently used first.
+
+    Holds at most ``max_projects`` managers whose :meth:`ShotManager.approx_memory`
+    adds up to at most ``max_bytes``; the project just requested is always
+    kept.  Managers are built outside the cache lock, so opening a large
+    project does not hold up requests for the others.
+
+    A manager is *leased* while a request or app context uses it (see
+    :func:`get_shot_manager`).  Leased managers are never evicted, so there is
+    only ever one manager, with one journal and one set of caches, per
+    project in use.  Evicted managers are closed, which saves their caches so
+    reopening the project is a warm start.
+    """
+
+    # Seconds between approx_memory() sweeps when no manager was added
+    MEMORY_CHECK_INTERVAL = 5.0
+
+    def __init__(self, max_projects=SHOT_MANAGER_CACHE_SIZE, max_bytes=SHOT_MANAGER_CACHE_BYTES):
+        self.max_projects = max(1, max_projects)
+        self.max_bytes = max_bytes
+        self._managers = OrderedDict()
+        self._lock = threading.Lock()
+        self._building = {}     # path_key -> Event set once the manager is built
+        self._leases = {}       # manager -> number of active leases
+        self._retired = set()   # removed while leased; closed on the last release
+        self._memory_checked = 0.0
+
+    def __len__(self):
+        return len(self._managers)
+
+    def __contains__(self, path_key):
+        return path_key in self._managers
+
+    def values(self):
+        with self._lock:
+            return list(self._managers.values())
+
+    def get_or_create(self, path_key, factory, lease=False):
+        """Return the manager for ``path_key``, creating it with ``factory``.
+
+        With ``lease`` the manager is not evicted until :meth:`release`.
+        """
+        created = False
+        while True:
+            owner = False
+            with self._lock:
+                manager = self._managers.get(path_key)
+                if manager is not None:
+                    self._managers.move_to_end(path_key)
+                    if lease:
+                        self._leases[manager] = self._leases.get(manager, 0) + 1
+                    evicted = self._select_evictions(created)
+                    break
+                building = self._building.get(path_key)
+                if building is None:
+                    building = self._building[path_key] = threading.Event()
+                    owner = True
+            if not owner:
+                building.wait()
+                continue
+            try:
+                manager = factory(path_key)
+                with self._lock:
+                    self._managers[path_key] = manager
+                created = True
+            finally:
+                with self._lock:
+                    del self._building[path_key]
+                building.set()
+        for key, old in evicted:
+            logger.info("Evicted project %s from the shot manager cache", key)
+            self._close(key, old)
+        return manager
+
+    def release(self, manager):
+        """End a lease taken by :meth:`get_or_create`."""
+        with self._lock:
+            count = self._leases.get(manager, 0) - 1
+            if count > 0:
+                self._leases[manager] = count
+                return
+            self._leases.pop(manager, None)
+            if manager not in self._retired:
+                return
+            self._retired.discard(manager)
+        self._close(str(manager.project_path), manager)
+
+    def _select_evictions(self, force_memory_check):
+        """Pop unleased managers over the limits; the caller holds ``_lock``."""
+        sizes = None
+        now = time.monotonic()
+        if force_memory_check or now - self._memory_checked >= self.MEMORY_CHECK_INTERVAL:
+            self._memory_checked = now
+            sizes = {key: m.approx_memory() for key, m in self._managers.items()}
+        elif len(self._managers) <= self.max_projects:
+            return []
+        total = sum(sizes.values()) if sizes is not None else 0
 
-            # Videos
-            if 'videos' in export_type or export_type == 'all':
-                videos_dir = export_dir / 'videos'
-                videos_dir.mkdir(exist_ok=True)
+        evicted = []
+        # The last entry is the project just requested
+        for key in list(self._managers)[:-1]:
+            if len(self._managers) <= self.max_projects and total <= self.max_bytes:
+                break
+            manager = self._managers[key]
+            if manager in self._leases:
+                continue
+            del self._managers[key]
+            if sizes is not None:
+                total -= sizes[key]
+            evicted.append((key, manager))
+        return evicted
 
-                if info['video']['file']:
-                    src = Path(info['video']['file'])
-                    if src.exists():
-                        ext = src.suffix
-                        dst = videos_dir / f"{order:03d}_{shot_name}{display_suffix}{ext}"
-                        shutil.copy2(src, dst)
-
-        # Generate metadata if requested
-        if include_metadata:
-            # Collect data for tables and notes
-            first_data = []
-            last_data = []
-            video_data = []
-            notes_list = []
-
-            for order, shot in enumerate(non_archived_shots, start=1):
-                shot_name = shot['name']
-                info = self.get_shot_info(shot_name)
-
-                # First Frame
-                if ('images' in export_type or export_type == 'all') and (info['first_image']['caption'] or info['first_image']['prompt']):
-                    first_data.append((order, shot_name, info['first_image']['caption'], info['first_image']['prompt']))
-
-                # Last Frame
-                if ('images' in export_type or export_type == 'all') and (info['last_image']['caption'] or info['last_image']['prompt']):
-                    last_data.append((order, shot_name, info['last_image']['caption'], info['last_image']['prompt']))
-
-                # Video
-                if ('videos' in export_type or export_type == 'all') and (info['video']['caption'] or info['video']['prompt']):
-                    video_data.append((order, shot_name, info['video']['caption'], info['video']['prompt']))
-
-                # Notes
-                if info['notes'].strip():
-                    notes_list.append((order, shot_name, info['notes']))
-
-            # Build MD content
-            md_lines = [
-                f"# {project_info.get('title', self.project_path.name)}",
-                "",
-                "## Project Information",
-            ]
+    @staticmethod
+    def _close(path_key, manager):
+        try:
+            manager.close()
+        except Exception:
+            logger.exception("Error saving state of %s", path_key)
+
+    def _remove(self, path_key, manager):
+        """Close ``manager`` now or, if leased, once released; the caller holds no lock."""
+        with self._lock:
+            if manager in self._leases:
+                self._retired.add(manager)
+                return
+        self._close(path_key, manager)
+
+    def pop(self, path_key):
+        with self._lock:
+            manager = self._managers.pop(path_key, None)
+        if manager is not None:
+            self._remove(path_key, manager)
+        return manager
+
+    def clear(self):
+        with self._lock:
+            managers, self._managers = self._managers, OrderedDict()
+        for key, manager in managers.items():
+            self._remove(key, manager)
 
-            # Add bullet points for non-empty project fields
-            if project_info.get('short_description'):
-                md_lines.append(f"- **Short Description:** {project_info.get('short_description')}")
-
-            if project_info.get('notes'):
-                md_lines.append(f"- **Project Notes:** {project_info.get('notes')}")
-
-            if project_info.get('tags'):
-                md_lines.append(f"- **Tags:** {', '.join(project_info.get('tags'))}")
-
-            md_lines.extend([
-                "",
-                f"**Export Date:** {timestamp}",
-                f"**Export Type:** {export_type}",
-                ""
-            ])
-
-            # First Frame table
-            if first_data:
-                md_lines.extend([
-                    "## First Frame",
-                    "| Order | Shot Name | Captions | Prompts |",
-                    "|-------|-----------|----------|---------|"
-                ])
-                for order, name, caption, prompt in first_data:
-                    md_lines.append(f"| {order:03d} | {name} | {caption.replace('|', '\\|').replace('\n', '<br>')} | {prompt.replace('|', '\\|').replace('\n', '<br>')} |")
-                md_lines.append("")
-
-            # Last Frame table
-            if last_data:
-                md_lines.extend([
-                    "## Last Frame",
-                    "| Order | Shot Name | Captions | Prompts |",
-                    "|-------|-----------|----------|---------|"
-                ])
-                for order, name, caption, prompt in last_data:
-                    md_lines.append(f"| {order:03d} | {name} | {caption.replace('|', '\\|').replace('\n', '<br>')} | {prompt.replace('|', '\\|').replace('\n', '<br>')} |")
-                md_lines.append("")
-
-            # Video table
-            if video_data:
-                md_lines.extend([
-                    "## Video",
-                    "| Order | Shot Name | Captions | Prompts |",
-                    "|-------|-----------|----------|---------|"
-                ])
-                for order, name, caption, prompt in video_data:
-                    md_lines.append(f"| {order:03d} | {name} | {caption.replace('|', '\\|').replace('\n', '<br>')} | {prompt.replace('|', '\\|').replace('\n', '<br>')} |")
-                md_lines.append("")
-
-            # Notes table
-            if notes_list:
-                md_lines.extend([
-                    "## Notes",
-                    "| Order | Shot Name | Notes |",
-                    "|-------|-----------|-------|"
-                ])
-                for order, name, notes in notes_list:
-                    md_lines.append(f"| {order:03d} | {name} | {notes.replace('|', '\\|').replace('\n', '<br>')} |")
-                md_lines.append("")
-
-            # Write MD file
-            md_path = export_dir / "export_summary.md"
-            with open(md_path, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(md_lines))
-
-        return str(export_dir)
 
 def get_shot_manager(project_path, cache=None):
-    """Retrieve a cached ``ShotManager`` for the given path."""
-    from flask import current_app
+    """Retrieve a cached ``ShotManager`` for the given path.
+
+    Safe to call from concurrent requests: exactly one instance is created
+    per project, so all threads share its locks.  Inside a request or app
+    context the manager is leased until the context ends
+    (:func:`release_shot_managers`), so it cannot be evicted while in use.
+    """
+    from flask import current_app, g, has_app_context
 
     if cache is None:
-        cache = current_app.config.setdefault('SHOT_MANAGER_CACHE', {})
+        cache = current_app.config.setdefault('SHOT_MANAGER_CACHE', ShotManagerCache())
 
     path_key = str(Path(project_path).resolve())
-    if path_key not in cache:
-        cache[path_key] = ShotManager(path_key)
-    return cache[path_key]
+    if not has_app_context():
+        return cache.get_or_create(path_key, ShotManager)
+    manager = cache.get_or_create(path_key, ShotManager, lease=True)
+    g.setdefault('shot_manager_leases', []).append((cache, manager))
+    return manager
 
 
-def clear_shot_manager_cache(cache=None):
-    """Clear cached ``ShotManager`` instances."""
+def release_shot_managers(exc=None):
+    """``teardown_appcontext`` hook ending the leases taken by :func:`get_shot_manager`."""
+    from flask import g
+
+    for cache, manager in g.pop('shot_manager_leases', []):
+        cache.release(manager)
+
+
+def clear_shot_manager_cache(cache=None, project_path=None):
+    """Clear cached ``ShotManager`` instances, or only that of ``project_path``."""
     from flask import current_app
 
     if cache is None:
         cache = current_app.config.get('SHOT_MANAGER_CACHE')
 
-    if cache is not None:
+    if cache is None:
+        return
+    if project_path is not None:
+        cache.pop(str(Path(project_path).resolve()))
+    else:
         cache.clear()
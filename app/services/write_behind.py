@@ -0,0 +1,93 @@
+"""Debounced write-behind for small JSON state files.
+
+Frequent updates (the project's ``updated`` timestamp, ``projects.json`` on
+every project switch) are applied in memory and written out together once no
+new update arrived for ``delay`` seconds, or at the latest ``max_delay``
+seconds after the first pending one.  Pending writes are flushed at
+interpreter exit and when the server shuts down
+(:func:`app.server.shutdown_services`).
+
+A ``flush_fn`` that raises is retried ``delay`` seconds later; it must leave
+whatever it did not write pending so the retry picks it up.
+"""
+
+import atexit
+import logging
+import threading
+import time
+import weakref
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehind:
+    """Coalesce calls to :meth:`mark` into debounced calls of ``flush_fn``."""
+
+    def __init__(self, flush_fn, delay, max_delay):
+        self._flush_fn = flush_fn
+        self.delay = delay
+        self.max_delay = max(delay, max_delay)
+        self._cond = threading.Condition()
+        # Serialises flushes so the thread and an explicit flush() never overlap
+        self._flush_lock = threading.Lock()
+        self._first = None
+        self._last = None
+        self._thread = None
+        ref = weakref.ref(self)
+        atexit.register(lambda: ref() and ref().flush())
+
+    @property
+    def pending(self):
+        with self._cond:
+            return self._first is not None
+
+    def mark(self):
+        """Note that there is something to write; returns immediately."""
+        if self.delay <= 0:
+            self.flush(force=True)
+            return
+        self._arm()
+
+    def _arm(self):
+        now = time.monotonic()
+        with self._cond:
+            if self._first is None:
+                self._first = now
+            self._last = now
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def flush(self, force=False):
+        """Write pending changes now (always calls ``flush_fn`` if ``force``)."""
+        with self._flush_lock:
+            with self._cond:
+                if self._first is None and not force:
+                    return
+                self._first = self._last = None
+            try:
+                self._flush_fn()
+            except Exception:
+                logger.exception("Write-behind flush failed")
+                if self.delay > 0:
+                    # Counts as a fresh change so a persistent failure is
+                    # retried every ``delay`` seconds, not in a tight loop
+                    self._arm()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._first is None:
+                    # Nothing pending: wait briefly for more work, then exit
+                    self._cond.wait(timeout=self.delay * 10 + 1)
+                    if self._first is None:
+                        self._thread = None
+                        return
+                    continue
+                due = min(self._last + self.delay, self._first + self.max_delay)
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(timeout=wait)
+                    continue
+            self.flush()
@@ -259,6 +259,7 @@ document.addEventListener('DOMContentLoaded', function () {
     window.addEventListener('resize', positionToc); // Re-position on resize
     checkForProject();
     initTooltips(); // Initialize tooltip functionality
+    document.addEventListener('keydown', handleUndoRedoKeydown);
 });
 
 function handlePromptButtonClick(event) {
@@ -401,7 +402,7 @@ async function loadShots(rowId = null) {
     document.getElementById('shot-grid').style.display = 'none';
 
     try {
-        const response = await fetch('/api/shots');
+        const response = await fetch('/api/shots?compact=1');
         const result = await response.json();
 
         if (result.success) {
@@ -1085,7 +1086,13 @@ async function uploadFile(file, shotName, fileType) {
                     updateDropZoneForShot(shotName, fileType, shot);
                 }
 
-                showNotification(`${file.name} uploaded successfully!`);
+                if (result.data.skipped) {
+                    showNotification(`${file.name} is identical to v${String(result.data.duplicate_of).padStart(3, '0')}; reused existing version`);
+                } else if (result.data.duplicate_of) {
+                    showNotification(`${file.name} uploaded (identical to v${String(result.data.duplicate_of).padStart(3, '0')})`);
+                } else {
+                    showNotification(`${file.name} uploaded successfully!`);
+                }
             } else {
                 showNotification('Shot data not found', 'error');
             }
@@ -1491,6 +1498,44 @@ async function archiveShot(shotName, archived) {
     }
 }
 
+function handleUndoRedoKeydown(event) {
+    if (!(event.ctrlKey || event.metaKey) || event.altKey) {
+        return;
+    }
+    // Leave undo inside text fields to the browser
+    const target = event.target;
+    if (target.closest('input, textarea, select, [contenteditable="true"]')) {
+        return;
+    }
+    const key = event.key.toLowerCase();
+    if (key === 'z') {
+        event.preventDefault();
+        undoRedo(event.shiftKey ? 'redo' : 'undo');
+    } else if (key === 'y') {
+        event.preventDefault();
+        undoRedo('redo');
+    }
+}
+
+async function undoRedo(action) {
+    try {
+        const response = await fetch(`/api/shots/${action}`, { method: 'POST' });
+        const result = await response.json();
+        if (result.success) {
+            const entry = result.data;
+            const label = entry.op.replace('_', ' ');
+            const what = entry.shot ? `${label} of ${entry.shot}` : label;
+            showNotification(`${action === 'undo' ? 'Undid' : 'Redid'} ${what}`);
+            await loadShots();
+        } else {
+            showNotification(result.error || `Failed to ${action}`, 'error');
+        }
+    } catch (e) {
+        console.error(`${action} failed:`, e);
+        showNotification(`Failed to ${action}`, 'error');
+    }
+}
+
 async function revealFile(relPath) {
     try {
         const response = await fetch('/api/shots/reveal', {
@@ -1521,6 +1566,31 @@ async function fetchPrompt(shotName, assetType, version) {
     return '';
 }
 
+// Version history of the slot shown in the prompt modal, keyed by version
+let promptVersionHistory = {};
+
+async function fetchVersionHistory(shotName, assetType) {
+    try {
+        const resp = await fetch(`/api/shots/versions?shot_name=${encodeURIComponent(shotName)}&asset_type=${assetType}`);
+        const data = await resp.json();
+        if (data.success) {
+            const slot = Object.values(data.data)[0];
+            return Object.fromEntries(slot.versions.map(v => [v.version, v]));
+        }
+    } catch (e) {
+        console.error('Failed to load version history:', e);
+    }
+    return null;
+}
+
+async function getPromptText(shotName, assetType, version) {
+    const entry = promptVersionHistory[version];
+    if (entry) {
+        return entry.prompt || '';
+    }
+    return fetchPrompt(shotName, assetType, version);
+}
+
 function buildVersionDropdown(versions, currentVersion) {
     const btn = document.getElementById('version-dropdown-btn');
     const menu = document.getElementById('version-dropdown-menu');
@@ -1530,7 +1600,15 @@ function buildVersionDropdown(versions, currentVersion) {
         const item = document.createElement('div');
         item.className = 'dropdown-item';
         item.dataset.version = v;
-        item.textContent = `v${String(v).padStart(3, '0')}`;
+        const thumbnail = promptVersionHistory[v]?.thumbnail;
+        if (thumbnail) {
+            const img = document.createElement('img');
+            img.className = 'version-thumb';
+            img.loading = 'lazy'; // non-current thumbnails are generated on request
+            img.src = thumbnail;
+            item.appendChild(img);
+        }
+        item.appendChild(document.createTextNode(`v${String(v).padStart(3, '0')}`));
         item.onclick = () => selectPromptVersion(v);
         menu.appendChild(item);
     });
@@ -1560,6 +1638,9 @@ async function selectPromptVersion(v) {
                     prompt: prevPromptText
                 })
             });
+            if (promptVersionHistory[prevVersion]) {
+                promptVersionHistory[prevVersion].prompt = prevPromptText;
+            }
         } catch (e) {
             console.error('Auto-save failed:', e);
         }
@@ -1567,14 +1648,14 @@ async function selectPromptVersion(v) {
     modal.dataset.version = v;
     const versions = JSON.parse(modal.dataset.versions || '[]');
     buildVersionDropdown(versions, v);
-    let prompt = await fetchPrompt(shotName, assetType, v);
+    let prompt = await getPromptText(shotName, assetType, v);
 
     const copyBtn = document.getElementById('copy-prompt-btn');
     copyBtn.style.display = 'none';
     modal.dataset.prevPrompt = '';
 
     if (!prompt && v === parseInt(modal.dataset.assetVersion, 10)) {
-        const prevPrompt = await fetchPrompt(shotName, assetType, v - 1);
+        const prevPrompt = await getPromptText(shotName, assetType, v - 1);
         if (prevPrompt) {
             modal.dataset.prevPrompt = prevPrompt;
             copyBtn.style.display = 'inline-block';
@@ -1591,18 +1672,21 @@ async function openPromptModal(shotName, assetType, currentVersion, maxVersion)
 
     const typeLabel = displayAssetLabel(assetType);
     document.getElementById('prompt-modal-title').textContent = `${shotName} ${typeLabel} Prompt`;
-    const versions = Array.from({ length: maxVersion }, (_, i) => i + 1);
+    // One request for all versions' prompts and thumbnails
+    promptVersionHistory = (await fetchVersionHistory(shotName, assetType)) || {};
+    const historyMax = Math.max(0, ...Object.keys(promptVersionHistory).map(Number));
+    const versions = Array.from({ length: Math.max(maxVersion, historyMax) }, (_, i) => i + 1);
     modal.dataset.versions = JSON.stringify(versions);
     modal.dataset.assetVersion = currentVersion;
     buildVersionDropdown(versions, currentVersion);
 
-    let prompt = await fetchPrompt(shotName, assetType, currentVersion);
+    let prompt = await getPromptText(shotName, assetType, currentVersion);
     const copyBtn = document.getElementById('copy-prompt-btn');
     copyBtn.style.display = 'none';
     modal.dataset.prevPrompt = '';
 
     if (!prompt && currentVersion > 1) {
-        const prevPrompt = await fetchPrompt(shotName, assetType, currentVersion - 1);
+        const prevPrompt = await getPromptText(shotName, assetType, currentVersion - 1);
         if (prevPrompt) {
             modal.dataset.prevPrompt = prevPrompt;
             copyBtn.style.display = 'inline-block';
@@ -2013,20 +2097,42 @@ async function saveProjectInfo() {
 function openExportModal() {
     document.getElementById('export-modal').style.display = 'flex';
     document.getElementById('export-name').value = '';
-    document.getElementById('export-type').value = 'all';
+    document.getElementById('export-images').checked = true;
+    document.getElementById('export-videos').checked = true;
     document.getElementById('include-display-in-filename').checked = true;
+    loadExportPresets();
+}
+
+async function loadExportPresets() {
+    const select = document.getElementById('export-preset');
+    if (select.options.length > 1) return;
+    try {
+        const response = await fetch('/api/shots/export/presets');
+        const result = await response.json();
+        if (!result.success) return;
+        result.data.forEach(preset => {
+            const option = document.createElement('option');
+            option.value = preset.name;
+            option.textContent = preset.label;
+            select.appendChild(option);
+        });
+    } catch (error) {
+        console.error('Failed to load export presets:', error);
+    }
 }
 
 function closeExportModal() {
     document.getElementById('export-modal').style.display = 'none';
 }
 
-async function confirmExport() {
+function getExportOptions() {
     const exportName = document.getElementById('export-name').value.trim();
     const exportImages = document.getElementById('export-images').checked;
     const exportVideos = document.getElementById('export-videos').checked;
     const includeDisplay = document.getElementById('include-display-in-filename').checked;
     const includeMetadata = document.getElementById('include-metadata').checked;
+    const incremental = document.getElementById('export-incremental').checked;
+    const preset = document.getElementById('export-preset').value;
 
     // Determine export type based on checkbox states
     let exportType;
@@ -2038,6 +2144,17 @@ async function confirmExport() {
         exportType = 'videos';
     } else {
         showNotification('Please select at least one export option (Images or Videos)', 'error');
+        return null;
+    }
+    return { exportName, exportType, includeDisplay, includeMetadata, incremental, preset };
+}
+
+async function confirmExport() {
+    const options = getExportOptions();
+    if (!options) return;
+    const { exportName, exportType, includeDisplay, includeMetadata, incremental, preset } = options;
+    if (incremental && !exportName) {
+        showNotification('Enter the name of the export to update', 'error');
         return;
     }
 
@@ -2049,7 +2166,10 @@ async function confirmExport() {
                 export_name: exportName || null,
                 export_type: exportType,
                 include_display_in_filename: includeDisplay,
-                include_metadata: includeMetadata
+                include_metadata: includeMetadata,
+                incremental: incremental,
+                preset: preset || null,
+                background: true
             })
         });
 
@@ -2057,7 +2177,8 @@ async function confirmExport() {
 
         if (result.success) {
             closeExportModal();
-            showNotification(`Export created successfully at: ${result.export_path}`);
+            showNotification('Export started...');
+            pollExportJob(result.job_id);
         } else {
             showNotification(result.error || 'Export failed', 'error');
         }
@@ -2067,6 +2188,49 @@ async function confirmExport() {
     }
 }
 
+function downloadExportZip() {
+    const options = getExportOptions();
+    if (!options) return;
+
+    // Streamed by the server; nothing is written to the exports folder
+    const params = new URLSearchParams({
+        export_name: options.exportName,
+        export_type: options.exportType,
+        include_display_in_filename: options.includeDisplay ? '1' : '0',
+        include_metadata: options.includeMetadata ? '1' : '0'
+    });
+    closeExportModal();
+    window.location.href = `/api/shots/export/zip?${params}`;
+}
+
+async function pollExportJob(jobId) {
+    try {
+        const response = await fetch(`/api/shots/export/jobs/${jobId}`);
+        const result = await response.json();
+        if (!result.success) {
+            showNotification(result.error || 'Export failed', 'error');
+            return;
+        }
+
+        const job = result.data;
+        if (job.status === 'done') {
+            showNotification(`Export created successfully at: ${job.export_path}`);
+        } else if (job.status === 'failed') {
+            showNotification(job.error || 'Export failed', 'error');
+        } else if (job.status === 'cancelled') {
+            showNotification('Export cancelled', 'error');
+        } else {
+            const percent = job.total_bytes ? Math.floor((job.bytes_done / job.total_bytes) * 100) : 0;
+            const rate = (job.throughput / (1024 * 1024)).toFixed(1);
+            showNotification(`Exporting ${job.files_done}/${job.total_files} files (${percent}%, ${rate} MB/s)`);
+            setTimeout(() => pollExportJob(jobId), 1000);
+        }
+    } catch (error) {
+        console.error('Export status failed:', error);
+        showNotification('Export failed', 'error');
+    }
+}
+
 // Video Playback Functions
 let currentVideoShotIndex = -1;
 
@@ -2085,7 +2249,7 @@ function playVideo(shotName, displayName) {
     const activeShots = shots.filter(s => !s.archived && s.video && s.video.file);
     currentVideoShotIndex = activeShots.findIndex(s => s.name === shotName);
 
-    const videoUrl = `/api/shots/video/${shotName}?v=${Date.now()}`;
+    const videoUrl = `/api/shots/video/${shotName}`;
     const videoPlayer = document.getElementById('video-player');
     const videoModalTitle = document.getElementById('video-modal-title');
     const videoVersion = document.getElementById('video-version');
@@ -2192,7 +2356,7 @@ function showImage(shotName, displayName, assetType) {
     currentImageShotIndex = activeShots.findIndex(s => s.name === shotName);
     currentImageAssetType = assetType;
 
-    const imageUrl = `/api/shots/image/${shotName}/${assetType}?v=${Date.now()}`;
+    const imageUrl = `/api/shots/image/${shotName}/${assetType}`;
     const imageDisplay = document.getElementById('image-display');
     const imageModalTitle = document.getElementById('image-modal-title');
     const imageVersion = document.getElementById('image-version');
@@ -2324,5 +2488,6 @@ window.saveReorder = saveReorder;
 window.openExportModal = openExportModal;
 window.closeExportModal = closeExportModal;
 window.confirmExport = confirmExport;
+window.downloadExportZip = downloadExportZip;
 window.playVideo = playVideo;
 window.closeVideoModal = closeVideoModal;
@@ -1,3 +1,4 @@
+import logging
 import os
 import socket
 import threading
@@ -13,27 +14,47 @@ from app import create_app
 # Load environment variables from .env file
 load_dotenv()
 
+SERVER_DEFAULTS = {
+    "host": "127.0.0.1",
+    "port": 5001,
+    "mode": "development",
+    "threads": 8,
+    "connection_limit": 100,
+    "max_upload_mb": 4096,
+    "channel_timeout": 120,
+    "shutdown_timeout": 30,
+}
+
 
 def load_server_config():
-    """Load server host and port from shotbuddy.cfg if it exists."""
+    """Load server settings from shotbuddy.cfg, overridden by SHOTBUDDY_* env vars."""
+    settings = dict(SERVER_DEFAULTS)
     cfg_path = Path(__file__).with_name("shotbuddy.cfg")
-    host = None
-    port = None
     if cfg_path.exists():
         parser = ConfigParser()
         parser.read(cfg_path)
         if parser.has_section("server"):
-            host = parser.get("server", "host", fallback=None)
-            port = parser.getint("server", "port", fallback=None)
-    return host, port
+            for key, default in SERVER_DEFAULTS.items():
+                if parser.has_option("server", key):
+                    value = parser.get("server", key)
+                    settings[key] = int(value) if isinstance(default, int) else value
+
+    for key, default in SERVER_DEFAULTS.items():
+        value = os.environ.get(f"SHOTBUDDY_{key.upper()}")
+        if value is not None:
+            settings[key] = int(value) if isinstance(default, int) else value
+
+    settings["mode"] = settings["mode"].lower()
+    settings["max_content_length"] = settings["max_upload_mb"] * 1024 * 1024
+    return settings
 
 
 app = create_app()
 
 if __name__ == "__main__":
-    cfg_host, cfg_port = load_server_config()
-    host = os.environ.get("SHOTBUDDY_HOST", cfg_host or "127.0.0.1")
-    port = int(os.environ.get("SHOTBUDDY_PORT", cfg_port or 5001))
+    settings = load_server_config()
+    host = settings["host"]
+    port = settings["port"]
     debug = os.environ.get("SHOTBUDDY_DEBUG", "0").lower() in {"1", "true", "yes"}
 
     def _open_browser_when_ready(url):
@@ -45,10 +66,17 @@ if __name__ == "__main__":
                 time.sleep(0.1)
         webbrowser.open_new(url)
 
-    threading.Thread(
-        target=_open_browser_when_ready,
-        args=(f"http://{host}:{port}/",),
-        daemon=True,
-    ).start()
+    if settings["mode"] == "production":
+        from app.server import serve
+
+        logging.getLogger().setLevel(logging.INFO)
+        app.config["MAX_CONTENT_LENGTH"] = settings["max_content_length"]
+        serve(app, settings)
+    else:
+        threading.Thread(
+            target=_open_browser_when_ready,
+            args=(f"http://{host}:{port}/",),
+            daemon=True,
+        ).start()
 
-    app.run(debug=debug, host=host, port=port)
+        app.run(debug=debug, host=host, port=port)
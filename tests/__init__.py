@@ -0,0 +1,4 @@
+from pathlib import Path
+
+# Small sample files for the binary parsers
+FIXTURES = Path(__file__).parent / "fixtures"
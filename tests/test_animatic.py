@@ -0,0 +1,29 @@
+from app.services.animatic import _container_suffix, choose_target, normalize_command, stream_signature
+
+H264_AAC = {"codec": "h264", "width": 1920, "height": 1080, "fps": 24.0, "pix_fmt": "yuv420p",
+            "has_audio": True, "audio_codec": "aac", "sample_rate": 48000, "channels": 2}
+
+
+def test_signature_separates_pixel_format_and_audio_layout():
+    base = stream_signature(H264_AAC)
+    assert stream_signature({**H264_AAC, "pix_fmt": "yuv422p10le"}) != base
+    assert stream_signature({**H264_AAC, "sample_rate": 44100}) != base
+    assert stream_signature({**H264_AAC, "channels": 1}) != base
+    assert stream_signature({**H264_AAC, "has_audio": False})[5:] == (None, None, None)
+
+
+def test_target_fills_unknown_fields():
+    target = choose_target([stream_signature({**H264_AAC, "pix_fmt": None, "sample_rate": None})])
+    assert target == ("h264", 1920, 1080, 24.0, "yuv420p", "aac", 48000, 2)
+    # A clip that could not be fully probed does not match and is re-encoded
+    assert stream_signature({**H264_AAC, "pix_fmt": None}) != target
+
+
+def test_pcm_audio_uses_mov():
+    pcm = choose_target([stream_signature({**H264_AAC, "audio_codec": "pcm_s16le"})])
+    assert _container_suffix(pcm) == ".mov"
+    assert _container_suffix(choose_target([stream_signature(H264_AAC)])) == ".mp4"
+    cmd = normalize_command("ffmpeg", "in.mov", "out.mov", pcm, src_has_audio=False)
+    assert "anullsrc=channel_layout=stereo:sample_rate=48000" in cmd
+    assert cmd[cmd.index("-c:a") + 1:cmd.index("-c:a") + 6] == ["pcm_s16le", "-ar", "48000", "-ac", "2"]
+    assert cmd[cmd.index("-pix_fmt") + 1] == "yuv420p"
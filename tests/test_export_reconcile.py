@@ -0,0 +1,65 @@
+import json
+
+from app.services.export_engine import MANIFEST_FILENAME, MANIFEST_VERSION, ExportJob, resolve_export_dir
+
+
+def _item(src, dst, shot):
+    st = src.stat()
+    return {"src": str(src), "dst": dst, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+            "shot": shot, "asset": "video"}
+
+
+def _plan(items):
+    return {"items": items, "total_bytes": sum(i["size"] for i in items), "export_type": "videos",
+            "timestamp": "20260101_000000", "summary": "# Export\n"}
+
+
+def _write_manifest(export_dir, entries):
+    (export_dir / MANIFEST_FILENAME).write_text(json.dumps({"version": MANIFEST_VERSION, "entries": entries}))
+
+
+def test_reconcile_never_touches_files_outside_export_dir(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    sh010 = source / "SH010.mp4"
+    sh010.write_bytes(b"video 10")
+    sh020 = source / "SH020.mp4"
+    sh020.write_bytes(b"video 20")
+
+    export_dir = tmp_path / "exports" / "cut"
+    job = ExportJob(_plan([_item(sh010, "videos/01_SH010.mp4", "SH010"),
+                           _item(sh020, "videos/02_SH020.mp4", "SH020")]), export_dir)
+    job.run()
+
+    outside = tmp_path / "outside.txt"
+    outside.write_text("keep me")
+    sibling = tmp_path / "exports" / "other" / "videos" / "01_SH010.mp4"
+    sibling.parent.mkdir(parents=True)
+    sibling.write_bytes(b"another export")
+
+    # A tampered manifest: stale entries pointing outside the export folder
+    entries = json.loads((export_dir / MANIFEST_FILENAME).read_text())["entries"]
+    entries["../../outside.txt"] = dict(entries["videos/01_SH010.mp4"], src=str(tmp_path / "gone.mp4"))
+    entries[str(outside)] = dict(entries["videos/01_SH010.mp4"], src=str(tmp_path / "gone2.mp4"))
+    entries["../other/videos/01_SH010.mp4"] = entries.pop("videos/01_SH010.mp4")
+    _write_manifest(export_dir, entries)
+
+    # SH010 moves to position 3, SH020 is dropped
+    job = ExportJob(_plan([_item(sh010, "videos/03_SH010.mp4", "SH010")]), export_dir, incremental=True)
+    job.run()
+
+    assert job.status == "done"
+    assert outside.read_text() == "keep me"
+    assert sibling.read_bytes() == b"another export"
+    assert not (export_dir / "videos" / "02_SH020.mp4").exists()
+    assert (export_dir / "videos" / "03_SH010.mp4").read_bytes() == b"video 10"
+    assert job.files_deleted == 1
+    assert job.files_renamed == 0
+    assert not list(export_dir.rglob("*.partial"))
+
+
+def test_export_name_stays_inside_exports(tmp_path):
+    exports = tmp_path / "exports"
+    assert resolve_export_dir(tmp_path, "../../etc") == exports / "_.._etc"
+    assert resolve_export_dir(tmp_path, "..", "20260101_000000") == exports / "export_20260101_000000"
+    assert resolve_export_dir(tmp_path, "cut/v2", suffix=".zip") == exports / "cut_v2.zip"
@@ -0,0 +1,108 @@
+import struct
+import zlib
+
+import pytest
+
+from app.services.image_metadata import PNG_SIGNATURE, detect_image_format, read_text_metadata
+
+from . import FIXTURES
+
+IMAGE_FIXTURES = ["prompt.png", "plain.png", "prompt.jpg", "plain.jpg", "prompt.webp", "plain.webp"]
+
+
+def _png_chunk(chunk_type, data):
+    crc = zlib.crc32(chunk_type + data) & 0xFFFFFFFF
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", crc)
+
+
+def _write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return path
+
+
+def test_png_text_chunks():
+    image_format, metadata = read_text_metadata(FIXTURES / "prompt.png")
+    assert image_format == "PNG"
+    assert metadata["parameters"].startswith("a red fox in the snow\nNegative prompt: blurry")
+    assert metadata["Description"] == "zipped description"  # zTXt
+    assert metadata["Comment"] == "unicode caption éè"  # iTXt
+
+
+def test_jpeg_exif_user_comment_and_comment_segment():
+    image_format, metadata = read_text_metadata(FIXTURES / "prompt.jpg")
+    assert image_format == "JPEG"
+    assert metadata["parameters"] == "a lighthouse at dusk"
+    assert metadata["comment"] == "jpeg comment text"
+
+
+def test_webp_exif():
+    image_format, metadata = read_text_metadata(FIXTURES / "prompt.webp")
+    assert image_format == "WEBP"
+    assert metadata == {"parameters": "a castle on a hill"}
+
+
+@pytest.mark.parametrize("name, image_format", [
+    ("plain.png", "PNG"),
+    ("plain.jpg", "JPEG"),
+    ("plain.webp", "WEBP"),
+])
+def test_no_metadata(name, image_format):
+    assert read_text_metadata(FIXTURES / name) == (image_format, {})
+
+
+def test_unsupported_and_empty_files(tmp_path):
+    assert read_text_metadata(_write(tmp_path, "a.gif", b"GIF89a" + b"\x00" * 20)) == (None, {})
+    assert read_text_metadata(_write(tmp_path, "empty.png", b"")) == (None, {})
+    assert detect_image_format(b"RIFF\x00\x00\x00\x00WAVE") is None
+
+
+@pytest.mark.parametrize("name", IMAGE_FIXTURES)
+def test_truncated_files_do_not_raise(tmp_path, name):
+    data = (FIXTURES / name).read_bytes()
+    for cut in range(len(data)):
+        path = _write(tmp_path, name, data[:cut])
+        image_format, metadata = read_text_metadata(path)
+        assert isinstance(metadata, dict)
+
+
+def test_png_text_after_truncation_is_kept(tmp_path):
+    data = (FIXTURES / "prompt.png").read_bytes()
+    # Cut inside the image data, after all text chunks
+    path = _write(tmp_path, "cut.png", data[:data.index(b"IDAT") + 6])
+    assert "parameters" in read_text_metadata(path)[1]
+
+
+def test_png_malformed_chunks(tmp_path):
+    ihdr = _png_chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0))
+    bad_ztxt = _png_chunk(b"zTXt", b"prompt\x00\x00not zlib data")
+    good = _png_chunk(b"tEXt", b"parameters\x00a boat")
+    huge = struct.pack(">I", 0xFFFFFFF0) + b"tEXt" + b"x" * 8
+    path = _write(tmp_path, "bad.png", PNG_SIGNATURE + ihdr + bad_ztxt + good + huge)
+    assert read_text_metadata(path) == ("PNG", {"parameters": "a boat"})
+
+
+def test_jpeg_malformed_segments(tmp_path):
+    # Segment length below the 2-byte minimum ends the scan
+    path = _write(tmp_path, "bad.jpg", b"\xff\xd8\xff\xfe\x00\x01garbage")
+    assert read_text_metadata(path) == ("JPEG", {})
+    # EXIF whose IFD offset points past the payload
+    exif = b"Exif\x00\x00II*\x00" + struct.pack("<I", 0xFFFF)
+    segment = b"\xff\xe1" + struct.pack(">H", len(exif) + 2) + exif
+    path = _write(tmp_path, "bad_exif.jpg", b"\xff\xd8" + segment + b"\xff\xd9")
+    assert read_text_metadata(path) == ("JPEG", {})
+
+
+def test_jpeg_exif_value_offset_out_of_range(tmp_path):
+    ifd = struct.pack("<H", 1) + struct.pack("<HHII", 0x010E, 2, 64, 0xFFFFFF) + struct.pack("<I", 0)
+    exif = b"Exif\x00\x00II*\x00" + struct.pack("<I", 8) + ifd
+    segment = b"\xff\xe1" + struct.pack(">H", len(exif) + 2) + exif
+    path = _write(tmp_path, "offset.jpg", b"\xff\xd8" + segment + b"\xff\xd9")
+    assert read_text_metadata(path) == ("JPEG", {})
+
+
+def test_webp_riff_size_larger_than_file(tmp_path):
+    data = bytearray((FIXTURES / "prompt.webp").read_bytes())
+    data[4:8] = struct.pack("<I", 0x7FFFFFFF)
+    path = _write(tmp_path, "big.webp", bytes(data))
+    assert read_text_metadata(path) == ("WEBP", {"parameters": "a castle on a hill"})
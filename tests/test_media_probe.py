@@ -0,0 +1,136 @@
+import os
+import struct
+
+import pytest
+
+from app.services import media_probe
+from app.services.media_probe import MediaProbeCache, probe_file, probe_image, probe_video
+
+from . import FIXTURES
+
+CLIP_INFO = {
+    "kind": "video",
+    "duration": 2.0,
+    "has_audio": True,
+    "audio_codec": "aac",
+    "sample_rate": 44100,
+    "channels": 1,
+    "codec": "h264",
+    "pix_fmt": "yuv420p",
+    "width": 320,
+    "height": 240,
+    "frames": 48,
+    "fps": 24.0,
+}
+
+
+def _box(box_type, payload=b""):
+    return struct.pack(">I4s", len(payload) + 8, box_type) + payload
+
+
+def _top_level_boxes(data):
+    boxes, pos = {}, 0
+    while pos < len(data):
+        size, box_type = struct.unpack(">I4s", data[pos:pos + 8])
+        boxes[box_type] = data[pos:pos + size]
+        pos += size
+    return boxes
+
+
+def _write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return path
+
+
+@pytest.fixture
+def no_ffprobe(monkeypatch):
+    """Keep the tests on the header parser even where ffprobe is installed."""
+    monkeypatch.setattr(media_probe, "_probe_ffprobe", lambda path: None)
+
+
+@pytest.mark.parametrize("name", ["clip.mp4", "faststart.mp4"])
+def test_mp4_moov_before_or_after_mdat(no_ffprobe, name):
+    assert probe_video(FIXTURES / name) == CLIP_INFO
+
+
+def test_mov_without_audio(no_ffprobe):
+    info = probe_video(FIXTURES / "clip.mov")
+    assert (info["codec"], info["pix_fmt"]) == ("mpeg4", "yuv420p")
+    assert (info["width"], info["height"], info["fps"], info["duration"]) == (640, 360, 30.0, 1.5)
+    assert info["has_audio"] is False
+
+
+def test_image_dimensions():
+    assert probe_image(FIXTURES / "plain.png") == {
+        "kind": "image", "width": 4, "height": 4, "codec": "png", "mode": "RGB",
+    }
+
+
+def test_unsupported_extension(tmp_path):
+    assert probe_file(_write(tmp_path, "notes.txt", b"hello")) is None
+
+
+@pytest.mark.parametrize("name", ["clip.mp4", "faststart.mp4", "clip.mov"])
+def test_truncated_files_do_not_raise(no_ffprobe, tmp_path, name):
+    data = (FIXTURES / name).read_bytes()
+    for cut in range(0, len(data), 7):
+        info = probe_file(_write(tmp_path, name, data[:cut]))
+        assert info is None or info["kind"] == "video"
+
+
+def test_moov_without_tracks(no_ffprobe, tmp_path):
+    path = _write(tmp_path, "empty.mp4", _box(b"ftyp", b"isom") + _box(b"moov", _box(b"udta")) + _box(b"mdat"))
+    assert probe_video(path) == {"kind": "video", "has_audio": False}
+
+
+def test_file_without_moov(no_ffprobe, tmp_path):
+    path = _write(tmp_path, "nomoov.mp4", _box(b"ftyp", b"isom") + _box(b"mdat", b"\x00" * 32))
+    assert probe_video(path) is None
+
+
+@pytest.mark.parametrize("header", [
+    struct.pack(">I4s", 4, b"ftyp"),  # size below the header size
+    struct.pack(">I4sQ", 1, b"ftyp", 8),  # 64-bit size below the header size
+])
+def test_malformed_box_sizes(no_ffprobe, tmp_path, header):
+    assert probe_video(_write(tmp_path, "bad.mp4", header + b"\x00" * 16)) is None
+
+
+def test_oversized_moov_is_not_read(no_ffprobe, tmp_path):
+    moov = struct.pack(">I4s", media_probe.MAX_MOOV_SIZE + 16, b"moov") + b"\x00" * 8
+    assert probe_video(_write(tmp_path, "huge.mp4", _box(b"ftyp", b"isom") + moov)) is None
+
+
+def test_stts_count_beyond_box(no_ffprobe, tmp_path):
+    boxes = _top_level_boxes((FIXTURES / "clip.mp4").read_bytes())
+    moov = bytearray(boxes[b"moov"])
+    stts = moov.index(b"stts")
+    # Entry count far larger than the box holds
+    moov[stts + 8:stts + 12] = struct.pack(">I", 0x7FFFFFFF)
+    path = _write(tmp_path, "stts.mp4", boxes[b"ftyp"] + bytes(moov))
+    assert probe_video(path) is None
+
+
+def test_cache_probes_once_and_revalidates(tmp_path, monkeypatch):
+    calls = []
+    real_probe = media_probe.probe_file
+    monkeypatch.setattr(media_probe, "probe_file", lambda path: calls.append(path) or real_probe(path))
+
+    image = _write(tmp_path, "a.png", (FIXTURES / "plain.png").read_bytes())
+    cache = MediaProbeCache(tmp_path, flush_delay=60)
+    assert cache.get(image)["width"] == 4
+    assert cache.get(image)["width"] == 4
+    assert len(calls) == 1
+
+    image.write_bytes((FIXTURES / "prompt.png").read_bytes())
+    st = image.stat()
+    os.utime(image, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    cache.get(image)
+    assert len(calls) == 2
+
+    cache.flush()
+    reloaded = MediaProbeCache(tmp_path, flush_delay=60)
+    assert reloaded.get(image)["width"] == 4
+    assert len(calls) == 2
+    assert len(reloaded) == 1